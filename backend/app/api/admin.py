@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import asyncio
+from app.services.profiler import admin_token_valid, request_profiler
+from app.config import settings
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+def require_admin_token(x_profile_token: Optional[str] = Header(None)):
+    """Admin endpoints exist only when PROFILER_ADMIN_TOKEN is set"""
+    if not settings.profiler_admin_token:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not admin_token_valid(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/profiles", dependencies=[Depends(require_admin_token)])
+async def list_profiles():
+    """Most recent request profiles, newest first"""
+    return {"profiles": await asyncio.to_thread(request_profiler.recent)}
+
+@router.get("/profiles/{request_id}", dependencies=[Depends(require_admin_token)])
+async def download_profile(request_id: str):
+    """Folded stacks for flamegraph.pl or speedscope"""
+    profile = await asyncio.to_thread(request_profiler.load, request_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile["folded"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{request_id}.folded"'}
+    )
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from typing import Optional
 from app.db.database import get_db
+from app.providers.circuit_breaker import breaker_states
+from app.services.loop_monitor import loop_monitor
+from app.services.profiler import admin_token_valid
+from app.services.state_backend import state_backend
 from app.config import settings
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/health", tags=["health"])
@@ -14,26 +21,45 @@ async def liveness():
     return {
         "status": "ok",
         "version": "1.0.0",
-        "use_mock_ai": settings.use_mock_ai
+        "use_mock_ai": settings.use_mock_ai,
+        "worker_pid": os.getpid(),
+        "shared_state": state_backend.shared
     }
 
 @router.get("/ready")
 async def readiness(db: Session = Depends(get_db)):
-    """Readiness probe - checks DB connection"""
+    """Readiness probe - checks DB connection and reports AI provider circuit states"""
     try:
         # Test DB connection with lightweight query
         db.execute(text("SELECT 1"))
         db_status = "ok"
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
-        return {
+        return JSONResponse(status_code=503, content={
             "status": "error",
             "database": "error",
-            "use_mock_ai": settings.use_mock_ai
-        }, 503
+            "use_mock_ai": settings.use_mock_ai,
+            "circuit_breakers": breaker_states()
+        })
     
+    # Open circuits degrade AI features but the app can still serve other routes
+    circuits = breaker_states()
     return {
-        "status": "ok",
+        "status": "degraded" if any(c["state"] != "closed" for c in circuits.values()) else "ok",
         "database": db_status,
-        "use_mock_ai": settings.use_mock_ai
+        "use_mock_ai": settings.use_mock_ai,
+        "circuit_breakers": circuits
+    }
+
+@router.get("/metrics")
+async def metrics(x_profile_token: Optional[str] = Header(None)):
+    """Per-worker runtime metrics: event loop lag, loop-blocking call sites, circuits
+
+    Captured stacks and in-flight request paths (which carry session ids)
+    are only included with the profiler admin token.
+    """
+    return {
+        "worker_pid": os.getpid(),
+        "event_loop": loop_monitor.snapshot(details=admin_token_valid(x_profile_token)),
+        "circuit_breakers": breaker_states()
     }
@@ -1,42 +1,26 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
 from typing import List
 from app.schemas.macca import Lesson
+from app.services.lesson_store import CachedBody, lesson_store
 
 router = APIRouter(tags=["lessons"])
 
+def cached_json(request: Request, cached: CachedBody) -> Response:
+    """Send pre-serialized JSON, or 304 if the client already has this version"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if cached.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 @router.get("/lessons", response_model=List[Lesson])
-async def get_lessons():
-    return [
-        Lesson(
-            id="lesson_1",
-            title="Job Interview: Introducing Yourself",
-            subtitle="Today's goal: talk about your background in 3–4 sentences.",
-            steps=[
-                "Step 1 – Warm-up",
-                "Step 2 – Key phrases",
-                "Step 3 – Practice answer",
-                "Step 4 – Follow-up questions"
-            ],
-            current_step=1
-        ),
-        Lesson(
-            id="lesson_2",
-            title="Daily Conversations: At a Restaurant",
-            subtitle="Learn to order food and make requests confidently.",
-            steps=[
-                "Step 1 – Greeting",
-                "Step 2 – Reading the menu",
-                "Step 3 – Placing order",
-                "Step 4 – Making requests"
-            ],
-            current_step=1
-        )
-    ]
+async def get_lessons(request: Request):
+    return cached_json(request, lesson_store.current().lesson_list)
 
 @router.get("/lessons/{lesson_id}", response_model=Lesson)
-async def get_lesson(lesson_id: str):
-    lessons = await get_lessons()
-    for lesson in lessons:
-        if lesson.id == lesson_id:
-            return lesson
-    return lessons[0]
\ No newline at end of file
+async def get_lesson(lesson_id: str, request: Request):
+    cached = lesson_store.current().lesson_bodies.get(lesson_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    return cached_json(request, cached)
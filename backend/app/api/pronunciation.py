@@ -1,12 +1,22 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
-from typing import List, Optional
-from sqlalchemy.orm import Session as DBSession
-from app.schemas.macca import PronunciationAnalysis, PronunciationFeedbackLegacy
-from app.dependencies import mock_user_profile, get_asr_provider, get_llm_provider, get_current_user_optional, get_storage_service
+from typing import Dict, List, Optional, Tuple
+from app.schemas.macca import (
+    PronunciationAnalysis, PronunciationFeedbackLegacy, PronunciationBatchAnalysis,
+    PronunciationBatchResponse, PronunciationWordResult, UserProfile, SessionContext
+)
+from app.dependencies import get_asr_provider, get_llm_provider, get_current_user_optional, get_storage_service
 from app.providers.base import ASRProvider, LLMProvider
+from app.providers.errors import ProviderError
 from app.services.storage import StorageService
-from app.db.database import get_db
+from app.db.database import session_scope
 from app.db.models import User, FeedbackIssue
+from app.services.pronunciation_scorer import IPA, pronounce, score_pronunciation, sound_tip
+from app.services.lexicon import get_lexicon, load_confusions
+from app.services.transcript_matching import match_transcript, normalize_text
+from app.services.pronunciation_cache import pronunciation_cache, normalize_word
+from app.services.issue_model import bump_user_issues
+from app.api.session import build_user_profile
+from app.config import settings
 import asyncio
 import logging
 
@@ -14,64 +24,297 @@ logger = logging.getLogger(__name__)
 
 # Max audio file size: 10MB
 MAX_AUDIO_SIZE = 10 * 1024 * 1024
+WORD_RETRY_SCORE = 50  # below this a word attempt is "try again"
+SENTENCE_RETRY_SCORE = 40
 
 router = APIRouter(prefix="/pronunciation", tags=["pronunciation"])
 
+def legacy_pronunciation_feedback(word: str, pron: dict) -> PronunciationFeedbackLegacy:
+    return PronunciationFeedbackLegacy(
+        word=pron.get("word") or word,
+        target_sound=pron.get("target_sound", "overall"),
+        status="needs_work",
+        tip_id=pron.get("tip", "Practice this word"),
+        tip_en=pron.get("tip", "Practice this word"),
+        score=75
+    )
+
+def default_pronunciation_feedback(word: str) -> PronunciationFeedbackLegacy:
+    return PronunciationFeedbackLegacy(
+        word=word,
+        target_sound="overall",
+        status="good",
+        tip_id="Practice this word more to improve clarity.",
+        tip_en="Practice this word more to improve clarity.",
+        score=85
+    )
+
+def lexicon_feedback(word: str) -> Optional[List[PronunciationFeedbackLegacy]]:
+    """Guidance straight from the lexicon's L1 confusion pairs; None for unknown words"""
+    lexicon = get_lexicon()
+    entry = lexicon.lookup(normalize_word(word)) if lexicon else None
+    if entry is None:
+        return None
+    
+    feedback = []
+    seen = set()
+    # Pairs are ordered by how often they trip up Indonesian speakers
+    for pair in entry.confusions:
+        if pair.target in seen:
+            continue
+        seen.add(pair.target)
+        general = next((p for p in entry.confusions if p.target == pair.target and p.substitute is None), pair)
+        feedback.append(PronunciationFeedbackLegacy(
+            word=word,
+            target_sound=f"/{IPA[pair.target]}/",
+            status="needs_work",
+            tip_id=general.tip_id,
+            tip_en=general.tip_en,
+            score=75
+        ))
+        if len(feedback) == 3:
+            break
+    return feedback or [default_pronunciation_feedback(word)]
+
+def word_hint(word: str) -> str:
+    """Quoted word plus its likely pronunciation and L1 pitfalls, for the LLM prompt"""
+    phonemes = pronounce(word)
+    if not phonemes:
+        return f"'{word}'"
+    pitfalls = [
+        f"/{IPA[p.substitute]}/ for /{IPA[p.target]}/"
+        for p in load_confusions()
+        if p.substitute and p.applies_to(phonemes)
+    ]
+    hint = f"'{word}' (/{''.join(IPA[p] for p in phonemes)}/"
+    if pitfalls:
+        hint += f"; Indonesian speakers often say {', '.join(pitfalls[:3])}"
+    return hint + ")"
+
+async def fetch_pronunciation_guidance(
+    words: List[str],
+    user_profile: UserProfile,
+    llm_provider: LLMProvider
+) -> Dict[str, List[PronunciationFeedbackLegacy]]:
+    """Ask the LLM about several words at once, keyed by normalized word
+    
+    Words are sent `pronunciation_batch_llm_words` at a time so each reply
+    fits the pronunciation mode's output budget; a typical lesson's new
+    vocabulary is a single call. Words the LLM skipped are left out.
+    """
+    session_context = SessionContext(
+        session_id="pronunciation",
+        mode="pronunciation_coach"
+    )
+    size = max(1, settings.pronunciation_batch_llm_words)
+    chunks = [words[i:i + size] for i in range(0, len(words), size)]
+    
+    async def ask(chunk: List[str]) -> Dict[str, List[PronunciationFeedbackLegacy]]:
+        if len(chunk) == 1:
+            prompt = f"Analyze pronunciation of the word {word_hint(chunk[0])}. Provide feedback on common pronunciation issues for Indonesian learners."
+        else:
+            listed = ", ".join(word_hint(w) for w in chunk)
+            prompt = (
+                f"Analyze pronunciation of these words: {listed}. Give one pronunciation_feedback "
+                f"entry per word (word, target_sound, tip) on common pronunciation issues for Indonesian learners."
+            )
+        response = await llm_provider.generate_macca_response(prompt, user_profile, session_context)
+        
+        by_word: Dict[str, List[PronunciationFeedbackLegacy]] = {}
+        keys = {normalize_word(w): w for w in chunk}
+        for pron in response.pronunciation_feedback:
+            key = normalize_word(pron.get("word", ""))
+            if key not in keys:
+                if len(chunk) > 1:
+                    continue
+                # Single-word prompt: any tip is about that word
+                key = normalize_word(chunk[0])
+            by_word.setdefault(key, []).append(legacy_pronunciation_feedback(keys[key], pron))
+        return by_word
+    
+    guidance: Dict[str, List[PronunciationFeedbackLegacy]] = {}
+    for part in await asyncio.gather(*(ask(chunk) for chunk in chunks)):
+        guidance.update(part)
+    return guidance
+
+async def pronunciation_results(
+    words: List[str],
+    current_user: Optional[User],
+    llm_provider: LLMProvider
+) -> List[PronunciationWordResult]:
+    """Per-word guidance from the lexicon or cache, with one LLM round for the rest"""
+    user_profile = await build_user_profile(current_user)
+    language = user_profile.explanation_language
+    
+    known = {word: lexicon_feedback(word) for word in words}
+    cached = {word: pronunciation_cache.get(word, language) for word in words if known[word] is None}
+    missing = [word for word in cached if cached[word] is None]
+    fetched = {}
+    if missing:
+        try:
+            fetched = await fetch_pronunciation_guidance(missing, user_profile, llm_provider)
+        except ProviderError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in pronunciation analysis: {e}")
+            raise HTTPException(status_code=500, detail="Failed to analyze pronunciation")
+        for word in missing:
+            feedback = fetched.get(normalize_word(word))
+            if feedback:
+                pronunciation_cache.put(word, language, feedback)
+    
+    logger.info(
+        f"Pronunciation guidance for {len(words)} words: {len(words) - len(cached)} lexicon, "
+        f"{len(cached) - len(missing)} cached, {len(missing)} from LLM"
+    )
+    
+    results = []
+    for word in words:
+        if known[word] is not None:
+            results.append(PronunciationWordResult(word=word, feedback=known[word], source="lexicon"))
+        elif cached[word] is not None:
+            results.append(PronunciationWordResult(word=word, feedback=cached[word], cached=True, source="cache"))
+        else:
+            results.append(PronunciationWordResult(
+                word=word,
+                feedback=fetched.get(normalize_word(word)) or [default_pronunciation_feedback(word)]
+            ))
+    return results
+
 @router.post("/analyze", response_model=List[PronunciationFeedbackLegacy])
 async def analyze_pronunciation(
     analysis: PronunciationAnalysis,
-    llm_provider: LLMProvider = Depends(get_llm_provider)
+    llm_provider: LLMProvider = Depends(get_llm_provider),
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Text-only pronunciation analysis - uses AI for feedback"""
+    results = await pronunciation_results([analysis.word], current_user, llm_provider)
+    return results[0].feedback
+
+@router.post("/analyze/batch", response_model=PronunciationBatchResponse)
+async def analyze_pronunciation_batch(
+    batch: PronunciationBatchAnalysis,
+    llm_provider: LLMProvider = Depends(get_llm_provider),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Pronunciation guidance for a word list (e.g. a lesson's target vocabulary)
     
-    # Use LLM to generate pronunciation feedback
-    from app.schemas.macca import UserProfile, SessionContext
+    Duplicates are collapsed and lexicon/cached words are answered without
+    the LLM; the rest share a single LLM request.
+    """
+    words = []
+    seen = set()
+    for word in batch.words:
+        key = normalize_word(word)
+        if key and key not in seen:
+            seen.add(key)
+            words.append(word.strip())
     
-    user_profile = UserProfile(
-        id="demo",
-        name="User",
-        level="B1",
-        goal="daily_conversation",
-        explanation_language="en",
-        common_issues=[]
-    )
+    if not words:
+        raise HTTPException(status_code=422, detail="No valid words to analyze")
+    if len(words) > settings.pronunciation_batch_max_words:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many words (max {settings.pronunciation_batch_max_words})"
+        )
     
-    session_context = SessionContext(
-        session_id="pronunciation",
-        mode="pronunciation_coach"
+    return PronunciationBatchResponse(
+        results=await pronunciation_results(words, current_user, llm_provider)
     )
+
+def word_audio_feedback(word: str, transcript: str) -> Tuple[List[PronunciationFeedbackLegacy], dict]:
+    """Phoneme-level feedback for a single target word"""
+    result = score_pronunciation(word, transcript)
+    weak = result.weakest()
+    detail = {"score": result.score, "weak_sounds": [p.ipa for p in weak]}
     
-    prompt = f"Analyze pronunciation of the word '{analysis.word}'. Provide feedback on common pronunciation issues for Indonesian learners."
+    if result.score < WORD_RETRY_SCORE:
+        return [PronunciationFeedbackLegacy(
+            word=word,
+            target_sound="overall",
+            status="needs_work",
+            tip_id=f"Coba lagi. Saya mendengar '{transcript}' bukan '{word}'.",
+            tip_en=f"Try again. I heard '{transcript}' not '{word}'.",
+            score=result.score
+        )], detail
     
-    try:
-        response = await llm_provider.generate_macca_response(prompt, user_profile, session_context)
-        
-        # Convert to legacy format
+    if weak:
         feedback = []
-        for pron in response.pronunciation_feedback:
+        for phoneme in weak:
+            tip_id, tip_en = sound_tip(phoneme)
             feedback.append(PronunciationFeedbackLegacy(
-                word=pron.get("word", analysis.word),
-                target_sound=pron.get("target_sound", "overall"),
+                word=word,
+                target_sound=phoneme.ipa,
                 status="needs_work",
-                tip_id=pron.get("tip", "Practice this word"),
-                tip_en=pron.get("tip", "Practice this word"),
-                score=75
+                tip_id=tip_id,
+                tip_en=tip_en,
+                score=phoneme.score
             ))
-        
-        if not feedback:
+        return feedback, detail
+    
+    return [overall_feedback(word, result.score)], detail
+
+def sentence_audio_feedback(sentence: str, transcript: str) -> Tuple[List[PronunciationFeedbackLegacy], dict]:
+    """Word-level feedback for a phrase or drill sentence"""
+    match = match_transcript(sentence, transcript)
+    problems = match.problems[:3]
+    detail = {"score": match.score, "problem_words": [w.target for w in match.problems]}
+    
+    if match.score < SENTENCE_RETRY_SCORE:
+        return [PronunciationFeedbackLegacy(
+            word=sentence,
+            target_sound="overall",
+            status="needs_work",
+            tip_id=f"Coba lagi. Saya mendengar '{transcript}'.",
+            tip_en=f"Try again. I heard '{transcript}'.",
+            score=match.score
+        )], detail
+    
+    if problems:
+        feedback = []
+        for problem in problems:
+            target_sound = "overall"
+            if problem.heard is None:
+                tip_id = f"Kata '{problem.target}' terlewat. Ucapkan seluruh kalimat."
+                tip_en = f"You skipped '{problem.target}'. Say the whole sentence."
+            else:
+                weak = score_pronunciation(problem.target, problem.heard).weakest(limit=1)
+                if weak:
+                    target_sound = weak[0].ipa
+                    tip_id, tip_en = sound_tip(weak[0])
+                else:
+                    tip_id = f"Saya mendengar '{problem.heard}' bukan '{problem.target}'."
+                    tip_en = f"I heard '{problem.heard}' instead of '{problem.target}'."
             feedback.append(PronunciationFeedbackLegacy(
-                word=analysis.word,
-                target_sound="overall",
-                status="good",
-                tip_id="Practice this word more to improve clarity.",
-                tip_en="Practice this word more to improve clarity.",
-                score=85
+                word=problem.target,
+                target_sound=target_sound,
+                status="needs_work",
+                tip_id=tip_id,
+                tip_en=tip_en,
+                score=int(round(problem.similarity * 100))
             ))
-        
-        return feedback
-    except Exception as e:
-        logger.error(f"Error in pronunciation analysis: {e}")
-        raise HTTPException(status_code=500, detail="Failed to analyze pronunciation")
+        return feedback, detail
+    
+    return [overall_feedback(sentence, match.score)], detail
+
+def attempt_needs_work(detail: dict) -> bool:
+    """Whether a scored audio attempt got needs_work feedback, from its stored detail"""
+    if "weak_sounds" in detail:
+        return detail["score"] < WORD_RETRY_SCORE or bool(detail["weak_sounds"])
+    if "problem_words" in detail:
+        return detail["score"] < SENTENCE_RETRY_SCORE or bool(detail["problem_words"])
+    return True
+
+def overall_feedback(word: str, score: int) -> PronunciationFeedbackLegacy:
+    excellent = score >= 90
+    return PronunciationFeedbackLegacy(
+        word=word,
+        target_sound="overall",
+        status="excellent" if excellent else "good",
+        tip_id="Sempurna! Pengucapan Anda sangat jelas." if excellent else "Bagus! Hampir sempurna.",
+        tip_en="Perfect! Your pronunciation is very clear." if excellent else "Good! Almost perfect.",
+        score=score
+    )
 
 @router.post("/analyze/audio", response_model=List[PronunciationFeedbackLegacy])
 async def analyze_pronunciation_audio(
@@ -79,10 +322,9 @@ async def analyze_pronunciation_audio(
     word: str = Form(...),
     asr_provider: ASRProvider = Depends(get_asr_provider),
     storage_service: StorageService = Depends(get_storage_service),
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: DBSession = Depends(get_db)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Audio-based pronunciation analysis"""
+    """Audio-based pronunciation analysis for a word, phrase or drill sentence"""
     
     user_id = str(current_user.id) if current_user else "anonymous"
     logger.info(f"POST /pronunciation/analyze/audio - user_id={user_id}, word={word}")
@@ -99,51 +341,26 @@ async def analyze_pronunciation_audio(
     # Transcribe audio (no need to save)
     transcript = await asr_provider.transcribe_audio(audio_bytes)
     
-    # Normalize strings for comparison
-    import re
-    def normalize(text):
-        # Remove punctuation, lowercase, strip whitespace
-        return re.sub(r'[^a-z]', '', text.lower().strip())
-    
-    transcript_normalized = normalize(transcript)
-    word_normalized = normalize(word)
-    
-    logger.info(f"Comparing: '{transcript_normalized}' vs '{word_normalized}'")
-    
-    # Simple pronunciation analysis based on transcript
-    feedback = []
-    
-    # Check if transcribed word matches target word
-    if transcript_normalized == word_normalized:
-        feedback.append(PronunciationFeedbackLegacy(
-            word=word,
-            target_sound="overall",
-            status="excellent",
-            tip_id="Sempurna! Pengucapan Anda sangat jelas.",
-            tip_en="Perfect! Your pronunciation is very clear.",
-            score=95
-        ))
+    # Score locally against the lexicon pronunciation (about a millisecond, no LLM call)
+    if len(normalize_text(word).split()) > 1:
+        feedback, detail = sentence_audio_feedback(word, transcript)
     else:
-        feedback.append(PronunciationFeedbackLegacy(
-            word=word,
-            target_sound="overall",
-            status="needs_work",
-            tip_id=f"Coba lagi. Saya mendengar '{transcript}' bukan '{word}'.",
-            tip_en=f"Try again. I heard '{transcript}' not '{word}'.",
-            score=50
-        ))
+        feedback, detail = word_audio_feedback(word, transcript)
+    logger.info(f"Scored '{word}' vs transcript '{transcript}': {detail}")
     
     # Persist feedback if user is authenticated
     if current_user:
-        issue = FeedbackIssue(
-            user_id=current_user.id,
-            session_id=None,
-            utterance_id=None,
-            type="pronunciation",
-            issue_code=word,
-            detail={"word": word, "transcript": transcript}
-        )
-        db.add(issue)
-        db.commit()
+        with session_scope() as db:
+            db.add(FeedbackIssue(
+                user_id=current_user.id,
+                session_id=None,
+                utterance_id=None,
+                type="pronunciation",
+                issue_code=word,
+                detail={"word": word, "transcript": transcript, **detail}
+            ))
+            # Correct attempts are kept for history but are not recurring mistakes
+            if attempt_needs_work(detail):
+                bump_user_issues(db, current_user.id, [("pronunciation", word)])
     
     return feedback
\ No newline at end of file
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from sqlalchemy.orm import Session as DBSession
-from datetime import datetime
+from datetime import datetime, timezone
+import asyncio
 import uuid
 import logging
 
@@ -10,23 +12,53 @@ logger = logging.getLogger(__name__)
 
 # Max audio file size: 10MB
 MAX_AUDIO_SIZE = 10 * 1024 * 1024
+# Longest reply the LLM can write (900 output tokens at ~4 chars each)
+MAX_SPEECH_CHARS = 4000
 from app.schemas.macca import (
-    ConversationTurn, ConversationResponse, 
-    UserProfile, SessionContext, MaccaFeedback, Drill
+    ConversationTurn, ConversationResponse, MaccaJsonResponse,
+    UserProfile, SessionContext, ConversationMessage, MaccaFeedback, Drill
 )
-from app.providers.base import LLMProvider, TTSProvider, ASRProvider
-from app.dependencies import get_llm_provider, get_tts_provider, get_asr_provider, get_current_user_optional, get_storage_service
-from app.db.database import get_db
+from app.providers.base import LLMProvider, TTSProvider, ASRProvider, StreamingTTSProvider
+from app.providers.errors import ProviderError
+from app.providers.streaming_tts import single_text
+from app.dependencies import (
+    get_llm_provider, get_tts_provider, get_asr_provider, get_current_user_optional, get_storage_service,
+    get_streaming_tts_provider, get_mock_user_profile
+)
+from app.db.database import get_db, session_scope
 from app.db.models import User, Session, Utterance, FeedbackIssue
 from app.services.storage import StorageService
+from app.jobs.queue import enqueue_after_response
+from app.services.issue_model import top_issues
+from app.services.session_lifecycle import as_utc, can_reopen, close_session, reopen_session, schedule_summaries
+from app.services.session_registry import ActiveSession, session_registry
+from app.services.lesson_store import lesson_store
+from app.services.lesson_runtime import LessonProgress, StepOutcome, compile_lesson
+from app.services.rate_limit import speech_stream_limiter
 
 router = APIRouter(prefix="/session", tags=["session"])
 
+LEGACY_MODES = {
+    "live": "live_conversation",
+    "guided": "guided_lesson",
+    "pronunciation": "pronunciation_coach"
+}
+
 class SessionStartRequest(BaseModel):
     mode: str
     topic: Optional[str] = None
     lesson_id: Optional[str] = None
 
+class SpeechStreamRequest(BaseModel):
+    text: str = Field(max_length=MAX_SPEECH_CHARS)
+
+class SessionEndResponse(BaseModel):
+    session_id: str
+    ended_at: Optional[datetime] = None  # None for anonymous sessions (not persisted)
+    duration_seconds: Optional[int] = None
+    summary: Optional[str] = None
+    summary_pending: bool = False  # generated in the background shortly after
+
 class SessionStartResponse(BaseModel):
     session_id: str
     initial_prompt: str
@@ -34,6 +66,213 @@ class SessionStartResponse(BaseModel):
     lesson_title: Optional[str] = None
     total_steps: Optional[int] = None
 
+def session_mode(mode: Optional[str]) -> str:
+    """Normalize stored/requested modes to a SessionMode (unknown -> live_conversation)"""
+    mode = LEGACY_MODES.get(mode, mode)
+    return mode if mode in LEGACY_MODES.values() else "live_conversation"
+
+def start_lesson(mode: str, lesson_id: Optional[str], step: Optional[int] = None) -> Optional[LessonProgress]:
+    """Lesson runtime for guided sessions whose lesson exists in the catalog"""
+    if mode != "guided_lesson":
+        return None
+    lesson = lesson_store.get(lesson_id)
+    if lesson is None:
+        return None
+    progress = LessonProgress(compile_lesson(lesson))
+    progress.step = min(max(step or 1, 1), progress.total_steps)
+    return progress
+
+async def build_user_profile(current_user: Optional[User]) -> UserProfile:
+    if current_user:
+        return UserProfile(
+            id=str(current_user.id),
+            name=current_user.name,
+            level=current_user.level,
+            goal=current_user.goal,
+            explanation_language=current_user.explanation_language,
+            common_issues=top_issues(current_user.issue_model)
+        )
+    # The shared mock profile may live in Redis: keep the round trip off the loop
+    return UserProfile(**await asyncio.to_thread(get_mock_user_profile))
+
+def latest_open_session_id(current_user: User) -> Optional[str]:
+    """Id of the user's most recently started session that has not ended"""
+    with session_scope() as db:
+        return db.query(Session.id).filter(
+            Session.user_id == current_user.id,
+            Session.ended_at.is_(None)
+        ).order_by(Session.started_at.desc()).limit(1).scalar()
+
+async def resolve_session(session_id: Optional[str], current_user: Optional[User]) -> Optional[ActiveSession]:
+    """Find the active session for a turn, validating ownership
+
+    Signed-in clients that send no session id (the current web app) get
+    their latest open session; anonymous ones get None (ephemeral turn that
+    is not persisted). Sessions not in the registry (restart, other worker)
+    are loaded once by primary key and re-registered; a turn reopens a
+    session closed for idleness, but one ended explicitly is 409. Registry
+    and DB lookups block, so they run in a worker thread.
+    """
+    if not session_id and not current_user:
+        return None
+    return await asyncio.to_thread(_resolve_session, session_id, current_user)
+
+def _resolve_session(session_id: Optional[str], current_user: Optional[User]) -> Optional[ActiveSession]:
+    if not session_id and current_user:
+        session_id = latest_open_session_id(current_user)
+    if not session_id:
+        return None
+
+    user_id = str(current_user.id) if current_user else None
+    active = session_registry.get(session_id)
+    if active:
+        if active.user_id is not None and active.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Not authorized for this session")
+        return active
+
+    if not current_user:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    with session_scope() as db:
+        row = db.get(Session, session_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if row.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized for this session")
+        if row.ended_at is not None:
+            if not can_reopen(row):
+                raise HTTPException(status_code=409, detail="Session has ended")
+            reopen_session(row)
+        context = SessionContext(
+            session_id=row.id,
+            mode=session_mode(row.mode),
+            topic=row.topic,
+            lesson_id=row.lesson_id
+        )
+        active = ActiveSession(
+            session_id=session_id,
+            user_id=user_id,
+            context=context,
+            persisted=True,
+            lesson=start_lesson(context.mode, row.lesson_id, row.lesson_step)
+        )
+        # Seed memory with the most recent utterances (one indexed query per rehydration)
+        history = db.query(Utterance.role, Utterance.transcript).filter(
+            Utterance.session_id == session_id
+        ).order_by(Utterance.created_at.desc()).limit(active.memory.max_turns * 2).all()
+        for role, text in reversed(history):
+            if role in ("user", "assistant") and text:
+                active.memory.turns.append(ConversationMessage(role=role, content=text))
+
+    return session_registry.register(active)
+
+def build_session_context(active: Optional[ActiveSession], legacy_mode: str, session_id: Optional[str] = None) -> SessionContext:
+    if active:
+        active.memory.apply(active.context)
+        if active.lesson:
+            active.lesson.apply(active.context)
+        return active.context
+    return SessionContext(
+        session_id=session_id or "mock_session",
+        mode=LEGACY_MODES.get(legacy_mode, "pronunciation_coach")
+    )
+
+def persist_turn(active: Optional[ActiveSession], current_user: Optional[User], transcript: str, macca_response: MaccaJsonResponse) -> Optional[str]:
+    """Write the user + assistant utterances straight to the known session id
+
+    Returns the assistant utterance id, or None when nothing was persisted.
+    """
+    if not active or not active.persisted or not current_user:
+        return None
+
+    with session_scope() as db:
+        # Save user utterance (transcript only, no audio)
+        db.add(Utterance(
+            session_id=active.session_id,
+            user_id=current_user.id,
+            role="user",
+            transcript=transcript
+        ))
+
+        # Save assistant utterance (transcript only, audio is temporary)
+        reply = Utterance(
+            session_id=active.session_id,
+            user_id=current_user.id,
+            role="assistant",
+            transcript=macca_response.reply,
+            raw_llm_json=macca_response.dict()
+        )
+        db.add(reply)
+        db.flush()
+        utterance_id = reply.id
+
+        if active.lesson:
+            db.query(Session).filter(Session.id == active.session_id).update(
+                {Session.lesson_step: active.lesson.step}
+            )
+    return utterance_id
+
+def queue_feedback_extraction(background_tasks: BackgroundTasks, utterance_id: Optional[str]):
+    """Grammar issues and vocabulary are recorded by the job worker, not the turn"""
+    if utterance_id:
+        enqueue_after_response(
+            background_tasks, "extract_feedback", {"utterance_id": utterance_id},
+            idempotency_key=f"extract_feedback:{utterance_id}"
+        )
+
+def advance_lesson(active: Optional[ActiveSession], transcript: str, macca_response: MaccaJsonResponse) -> Optional[StepOutcome]:
+    """Record the turn against the current lesson step; None outside lessons
+    
+    When the step advances, the next step's opening prompt is appended to
+    the reply so the learner hears it right away.
+    """
+    if not active or not active.lesson:
+        return None
+    outcome = active.lesson.record_turn(transcript, macca_response)
+    if outcome.next_prompt:
+        macca_response.reply = f"{macca_response.reply} {outcome.next_prompt}"
+    return outcome
+
+def next_step_label(active: Optional[ActiveSession], outcome: Optional[StepOutcome]) -> Optional[str]:
+    if not outcome:
+        return None
+    return "complete" if outcome.lesson_complete else f"step_{active.lesson.step}"
+
+async def remember_turn(active: Optional[ActiveSession], transcript: str, macca_response: MaccaJsonResponse, llm_provider: LLMProvider):
+    if not active:
+        return
+    active.turn_count += 1
+    active.memory.add_exchange(transcript, macca_response.reply)
+    # Summarizing older turns runs in the background, off the response path
+    summarizing = active.memory.maybe_summarize(llm_provider)
+    await asyncio.to_thread(session_registry.save, active)
+    if summarizing:
+        summarizing.add_done_callback(
+            lambda _: asyncio.get_running_loop().run_in_executor(None, session_registry.save_summary, active)
+        )
+
+def legacy_feedback(macca_response: MaccaJsonResponse, outcome: Optional[StepOutcome] = None) -> dict:
+    """Convert to legacy format for frontend compatibility"""
+    feedback = {}
+    if macca_response.grammar_feedback:
+        feedback["grammar_ok"] = False
+        feedback["tip_id"] = macca_response.grammar_feedback[0].get("explanation", "Check grammar")
+    else:
+        feedback["grammar_ok"] = True
+        feedback["fluency_score"] = 85
+        feedback["tip_id"] = "Good! Try using more adjectives."
+
+    if outcome:
+        feedback["step_complete"] = outcome.step_complete
+        if outcome.lesson_complete:
+            feedback["encouragement_id"] = "Hebat! Anda menyelesaikan pelajaran ini."
+        elif outcome.step_complete:
+            feedback["encouragement_id"] = "Perfect! Let's continue."
+        else:
+            feedback["encouragement_id"] = "Almost there - try using the target phrase."
+
+    return feedback
+
 @router.post("/start", response_model=SessionStartResponse)
 async def start_session(
     request: SessionStartRequest,
@@ -46,7 +285,8 @@ async def start_session(
             user_id=current_user.id,
             mode=request.mode,
             topic=request.topic,
-            lesson_id=request.lesson_id
+            lesson_id=request.lesson_id,
+            lesson_step=1 if session_mode(request.mode) == "guided_lesson" else None
         )
         db.add(session)
         db.commit()
@@ -57,110 +297,119 @@ async def start_session(
         # Mock session for backward compatibility
         session_id = f"sess_{uuid.uuid4().hex[:8]}"
         user_name = "there"
-    
+
+    lesson = start_lesson(session_mode(request.mode), request.lesson_id)
+    await asyncio.to_thread(session_registry.register, ActiveSession(
+        session_id=session_id,
+        user_id=str(current_user.id) if current_user else None,
+        context=SessionContext(
+            session_id=session_id,
+            mode=session_mode(request.mode),
+            topic=request.topic,
+            lesson_id=request.lesson_id
+        ),
+        persisted=current_user is not None,
+        lesson=lesson
+    ))
+
     initial_prompts = {
         "live_conversation": f"Hi {user_name}! Let's have a natural conversation. How was your day?",
         "guided_lesson": f"Welcome to today's lesson, {user_name}! Let's start with introducing yourself.",
         "pronunciation_coach": f"Hi {user_name}! Let's practice pronunciation. Say the word 'think'."
     }
+
+    if lesson:
+        return SessionStartResponse(
+            session_id=session_id,
+            initial_prompt=lesson.current.opening_prompt,
+            lesson_step=lesson.step,
+            lesson_title=lesson.lesson.source.title,
+            total_steps=lesson.total_steps
+        )
     
     return SessionStartResponse(
         session_id=session_id,
-        initial_prompt=initial_prompts.get(request.mode, "Let's start practicing!"),
-        lesson_step=1 if request.mode == "guided_lesson" else None,
-        lesson_title="Job Interview Practice" if request.lesson_id else None,
-        total_steps=4 if request.mode == "guided_lesson" else None
+        initial_prompt=initial_prompts.get(request.mode, "Let's start practicing!")
     )
 
+@router.post("/{session_id}/end", response_model=SessionEndResponse)
+async def end_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Close a session: duration is recorded now, the summary in the background
+
+    Ending an already closed session returns its recorded values.
+    """
+    user_id = str(current_user.id) if current_user else None
+    active = await asyncio.to_thread(session_registry.get, session_id)
+    if active and active.user_id is not None and active.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this session")
+
+    if not current_user or (active and not active.persisted):
+        if not active:
+            raise HTTPException(status_code=404, detail="Session not found")
+        await asyncio.to_thread(session_registry.remove, session_id)
+        return SessionEndResponse(session_id=session_id)
+
+    with session_scope() as db:
+        row = db.get(Session, session_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if row.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not authorized for this session")
+        closed = close_session(row, datetime.now(timezone.utc))
+        response = SessionEndResponse(
+            session_id=session_id,
+            ended_at=as_utc(row.ended_at),
+            duration_seconds=row.duration_seconds,
+            summary=row.summary,
+            summary_pending=row.summary is None
+        )
+
+    await asyncio.to_thread(session_registry.remove, session_id)
+    if closed:
+        logger.info(f"Session {session_id} ended after {response.duration_seconds}s")
+        background_tasks.add_task(schedule_summaries)
+    return response
+
 @router.post("/turn", response_model=ConversationResponse)
 async def process_conversation_turn(
     turn: ConversationTurn,
+    background_tasks: BackgroundTasks,
     llm_provider: LLMProvider = Depends(get_llm_provider),
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: DBSession = Depends(get_db)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    # Build user profile
-    if current_user:
-        user_profile = UserProfile(
-            id=str(current_user.id),
-            name=current_user.name,
-            level=current_user.level,
-            goal=current_user.goal,
-            explanation_language=current_user.explanation_language,
-            common_issues=[]
-        )
-    else:
-        from app.dependencies import mock_user_profile
-        user_profile = UserProfile(**mock_user_profile)
-    
-    session_context = SessionContext(
-        session_id="mock_session",
-        mode="live_conversation" if turn.mode == "live" else 
-              "guided_lesson" if turn.mode == "guided" else 
-              "pronunciation_coach"
-    )
-    
+    active = await resolve_session(turn.session_id, current_user)
+    user_profile = await build_user_profile(current_user)
+    session_context = build_session_context(active, turn.mode)
+
     # Use provided text (audio support can be added via separate endpoint if needed)
     transcript = turn.user_text
-    
+
     # Generate response from LLM
     macca_response = await llm_provider.generate_macca_response(
         transcript, user_profile, session_context
     )
-    
+
+    outcome = advance_lesson(active, transcript, macca_response)
+
+    await remember_turn(active, transcript, macca_response, llm_provider)
+
     # Persist to DB if user is authenticated
-    if current_user:
-        # Find or create session (simplified - in production, track session_id properly)
-        session = db.query(Session).filter(
-            Session.user_id == current_user.id
-        ).order_by(Session.started_at.desc()).first()
-        
-        if session:
-            # Save user utterance
-            user_utterance = Utterance(
-                session_id=session.id,
-                user_id=current_user.id,
-                role="user",
-                transcript=turn.user_text
-            )
-            db.add(user_utterance)
-            
-            # Save assistant utterance
-            assistant_utterance = Utterance(
-                session_id=session.id,
-                user_id=current_user.id,
-                role="assistant",
-                transcript=macca_response.reply,
-                raw_llm_json=macca_response.dict()
-            )
-            db.add(assistant_utterance)
-            db.commit()
-            db.refresh(assistant_utterance)
-            
-            db.commit()
-    
-    # Convert to legacy format for frontend compatibility
-    feedback = {}
-    if macca_response.grammar_feedback:
-        feedback["grammar_ok"] = False
-        feedback["tip_id"] = macca_response.grammar_feedback[0].get("explanation", "Check grammar")
-    else:
-        feedback["grammar_ok"] = True
-        feedback["fluency_score"] = 85
-        feedback["tip_id"] = "Good! Try using more adjectives."
-    
-    if turn.mode == "guided":
-        feedback["step_complete"] = True
-        feedback["encouragement_id"] = "Perfect! Let's continue."
-    
+    utterance_id = persist_turn(active, current_user, transcript, macca_response)
+    queue_feedback_extraction(background_tasks, utterance_id)
+
     return ConversationResponse(
         macca_text=macca_response.reply,
-        feedback=feedback,
-        next_step="step_3" if turn.mode == "guided" else None
+        feedback=legacy_feedback(macca_response, outcome),
+        next_step=next_step_label(active, outcome)
     )
 
 @router.post("/turn/audio", response_model=ConversationResponse)
 async def process_conversation_turn_audio(
+    background_tasks: BackgroundTasks,
     audio: UploadFile = File(...),
     mode: str = Form("live"),
     session_id: Optional[str] = Form(None),
@@ -168,14 +417,17 @@ async def process_conversation_turn_audio(
     asr_provider: ASRProvider = Depends(get_asr_provider),
     tts_provider: TTSProvider = Depends(get_tts_provider),
     storage_service: StorageService = Depends(get_storage_service),
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: DBSession = Depends(get_db)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Process conversation turn with audio input"""
-    
+    """Process conversation turn with audio input
+
+    ASR + LLM + TTS can take seconds, so no pooled DB connection is held
+    across them; persistence runs in its own short unit of work.
+    """
+
     user_id = str(current_user.id) if current_user else "anonymous"
     logger.info(f"POST /session/turn/audio - user_id={user_id}, session_id={session_id}, mode={mode}")
-    
+
     # Read and validate audio size
     audio_bytes = await audio.read()
     if len(audio_bytes) > MAX_AUDIO_SIZE:
@@ -184,83 +436,69 @@ async def process_conversation_turn_audio(
             status_code=413,
             detail=f"Audio file too large (max {MAX_AUDIO_SIZE // (1024*1024)} MB)"
         )
-    
-    # Build user profile
-    if current_user:
-        user_profile = UserProfile(
-            id=str(current_user.id),
-            name=current_user.name,
-            level=current_user.level,
-            goal=current_user.goal,
-            explanation_language=current_user.explanation_language,
-            common_issues=[]
-        )
-    else:
-        from app.dependencies import mock_user_profile
-        user_profile = UserProfile(**mock_user_profile)
-    
-    session_context = SessionContext(
-        session_id=session_id or "mock_session",
-        mode="live_conversation" if mode == "live" else 
-              "guided_lesson" if mode == "guided" else 
-              "pronunciation_coach"
-    )
-    
+
+    active = await resolve_session(session_id, current_user)
+    user_profile = await build_user_profile(current_user)
+    session_context = build_session_context(active, mode, session_id)
+
     # Transcribe audio (no need to save user audio)
     transcript = await asr_provider.transcribe_audio(audio_bytes)
-    
+
     # Generate response from LLM
     macca_response = await llm_provider.generate_macca_response(
         transcript, user_profile, session_context
     )
-    
+
+    outcome = advance_lesson(active, transcript, macca_response)
+
     # Generate TTS for response (temporary, will be deleted after playback)
     macca_audio_url = await tts_provider.synthesize_speech(macca_response.reply)
-    
+
+    await remember_turn(active, transcript, macca_response, llm_provider)
+
     # Persist to DB if user is authenticated
-    if current_user:
-        session = db.query(Session).filter(
-            Session.user_id == current_user.id
-        ).order_by(Session.started_at.desc()).first()
-        
-        if session:
-            # Save user utterance (transcript only, no audio)
-            user_utterance = Utterance(
-                session_id=session.id,
-                user_id=current_user.id,
-                role="user",
-                transcript=transcript
-            )
-            db.add(user_utterance)
-            
-            # Save assistant utterance (transcript only, audio is temporary)
-            assistant_utterance = Utterance(
-                session_id=session.id,
-                user_id=current_user.id,
-                role="assistant",
-                transcript=macca_response.reply,
-                raw_llm_json=macca_response.dict()
-            )
-            db.add(assistant_utterance)
-            db.commit()
-    
-    # Convert to legacy format for frontend compatibility
-    feedback = {}
-    if macca_response.grammar_feedback:
-        feedback["grammar_ok"] = False
-        feedback["tip_id"] = macca_response.grammar_feedback[0].get("explanation", "Check grammar")
-    else:
-        feedback["grammar_ok"] = True
-        feedback["fluency_score"] = 85
-        feedback["tip_id"] = "Good! Try using more adjectives."
-    
-    if mode == "guided":
-        feedback["step_complete"] = True
-        feedback["encouragement_id"] = "Perfect! Let's continue."
-    
+    utterance_id = persist_turn(active, current_user, transcript, macca_response)
+    queue_feedback_extraction(background_tasks, utterance_id)
+
     return ConversationResponse(
         macca_text=macca_response.reply,
         macca_audio_url=macca_audio_url,
-        feedback=feedback,
-        next_step="step_3" if mode == "guided" else None
-    )
\ No newline at end of file
+        feedback=legacy_feedback(macca_response, outcome),
+        next_step=next_step_label(active, outcome)
+    )
+
+@router.post("/speech/stream")
+async def stream_speech(
+    request: SpeechStreamRequest,
+    http_request: Request,
+    streaming_tts_provider: Optional[StreamingTTSProvider] = Depends(get_streaming_tts_provider),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Reply audio sentence by sentence, so playback starts with the first one"""
+    if streaming_tts_provider is None:
+        raise HTTPException(status_code=501, detail="Streaming TTS is not enabled")
+    if not request.text.strip():
+        raise HTTPException(status_code=422, detail="Text is empty")
+    # No auth required, and every call spends TTS quota on the server's key
+    client = f"user:{current_user.id}" if current_user else f"ip:{http_request.client.host if http_request.client else 'unknown'}"
+    retry_after = speech_stream_limiter.check(client)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many speech requests, please try again later",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+
+    async def body():
+        try:
+            async for chunk in streaming_tts_provider.stream_speech(single_text(request.text)):
+                yield chunk.data
+        except ProviderError as e:
+            # Headers are already sent; end the stream early with what was played
+            logger.warning(f"POST /session/speech/stream - provider={e.provider}: {e}")
+
+    return StreamingResponse(
+        body(),
+        media_type=streaming_tts_provider.mime_type,
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,334 @@
+"""Full-duplex voice sessions over a WebSocket
+
+The learner's audio streams in while they speak, so there is no upload
+after they stop and no per-turn request setup. `pcm16` audio goes through
+streaming ASR as it arrives (partial transcripts are pushed back) and the
+server finds the end of the utterance itself, so the LLM call starts as
+soon as the learner stops; `webm` clients (MediaRecorder) are transcribed
+in one shot after they send `end_of_speech`. Reply text, feedback
+and audio are pushed back as separate events as soon as each is ready.
+
+Client -> server (JSON text frames; audio as binary frames)
+    {"type": "start", "token"?, "session_id"?, "mode"?, "format"?: "pcm16" | "webm", "sample_rate"?}
+    <binary>                         audio of the current utterance
+    {"type": "end_of_speech"}        end the utterance now (push-to-talk, webm)
+    {"type": "text", "text": "..."}  typed turn
+    {"type": "stop"}                 finish queued turns and close
+
+Server -> client
+    ready, speech_started, partial_transcript, no_speech, transcript,
+    reply, feedback, turn_complete, error
+    With streaming TTS: audio_start {mime_type}, then per sentence a
+    sentence {index, text} event followed by its audio as binary frames,
+    then audio_end. Without it: audio {url} once the whole reply is ready.
+"""
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from app.api.session import (
+    MAX_AUDIO_SIZE, advance_lesson, build_session_context, build_user_profile,
+    legacy_feedback, next_step_label, persist_turn, remember_turn, resolve_session
+)
+from app.db.models import User
+from app.jobs.queue import enqueue
+from app.dependencies import (
+    get_llm_provider, get_asr_provider, get_streaming_asr_provider, get_tts_provider,
+    get_streaming_tts_provider, user_from_token
+)
+from app.providers.base import ASRProvider, LLMProvider, StreamingASRProvider, StreamingTTSProvider, TTSProvider
+from app.providers.errors import ProviderError
+from app.providers.limiter import request_budget
+from app.providers.streaming_tts import single_text
+from app.services.endpointing import ENDPOINT, Endpointer
+from app.services.session_registry import ActiveSession
+from app.services.tracing import span
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/session", tags=["session"])
+
+AUDIO_FORMATS = ("pcm16", "webm")
+SAMPLE_RATES = (8000, 48000)  # accepted pcm16 sample rate range, in Hz
+
+def _consume_exception(task: asyncio.Task):
+    # Abandoned transcriptions may fail; don't log their errors as unretrieved
+    if not task.cancelled():
+        task.exception()
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            return
+        yield chunk
+
+class VoiceConnection:
+    """One connected client: its session, providers and the utterance in progress
+
+    Audio is handled by the receive loop; finished utterances go on a queue
+    that a single worker drains, so turns are answered in order while the
+    learner can already be speaking the next one.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        llm_provider: LLMProvider,
+        asr_provider: ASRProvider,
+        streaming_asr_provider: StreamingASRProvider,
+        tts_provider: TTSProvider,
+        streaming_tts_provider: Optional[StreamingTTSProvider] = None
+    ):
+        self.websocket = websocket
+        self.llm_provider = llm_provider
+        self.asr_provider = asr_provider
+        self.streaming_asr_provider = streaming_asr_provider
+        self.tts_provider = tts_provider
+        self.streaming_tts_provider = streaming_tts_provider
+        self.current_user: Optional[User] = None
+        self.active: Optional[ActiveSession] = None
+        self.session_id: Optional[str] = None
+        self.mode = "live"
+        self.audio_format = "pcm16"
+        self.sample_rate = settings.voice_ws_sample_rate
+        self.endpointer: Optional[Endpointer] = None
+        self.webm_audio = bytearray()
+        self.audio_queue: Optional[asyncio.Queue] = None  # feeds streaming ASR for the current utterance
+        self.transcription: Optional[asyncio.Task] = None
+        self.turns: asyncio.Queue = asyncio.Queue()
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, event_type: str, **fields):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps({"type": event_type, **fields}))
+
+    async def send_audio(self, data: bytes):
+        async with self._send_lock:
+            await self.websocket.send_bytes(data)
+
+    async def start(self, message: dict):
+        """Authenticate and attach to the session; raises HTTPException"""
+        audio_format = message.get("format") or "pcm16"
+        if audio_format not in AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported audio format: {audio_format}")
+        self.audio_format = audio_format
+        sample_rate = int(message.get("sample_rate") or settings.voice_ws_sample_rate)
+        if not SAMPLE_RATES[0] <= sample_rate <= SAMPLE_RATES[1]:
+            raise HTTPException(
+                status_code=400, detail=f"sample_rate must be between {SAMPLE_RATES[0]} and {SAMPLE_RATES[1]}"
+            )
+        self.sample_rate = sample_rate
+        self.mode = message.get("mode") or "live"
+        self.session_id = message.get("session_id")
+        token = message.get("token") or self.websocket.query_params.get("token")
+        self.current_user = await asyncio.to_thread(user_from_token, token)
+        self.active = await resolve_session(self.session_id, self.current_user)
+
+    async def transcribe_stream(self, audio_queue: asyncio.Queue) -> str:
+        """Run streaming ASR over one utterance, pushing partial transcripts"""
+        async for hypothesis in self.streaming_asr_provider.stream_transcribe(_drain(audio_queue), self.sample_rate):
+            if hypothesis.is_final:
+                return hypothesis.text
+            if hypothesis.text:
+                await self.send("partial_transcript", text=hypothesis.text)
+        return ""
+
+    async def on_audio(self, chunk: bytes):
+        if self.audio_format == "webm":
+            self.webm_audio += chunk
+            if len(self.webm_audio) > MAX_AUDIO_SIZE:
+                # webm has no endpointing, so a client could otherwise stream forever
+                self.webm_audio = bytearray()
+                await self.send("error", status=413, detail=f"Audio too large (max {MAX_AUDIO_SIZE // (1024*1024)} MB)")
+                await self.websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                raise WebSocketDisconnect(code=status.WS_1009_MESSAGE_TOO_BIG)
+            return
+
+        if self.endpointer is None:
+            self.endpointer = Endpointer.from_settings(self.sample_rate)
+            self.audio_queue = asyncio.Queue()
+            self.transcription = asyncio.create_task(self.transcribe_stream(self.audio_queue))
+            self.transcription.add_done_callback(_consume_exception)
+        endpointer = self.endpointer
+        was_speaking = endpointer.speech_started
+        self.audio_queue.put_nowait(chunk)
+        events = endpointer.feed(chunk)
+        if endpointer.speech_started and not was_speaking:
+            await self.send("speech_started")
+        if ENDPOINT in events:
+            await self.end_utterance()
+
+    async def end_utterance(self):
+        if self.audio_format == "webm":
+            audio, self.webm_audio = bytes(self.webm_audio), bytearray()
+            if audio:
+                self.turns.put_nowait(("audio", asyncio.create_task(self.asr_provider.transcribe_audio(audio))))
+            else:
+                await self.send("no_speech")
+            return
+
+        endpointer, self.endpointer = self.endpointer, None
+        transcription, self.transcription = self.transcription, None
+        if self.audio_queue is not None:
+            self.audio_queue.put_nowait(None)  # end of this utterance's audio
+            self.audio_queue = None
+        if endpointer is None or not endpointer.speech_started:
+            if transcription:
+                transcription.cancel()
+            await self.send("no_speech")
+            return
+        self.turns.put_nowait(("audio", transcription))
+
+    async def run_turns(self):
+        while True:
+            item = await self.turns.get()
+            if item is None:
+                return
+            kind, value = item
+            try:
+                # One trace per turn; a trace per connection would never end
+                with request_budget(), span("WS turn", kind="server", root=True, session_id=self.session_id, turn__input=kind):
+                    transcript = await value if kind == "audio" else value
+                    await self.run_turn(transcript)
+            except ProviderError as e:
+                status_code = e.status_code if e.status_code in (429, 503, 504) else 502
+                logger.warning(f"WS /session/ws - provider={e.provider} status={status_code}: {e}")
+                await self.send(
+                    "error",
+                    status=status_code,
+                    detail="AI service is busy, please try again" if status_code in (429, 503) else "AI service unavailable",
+                    retry_after=e.retry_after
+                )
+            except (WebSocketDisconnect, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                logger.exception(f"WS /session/ws - turn failed: {e}")
+                await self.send("error", status=500, detail="Turn failed")
+
+    async def run_turn(self, transcript: str):
+        await self.send("transcript", text=transcript)
+
+        user_profile = await build_user_profile(self.current_user)
+        session_context = build_session_context(self.active, self.mode, self.session_id)
+        macca_response = await self.llm_provider.generate_macca_response(
+            transcript, user_profile, session_context
+        )
+        outcome = advance_lesson(self.active, transcript, macca_response)
+        await self.send("reply", text=macca_response.reply, next_step=next_step_label(self.active, outcome))
+        await self.send("feedback", feedback=legacy_feedback(macca_response, outcome))
+
+        # The learner has the reply now; record it before waiting on TTS
+        await remember_turn(self.active, transcript, macca_response, self.llm_provider)
+        utterance_id = persist_turn(self.active, self.current_user, transcript, macca_response)
+
+        if self.streaming_tts_provider is None:
+            macca_audio_url = await self.tts_provider.synthesize_speech(macca_response.reply)
+            await self.send("audio", url=macca_audio_url)
+        else:
+            await self.stream_reply_audio(macca_response.reply)
+        await self.send("turn_complete")
+
+        if utterance_id:
+            await asyncio.to_thread(
+                enqueue, "extract_feedback", {"utterance_id": utterance_id},
+                idempotency_key=f"extract_feedback:{utterance_id}"
+            )
+
+    async def stream_reply_audio(self, reply: str):
+        """Push each sentence's audio as soon as it is synthesized"""
+        started = False
+        sentence = -1
+        async for chunk in self.streaming_tts_provider.stream_speech(single_text(reply)):
+            if not started:
+                await self.send("audio_start", mime_type=chunk.mime_type)
+                started = True
+            if chunk.sentence != sentence:
+                sentence = chunk.sentence
+                await self.send("sentence", index=chunk.sentence, text=chunk.text)
+            await self.send_audio(chunk.data)
+        if started:
+            await self.send("audio_end")
+
+    def close(self):
+        if self.transcription:
+            self.transcription.cancel()
+        while not self.turns.empty():
+            item = self.turns.get_nowait()
+            if item and item[0] == "audio":
+                item[1].cancel()
+
+@router.websocket("/ws")
+async def voice_session(
+    websocket: WebSocket,
+    llm_provider: LLMProvider = Depends(get_llm_provider),
+    asr_provider: ASRProvider = Depends(get_asr_provider),
+    streaming_asr_provider: StreamingASRProvider = Depends(get_streaming_asr_provider),
+    tts_provider: TTSProvider = Depends(get_tts_provider),
+    streaming_tts_provider: Optional[StreamingTTSProvider] = Depends(get_streaming_tts_provider)
+):
+    await websocket.accept()
+    connection = VoiceConnection(
+        websocket, llm_provider, asr_provider, streaming_asr_provider, tts_provider, streaming_tts_provider
+    )
+    worker: Optional[asyncio.Task] = None
+    try:
+        try:
+            message = json.loads(await websocket.receive_text())
+            if not isinstance(message, dict) or message.get("type") != "start":
+                raise HTTPException(status_code=400, detail="First message must be a start event")
+            await connection.start(message)
+        except (ValueError, TypeError, KeyError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid start event: {e}")
+    except HTTPException as e:
+        logger.info(f"WS /session/ws - rejected: {e.detail}")
+        await connection.send("error", status=e.status_code, detail=e.detail)
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    except WebSocketDisconnect:
+        return
+
+    user_id = str(connection.current_user.id) if connection.current_user else "anonymous"
+    logger.info(f"WS /session/ws - user_id={user_id}, session_id={connection.session_id}, format={connection.audio_format}")
+    await connection.send("ready", session_id=connection.session_id)
+    worker = asyncio.create_task(connection.run_turns())
+    worker.add_done_callback(_consume_exception)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                await connection.on_audio(message["bytes"])
+                continue
+
+            try:
+                event = json.loads(message.get("text") or "")
+            except ValueError:
+                await connection.send("error", status=400, detail="Invalid JSON event")
+                continue
+            if not isinstance(event, dict):
+                await connection.send("error", status=400, detail="Events must be JSON objects")
+                continue
+            event_type = event.get("type")
+            if event_type == "end_of_speech":
+                await connection.end_utterance()
+            elif event_type == "text" and event.get("text"):
+                connection.turns.put_nowait(("text", event["text"]))
+            elif event_type == "stop":
+                connection.turns.put_nowait(None)
+                await worker
+                await websocket.close()
+                return
+            else:
+                await connection.send("error", status=400, detail=f"Unknown event: {event_type}")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if not worker.done():
+            worker.cancel()
+        connection.close()
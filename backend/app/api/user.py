@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional
+import asyncio
 from app.schemas.macca import UserProfile, UserProfileUpdate
-from app.dependencies import get_current_user_optional, mock_user_profile
+from app.dependencies import get_current_user_optional, get_mock_user_profile, update_mock_user_profile
 from app.db.database import get_db
+from app.services.issue_model import top_issues
 from app.db.models import User, Session as DBSession, FeedbackIssue, Utterance, VocabularyItem as DBVocabularyItem
 
 router = APIRouter(prefix="/user", tags=["user"])
@@ -21,9 +23,9 @@ async def get_user_profile(
             level=current_user.level,
             goal=current_user.goal,
             explanation_language=current_user.explanation_language,
-            common_issues=[]
+            common_issues=top_issues(current_user.issue_model)
         )
-    return UserProfile(**mock_user_profile)
+    return UserProfile(**await asyncio.to_thread(get_mock_user_profile))
 
 @router.patch("/profile", response_model=UserProfile)
 async def update_user_profile(
@@ -33,6 +35,11 @@ async def update_user_profile(
 ):
     # If authenticated, update DB user; otherwise update mock
     if current_user:
+        # Auth hands out a detached snapshot; update a freshly loaded row so
+        # columns written elsewhere meanwhile (issue_model) are not copied back
+        current_user = db.get(User, current_user.id)
+        if current_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
         if update.name is not None:
             current_user.name = update.name
         if update.level is not None:
@@ -51,20 +58,11 @@ async def update_user_profile(
             level=current_user.level,
             goal=current_user.goal,
             explanation_language=current_user.explanation_language,
-            common_issues=[]
+            common_issues=top_issues(current_user.issue_model)
         )
     
     # Fallback to mock for backward compatibility
-    if update.name is not None:
-        mock_user_profile["name"] = update.name
-    if update.level is not None:
-        mock_user_profile["level"] = update.level
-    if update.goal is not None:
-        mock_user_profile["goal"] = update.goal
-    if update.explanation_language is not None:
-        mock_user_profile["explanation_language"] = update.explanation_language
-    
-    return UserProfile(**mock_user_profile)
+    return UserProfile(**await asyncio.to_thread(update_mock_user_profile, update.model_dump(exclude_none=True)))
 
 @router.get("/progress")
 async def get_user_progress(
@@ -75,7 +73,7 @@ async def get_user_progress(
     if current_user:
         # Basic counts
         total_sessions = db.query(DBSession).filter(DBSession.user_id == current_user.id).count()
-        total_utterances = db.query(Utterance).filter(Utterance.user_id == current_user.id).count()
+        total_utterances = db.query(func.count(Utterance.id)).filter(Utterance.user_id == current_user.id).scalar()
         vocabulary_count = db.query(DBVocabularyItem).filter(DBVocabularyItem.user_id == current_user.id).count()
         
         # Total practice time
@@ -10,20 +10,160 @@ class Settings(BaseSettings):
     hf_api_base_url: str = "https://api-inference.huggingface.co"
     hf_asr_model_id: str = "openai/whisper-small"
     hf_tts_model_id: str = "facebook/mms-tts-eng"
+    hf_llm_model_id: str = "meta-llama/Llama-3.1-8B-Instruct"
     
     # Groq (LLM)
     groq_api_key: Optional[str] = None
     groq_model_id: str = "llama-3.1-8b-instant"
+    groq_max_concurrency: int = 8  # in-flight requests per endpoint per process
+    groq_requests_per_minute: int = 30
+    groq_burst: Optional[int] = None  # token bucket size (defaults to max concurrency)
+    groq_queue_size: int = 32  # waiting requests before shedding with 503
+    groq_queue_timeout_seconds: float = 10.0
+    groq_max_retries: int = 2
+    groq_background_max_concurrency: int = 2  # summaries get their own, smaller budget
+    groq_background_requests_per_minute: int = 6
+    request_budget_seconds: float = 30.0  # user requests stop waiting on upstream limiters after this
+    tokenizer_file: Optional[str] = None  # local tokenizer.json for exact prompt token counts
+    
+    # LLM routing (Groq primary, HF router secondary when both keys are set)
+    llm_hedging_enabled: bool = True
+    llm_hedge_quantile: float = 0.95
+    llm_hedge_min_delay_seconds: float = 1.0
+    llm_hedge_max_delay_seconds: float = 8.0
+    llm_hedge_default_delay_seconds: float = 3.0
+    
+    # Circuit breakers (one per external AI provider)
+    circuit_failure_rate_threshold: float = 0.5
+    circuit_window_seconds: float = 30.0
+    circuit_min_calls: int = 10
+    circuit_open_seconds: float = 15.0
+    circuit_half_open_max_calls: int = 1
+    circuit_slow_call_seconds: Optional[float] = 20.0  # slower calls count as failures
     
     # ElevenLabs (TTS)
     elevenlabs_api_key: Optional[str] = None
     
     # Feature flags
     use_mock_ai: bool = False
+
+    # Mock provider simulation (capacity planning / load tests)
+    mock_latency_distribution: str = "fixed"  # fixed, lognormal, trace
+    mock_latency_scale: float = 1.0  # multiplier on each provider's median latency
+    mock_latency_sigma: float = 0.5  # lognormal shape parameter
+    mock_latency_trace_file: Optional[str] = None  # one latency_ms (or provider,latency_ms) per line
+    mock_llm_tokens_per_second: float = 0.0  # 0 disables token-rate streaming delay
+    mock_error_rate: float = 0.0
+    mock_timeout_rate: float = 0.0
+    mock_timeout_seconds: float = 30.0
+    mock_rate_limit_rate: float = 0.0
+    mock_retry_after_seconds: float = 1.0
+    mock_seed: Optional[int] = None
+
+    # Shared state (sessions, anonymous profile): memory:// for one worker, redis://host:6379/0 for several
+    state_backend_url: str = "memory://"
+    state_key_prefix: str = "macca:"
+    
+    # Active session registry (local cache per process, snapshots in the state backend)
+    active_session_max: int = 10000
+    active_session_idle_seconds: int = 3600
+    
+    # Conversation memory (per active session)
+    memory_recent_turns: int = 6  # exchanges kept verbatim
+    memory_summarize_batch: int = 4  # older exchanges folded into the summary at once
+    memory_token_budget: int = 1500  # summary + history tokens sent per turn
+    memory_summary_max_tokens: int = 200
+    
+    # Pronunciation guidance (per process cache of per-word LLM tips)
+    pronunciation_cache_max_words: int = 5000
+    pronunciation_cache_ttl_seconds: int = 86400
+    pronunciation_batch_max_words: int = 50
+    pronunciation_batch_llm_words: int = 12  # words per LLM call, sized to the pronunciation output budget
+    
+    # Pronunciation lexicon (CMUdict format source, compiled to a memory-mapped index)
+    lexicon_source_file: Optional[str] = None  # defaults to app/data/lexicon.txt
+    lexicon_index_file: str = "./storage/lexicon.idx"
+    
+    # Lesson content (YAML/JSON files, hot reloaded when they change)
+    lessons_dir: Optional[str] = None  # defaults to app/content/lessons
+    lessons_reload_seconds: float = 2.0  # how often to check the files for changes
+    
+    # Per-user weakness model (decayed FeedbackIssue counts on the user row)
+    issue_model_half_life_days: float = 14.0
+    issue_model_max_codes: int = 30
+    issue_model_min_count: float = 0.5  # faded issues stop being reported
+    
+    # Guided lessons
+    lesson_max_attempts_per_step: int = 3  # move on after this many turns on one step
+    lesson_min_answer_words: int = 4  # for steps without target phrases
+    
+    # Voice WebSocket sessions (/api/session/ws)
+    voice_ws_sample_rate: int = 16000  # pcm16 clients: mono 16-bit little-endian
+    voice_ws_frame_ms: int = 30
+    voice_ws_speech_threshold: float = 0.015  # frame RMS (0..1) counted as speech
+    voice_ws_pause_ms: int = 300  # short pause: transcribe what we have speculatively
+    voice_ws_endpoint_ms: int = 700  # silence that ends the learner's turn
+    voice_ws_max_utterance_seconds: float = 30.0
+    
+    # Local streaming ASR (faster-whisper); unset model = Groq ASR chunked at pauses
+    local_asr_model: Optional[str] = None  # e.g. base.en, small.en
+    local_asr_device: str = "cpu"
+    local_asr_compute_type: str = "int8"
+    local_asr_window_seconds: float = 8.0
+    local_asr_step_seconds: float = 1.0  # re-decode after this much new audio
+    
+    # Sentence-level streaming TTS
+    tts_streaming_enabled: bool = False  # HF TTS per sentence (mock mode always streams)
+    tts_sentence_lookahead: int = 2  # sentences synthesized ahead of playback
+    tts_opus_enabled: bool = True  # re-encode to Ogg Opus when ffmpeg is installed
+    tts_chunk_bytes: int = 16384
+    tts_stream_requests_per_minute: int = 20  # /session/speech/stream calls per client
+    
+    # Background jobs (python -m app.jobs.worker)
+    jobs_worker_concurrency: int = 4
+    jobs_poll_seconds: float = 1.0
+    jobs_lease_seconds: float = 300.0  # running jobs not renewed for this long are retried
+    jobs_heartbeat_seconds: float = 60.0  # how often a worker renews its running jobs' leases
+    jobs_retention_seconds: int = 7 * 86400  # done jobs are deleted after this
+    jobs_purge_interval_seconds: int = 3600
+    jobs_max_attempts: int = 5
+    jobs_backoff_base_seconds: float = 5.0
+    jobs_backoff_max_seconds: float = 600.0
+    audio_max_age_seconds: int = 3600  # temporary TTS files
+    audio_cleanup_interval_seconds: int = 1800
+    
+    # Session lifecycle (idle closing and summaries run in the job worker)
+    session_idle_close_seconds: int = 3600  # no turns for this long: closed at the last turn
+    session_close_interval_seconds: int = 300
+    session_summary_window_seconds: int = 900  # sessions ended within one window share a summary run
+    session_summary_offpeak_hours: Optional[str] = None  # UTC hours like "1-6" ("22-5" wraps); unset = any time
+    session_summary_batch_size: int = 8  # sessions per LLM call
+    session_summary_max_per_run: int = 200
     
     # Logging
     log_level: str = "INFO"
     
+    # Tracing: span per request, provider call and SQL statement (console = span trees in the log)
+    tracing_exporter: Optional[str] = None  # console, file; unset = request ids in logs only
+    tracing_file: str = "./storage/traces.jsonl"  # OTLP/JSON lines
+    tracing_sample_rate: float = 1.0
+    tracing_service_name: str = "macca-backend"
+    
+    # Event loop monitor (lag and blocking-call stacks on /api/health/metrics)
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_seconds: float = 0.1
+    loop_monitor_threshold_seconds: float = 0.1  # loop stuck this long: capture the blocking stack
+    loop_monitor_asyncio_debug: bool = False  # asyncio debug mode slow-callback reports (development)
+    loop_monitor_max_offenders: int = 50
+    
+    # Request profiler (sampled requests, or X-Profile-Token: <token>); profiles under /api/admin/profiles
+    profiler_enabled: bool = False
+    profiler_sample_rate: float = 0.0  # fraction of requests profiled without the header
+    profiler_admin_token: Optional[str] = None  # unset = header and admin endpoints disabled
+    profiler_interval_ms: float = 5.0
+    profiler_max_profiles: int = 100
+    profiler_ttl_seconds: int = 86400
+    
     # CORS
     cors_origins: str = "*"
     
@@ -1,9 +1,13 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.services.tracing import instrument_engine
 
 engine = create_engine(settings.database_url)
+if settings.tracing_exporter:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -12,4 +16,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def session_scope():
+    """Short-lived unit of work: commit on success, roll back on error, always
+    return the connection to the pool. Use this instead of get_db in routes that
+    await slow provider calls, so a pooled connection is only held for DB work."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
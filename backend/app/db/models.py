@@ -1,7 +1,8 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Text, JSON, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Float, DateTime, Text, JSON, ForeignKey, Boolean, Index
+from sqlalchemy.orm import deferred, relationship, undefer
 from sqlalchemy.sql import func
 from app.db.database import Base
+from app.db.types import CompressedJSON
 import uuid
 
 class User(Base):
@@ -14,6 +15,7 @@ class User(Base):
     goal = Column(String)  # job_interview, study, daily_conversation
     level = Column(String)  # A1, A2, B1, B2, C1, C2
     explanation_language = Column(String, default="id")  # id, en
+    issue_model = Column(JSON, nullable=True)  # decayed issue counts, see app/services/issue_model.py
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -30,9 +32,11 @@ class Session(Base):
     mode = Column(String)  # live_conversation, guided_lesson, pronunciation_coach
     topic = Column(String, nullable=True)
     lesson_id = Column(String, nullable=True)
+    lesson_step = Column(Integer, nullable=True)  # guided lessons: current step (1-based)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     ended_at = Column(DateTime(timezone=True), nullable=True)
     duration_seconds = Column(Integer, nullable=True)
+    end_reason = Column(String, nullable=True)  # "ended" (POST /session/{id}/end) or "idle"
     summary = Column(Text, nullable=True)
     
     user = relationship("User", back_populates="sessions")
@@ -48,12 +52,27 @@ class Utterance(Base):
     role = Column(String)  # user, assistant
     audio_url = Column(String, nullable=True)
     transcript = Column(Text)
-    raw_llm_json = Column(JSON, nullable=True)
+    # Full model response, compressed. Deferred with raiseload so list and
+    # analytics queries never pull it; load it with Utterance.payload_options().
+    raw_llm_json = deferred(Column("raw_llm_json_z", CompressedJSON, nullable=True), raiseload=True)
+    # Uncompressed payloads from before compression (read-only until compacted)
+    legacy_raw_llm_json = deferred(Column("raw_llm_json", JSON(none_as_null=True), nullable=True), raiseload=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     session = relationship("Session", back_populates="utterances")
     user = relationship("User", back_populates="utterances")
     feedback_issues = relationship("FeedbackIssue", back_populates="utterance")
+    
+    @classmethod
+    def payload_options(cls):
+        return (undefer(cls.raw_llm_json), undefer(cls.legacy_raw_llm_json))
+    
+    @property
+    def llm_payload(self):
+        """Model response for rows loaded with payload_options()"""
+        if self.raw_llm_json is not None:
+            return self.raw_llm_json
+        return self.legacy_raw_llm_json
 
 class FeedbackIssue(Base):
     __tablename__ = "feedback_issues"
@@ -84,4 +103,24 @@ class VocabularyItem(Base):
     last_reviewed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    user = relationship("User", back_populates="vocabulary_items")
\ No newline at end of file
+    user = relationship("User", back_populates="vocabulary_items")
+
+class Job(Base):
+    """Background work item, claimed by app.jobs workers"""
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_claim", "status", "run_at", "priority"),)
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    name = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    idempotency_key = Column(String, unique=True, nullable=True)
+    run_at = Column(DateTime, nullable=False)  # naive UTC
+    locked_by = Column(String, nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
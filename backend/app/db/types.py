@@ -0,0 +1,59 @@
+"""Custom column types"""
+
+import json
+import zlib
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used for new rows without it
+    zstandard = None
+
+# Header: magic, format version, codec
+_MAGIC = b"MJ"
+FORMAT_VERSION = 1
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+_ZSTD_LEVEL = 6
+
+def compress_json(value) -> bytes:
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None:
+        return _MAGIC + bytes([FORMAT_VERSION, CODEC_ZSTD]) + zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(raw)
+    return _MAGIC + bytes([FORMAT_VERSION, CODEC_ZLIB]) + zlib.compress(raw, 6)
+
+def decompress_json(blob: bytes):
+    blob = bytes(blob)
+    if blob[:2] != _MAGIC:
+        raise ValueError("Not a compressed JSON payload")
+    version, codec = blob[2], blob[3]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compressed JSON format version {version}")
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this payload")
+        raw = zstandard.ZstdDecompressor().decompress(blob[4:])
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(blob[4:])
+    else:
+        raise ValueError(f"Unknown compressed JSON codec {codec}")
+    return json.loads(raw)
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as a small versioned header plus a zstd (or zlib) body
+
+    Model responses compress roughly 3-5x, so the rows carrying them stay
+    small in the heap and in TOAST.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_json(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_json(value)
@@ -1,16 +1,22 @@
 from fastapi import Depends, HTTPException, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from typing import Optional
+import json
 import logging
-from app.db.database import get_db
+from app.db.database import session_scope
 from app.db.models import User
 from app.providers.mock import MockLLMProvider, MockASRProvider, MockTTSProvider
 from app.providers.groq_llm import GroqLLMProvider
+from app.providers.huggingface_llm import HuggingFaceLLMProvider
+from app.providers.router import RoutingLLMProvider
 from app.providers.huggingface_asr import HuggingFaceASRProvider
+from app.providers.chunked_asr import ChunkedStreamingASR
+from app.providers.local_asr import LocalStreamingASRProvider
+from app.providers.streaming_tts import SentenceStreamingTTS
 from app.providers.huggingface_tts import HuggingFaceTTSProvider
 from app.services.storage import StorageService
+from app.services.state_backend import state_backend
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -22,13 +28,35 @@ if settings.use_mock_ai:
 else:
     logger.info(f"🤖 AI Provider Mode: GROQ LLM + HF Audio (Groq: {settings.groq_model_id}, HF ASR/TTS)")
 
+# Routing provider keeps latency history, so it lives for the whole process
+_llm_router: Optional[RoutingLLMProvider] = None
+
+def _get_llm_router() -> RoutingLLMProvider:
+    global _llm_router
+    if _llm_router is None:
+        _llm_router = RoutingLLMProvider(
+            GroqLLMProvider(),
+            HuggingFaceLLMProvider(),
+            hedging_enabled=settings.llm_hedging_enabled,
+            hedge_quantile=settings.llm_hedge_quantile,
+            min_hedge_delay=settings.llm_hedge_min_delay_seconds,
+            max_hedge_delay=settings.llm_hedge_max_delay_seconds,
+            default_hedge_delay=settings.llm_hedge_default_delay_seconds
+        )
+    return _llm_router
+
 # Provider factories
 def get_llm_provider():
     if settings.use_mock_ai:
         return MockLLMProvider()
     if not settings.groq_api_key:
+        if settings.hf_api_key:
+            logger.warning("GROQ_API_KEY not set, using HF router LLM")
+            return HuggingFaceLLMProvider()
         logger.warning("GROQ_API_KEY not set, falling back to mock")
         return MockLLMProvider()
+    if settings.hf_api_key:
+        return _get_llm_router()
     return GroqLLMProvider()
 
 def get_asr_provider():
@@ -39,6 +67,14 @@ def get_asr_provider():
         return MockASRProvider()
     return HuggingFaceASRProvider()
 
+def get_streaming_asr_provider(asr_provider=Depends(get_asr_provider)):
+    if settings.local_asr_model and not settings.use_mock_ai:
+        try:
+            return LocalStreamingASRProvider.from_settings()
+        except ImportError:
+            logger.warning("LOCAL_ASR_MODEL set but faster-whisper is not installed, using chunked ASR")
+    return ChunkedStreamingASR(asr_provider)
+
 def get_tts_provider():
     if settings.use_mock_ai:
         return MockTTSProvider()
@@ -47,30 +83,54 @@ def get_tts_provider():
         return MockTTSProvider()
     return HuggingFaceTTSProvider(get_storage_service())
 
+def get_streaming_tts_provider():
+    """Streaming TTS, or None when only whole-reply TTS is available"""
+    if settings.use_mock_ai:
+        return SentenceStreamingTTS.from_settings(MockTTSProvider())
+    if settings.hf_api_key and settings.tts_streaming_enabled:
+        return SentenceStreamingTTS.from_settings(HuggingFaceTTSProvider(get_storage_service()))
+    return None
+
 def get_storage_service():
     return StorageService()
 
-# Optional auth - returns User or None (for backward compatibility)
-async def get_current_user_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
-    if not credentials:
+def _load_user(user_id: str) -> Optional[User]:
+    """Load a user in its own short unit of work and detach it
+
+    Auth runs before every route, so it must not pin a pooled connection for
+    the rest of the request. Column attributes stay readable on the detached
+    instance; routes that modify the user load it again in their own session.
+    """
+    with session_scope() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user:
+            db.expunge(user)
+        return user
+
+def user_from_token(token: Optional[str]) -> Optional[User]:
+    """User for a bearer token, or None if it is missing or invalid"""
+    if not token:
         return None
     try:
-        payload = jwt.decode(credentials.credentials, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         user_id: str = payload.get("sub")
         if user_id is None:
             return None
-        user = db.query(User).filter(User.id == user_id).first()
-        return user
+        return _load_user(user_id)
     except JWTError:
         return None
 
+# Optional auth - returns User or None (for backward compatibility)
+async def get_current_user_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+) -> Optional[User]:
+    if not credentials:
+        return None
+    return user_from_token(credentials.credentials)
+
 # Required auth - raises 401 if no valid token
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -79,7 +139,7 @@ async def get_current_user(
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = db.query(User).filter(User.id == user_id).first()
+        user = _load_user(user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -94,4 +154,16 @@ mock_user_profile = {
     "goal": "job_interview",
     "explanation_language": "id",
     "common_issues": []
-}
\ No newline at end of file
+}
+
+# Edits to the mock profile live in the state backend so every worker sees them
+_MOCK_PROFILE_KEY = "profile:anonymous"
+
+def get_mock_user_profile() -> dict:
+    stored = state_backend.get(_MOCK_PROFILE_KEY)
+    return {**mock_user_profile, **json.loads(stored)} if stored else dict(mock_user_profile)
+
+def update_mock_user_profile(changes: dict) -> dict:
+    profile = {**get_mock_user_profile(), **changes}
+    state_backend.set(_MOCK_PROFILE_KEY, json.dumps(profile))
+    return profile
@@ -0,0 +1,190 @@
+"""DB-backed job queue: enqueue, claim, complete and retry
+
+Jobs live in the `jobs` table, so they survive restarts and any number of
+worker processes can share the queue. A job is claimed with a
+compare-and-set UPDATE on its status, which is safe on SQLite and
+PostgreSQL alike. The worker running a job keeps renewing its lease; a
+worker that dies mid-job leaves it `running` until the lease expires,
+after which it is queued again (or failed, once its attempts are used up).
+Results are written only while the worker still holds the lease.
+"""
+
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import BackgroundTasks
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.db.database import session_scope
+from app.db.models import Job
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+# name -> async or sync callable taking the payload dict
+_handlers: Dict[str, Callable[[dict], Any]] = {}
+
+def job(name: str):
+    """Register a job handler under `name`"""
+    def register(handler: Callable[[dict], Any]):
+        _handlers[name] = handler
+        return handler
+    return register
+
+def get_handler(name: str) -> Optional[Callable[[dict], Any]]:
+    return _handlers.get(name)
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue(
+    name: str,
+    payload: Optional[dict] = None,
+    priority: int = PRIORITY_NORMAL,
+    idempotency_key: Optional[str] = None,
+    delay_seconds: float = 0.0,
+    max_attempts: Optional[int] = None
+) -> str:
+    """Queue a job and return its id
+
+    With an idempotency key, enqueueing the same work twice returns the
+    existing job's id instead of creating a duplicate.
+    """
+    if idempotency_key:
+        with session_scope() as db:
+            existing = db.query(Job.id).filter(Job.idempotency_key == idempotency_key).first()
+            if existing:
+                return existing[0]
+    try:
+        with session_scope() as db:
+            row = Job(
+                name=name,
+                payload=payload or {},
+                priority=priority,
+                idempotency_key=idempotency_key,
+                max_attempts=max_attempts or settings.jobs_max_attempts,
+                run_at=datetime.utcnow() + timedelta(seconds=delay_seconds)
+            )
+            db.add(row)
+            db.flush()
+            job_id = row.id
+    except IntegrityError:
+        # Lost a race with another request enqueueing the same key
+        with session_scope() as db:
+            return db.query(Job.id).filter(Job.idempotency_key == idempotency_key).scalar()
+    logger.info(f"Enqueued job {name} ({job_id}) priority={priority}")
+    return job_id
+
+def enqueue_after_response(background_tasks: BackgroundTasks, name: str, payload: Optional[dict] = None, **options):
+    """Queue a job once the response has been sent, keeping the insert off the request path"""
+    background_tasks.add_task(enqueue, name, payload, **options)
+
+def _requeue_expired(db, now: datetime):
+    expired = db.query(Job).filter(
+        Job.status == "running", Job.locked_at < now - timedelta(seconds=settings.jobs_lease_seconds)
+    )
+    # A job that keeps killing its worker must not be retried forever
+    failed = expired.filter(Job.attempts >= Job.max_attempts).update(
+        {
+            Job.status: "failed",
+            Job.finished_at: now,
+            Job.locked_by: None,
+            Job.locked_at: None,
+            Job.last_error: "Worker lease expired on the last attempt"
+        },
+        synchronize_session=False
+    )
+    if failed:
+        logger.error(f"Failed {failed} jobs whose worker lease expired on their last attempt")
+    count = expired.filter(Job.attempts < Job.max_attempts).update(
+        {Job.status: "queued", Job.locked_by: None, Job.locked_at: None},
+        synchronize_session=False
+    )
+    if count:
+        logger.warning(f"Requeued {count} jobs whose worker lease expired")
+
+def claim(limit: int, owner: Optional[str] = None) -> List[Job]:
+    """Claim up to `limit` due jobs, highest priority first"""
+    owner = owner or worker_id()
+    now = datetime.utcnow()
+    claimed: List[Job] = []
+    with session_scope() as db:
+        _requeue_expired(db, now)
+        candidates = db.query(Job.id).filter(
+            Job.status == "queued", Job.run_at <= now
+        ).order_by(Job.priority.desc(), Job.run_at.asc()).limit(limit * 2).all()
+        for (job_id,) in candidates:
+            won = db.query(Job).filter(Job.id == job_id, Job.status == "queued").update(
+                {Job.status: "running", Job.locked_by: owner, Job.locked_at: now, Job.attempts: Job.attempts + 1},
+                synchronize_session=False
+            )
+            if won:
+                row = db.get(Job, job_id)
+                db.refresh(row)
+                claimed.append(row)
+                if len(claimed) >= limit:
+                    break
+        for row in claimed:
+            db.expunge(row)
+    return claimed
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff, jittered so retries of a burst spread out"""
+    ceiling = min(settings.jobs_backoff_max_seconds, settings.jobs_backoff_base_seconds * 2 ** (attempts - 1))
+    return random.uniform(ceiling / 2, ceiling)
+
+def _owned(db, job: Job):
+    """The job's row, only while `job`'s worker still holds the lease"""
+    return db.query(Job).filter(Job.id == job.id, Job.status == "running", Job.locked_by == job.locked_by)
+
+def extend_lease(job: Job) -> bool:
+    """Renew the lease of a job still running; False if it has been lost"""
+    with session_scope() as db:
+        return bool(_owned(db, job).update({Job.locked_at: datetime.utcnow()}, synchronize_session=False))
+
+def complete(job: Job) -> bool:
+    with session_scope() as db:
+        won = _owned(db, job).update(
+            {Job.status: "done", Job.finished_at: datetime.utcnow(), Job.last_error: None},
+            synchronize_session=False
+        )
+    if not won:
+        logger.warning(f"Job {job.name} ({job.id}) finished after losing its lease; result discarded")
+    return bool(won)
+
+def fail(job: Job, error: str) -> bool:
+    """Schedule a retry, or mark the job failed once attempts run out"""
+    with session_scope() as db:
+        if job.attempts < job.max_attempts:
+            delay = backoff_seconds(job.attempts)
+            values = {
+                Job.status: "queued",
+                Job.run_at: datetime.utcnow() + timedelta(seconds=delay),
+                Job.locked_by: None,
+                Job.locked_at: None,
+                Job.last_error: error[:2000]
+            }
+            logger.warning(f"Job {job.name} ({job.id}) attempt {job.attempts} failed, retrying in {delay:.0f}s: {error[:200]}")
+        else:
+            values = {Job.status: "failed", Job.finished_at: datetime.utcnow(), Job.last_error: error[:2000]}
+            logger.error(f"Job {job.name} ({job.id}) failed after {job.attempts} attempts: {error[:200]}")
+        return bool(_owned(db, job).update(values, synchronize_session=False))
+
+def purge_finished(older_than_seconds: float) -> int:
+    """Delete done jobs finished more than `older_than_seconds` ago; failed ones are kept for inspection"""
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+    with session_scope() as db:
+        return db.query(Job).filter(Job.status == "done", Job.finished_at < cutoff).delete(synchronize_session=False)
+
+def queue_depth() -> Dict[str, int]:
+    with session_scope() as db:
+        return dict(db.query(Job.status, func.count(Job.id)).filter(
+            Job.status.in_(("queued", "running"))
+        ).group_by(Job.status).all())
@@ -0,0 +1,183 @@
+"""Job handlers for AI and maintenance work kept off the request path"""
+
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List
+from app.db.database import session_scope
+from app.db.models import FeedbackIssue, Session, Utterance, VocabularyItem
+from app.jobs.queue import PRIORITY_LOW, enqueue, job, purge_finished
+from app.providers.errors import ProviderError
+from app.schemas.macca import ConversationMessage
+from app.services.conversation_memory import _extractive_summary
+from app.services.issue_model import bump_user_issues
+from app.services.session_lifecycle import close_idle_sessions
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+# Anchored to backend/, not the working directory, so cron runs from $HOME still find it
+AUDIO_DIRS = (BACKEND_DIR / "storage" / "audio", Path("/tmp/storage/audio"))
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".opus", ".flac", ".webm"}
+SUMMARY_MAX_MESSAGES = 40  # per session, the most recent
+
+def _issue_code(text: str) -> str:
+    """'Past Simple tense' -> 'past_simple_tense'"""
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:64] or "other"
+
+@job("extract_feedback")
+def extract_feedback(payload: dict):
+    """Record grammar issues and new vocabulary from one assistant reply"""
+    with session_scope() as db:
+        utterance = db.query(Utterance).options(*Utterance.payload_options()).filter(
+            Utterance.id == payload["utterance_id"]
+        ).first()
+        if utterance is None or not utterance.llm_payload:
+            return
+        # Retries must not double-count issues
+        if db.query(FeedbackIssue.id).filter(FeedbackIssue.utterance_id == utterance.id).first():
+            return
+
+        response = utterance.llm_payload
+        issues = []
+        for item in response.get("grammar_feedback") or []:
+            issue_code = _issue_code(item.get("issue") or "grammar")
+            db.add(FeedbackIssue(
+                user_id=utterance.user_id,
+                session_id=utterance.session_id,
+                utterance_id=utterance.id,
+                type="grammar",
+                issue_code=issue_code,
+                detail=item
+            ))
+            issues.append(("grammar", issue_code))
+        bump_user_issues(db, utterance.user_id, issues)
+
+        words = {}
+        for item in response.get("vocabulary_feedback") or []:
+            word = (item.get("word") or "").strip().lower()
+            if word:
+                words.setdefault(word, item)
+        if words:
+            known = {w for (w,) in db.query(VocabularyItem.word).filter(
+                VocabularyItem.user_id == utterance.user_id, VocabularyItem.word.in_(list(words))
+            )}
+            for word, item in words.items():
+                if word not in known:
+                    db.add(VocabularyItem(
+                        user_id=utterance.user_id,
+                        word=word,
+                        translation=item.get("translation"),
+                        example=item.get("example"),
+                        source="conversation"
+                    ))
+        logger.info(f"Extracted feedback from utterance {utterance.id}: {len(response.get('grammar_feedback') or [])} grammar, {len(words)} vocabulary")
+
+def _transcripts(db, session_ids: List[str]) -> Dict[str, List[ConversationMessage]]:
+    """Each session's last SUMMARY_MAX_MESSAGES messages, in one query"""
+    rows = db.query(Utterance.session_id, Utterance.role, Utterance.transcript).filter(
+        Utterance.session_id.in_(session_ids)
+    ).order_by(Utterance.created_at).all()
+    transcripts: Dict[str, List[ConversationMessage]] = {session_id: [] for session_id in session_ids}
+    for session_id, role, text in rows:
+        if role in ("user", "assistant") and text:
+            transcripts[session_id].append(ConversationMessage(role=role, content=text[:500]))
+    return {session_id: messages[-SUMMARY_MAX_MESSAGES:] for session_id, messages in transcripts.items()}
+
+async def _summarize_batch(llm_provider, transcripts: Dict[str, List[ConversationMessage]]) -> Dict[str, str]:
+    summarize_many = getattr(llm_provider, "summarize_sessions", None)
+    summarize_one = getattr(llm_provider, "summarize_conversation", None)
+    summaries: Dict[str, str] = {}
+    try:
+        if summarize_many:
+            summaries = await summarize_many(transcripts)
+        elif summarize_one:
+            for session_id, messages in transcripts.items():
+                summaries[session_id] = await summarize_one(None, messages)
+    except (ProviderError, ValueError) as e:
+        # ValueError: a completion that could not be parsed
+        logger.warning(f"Session summaries failed, using extractive fallback: {e}")
+    # Sessions the LLM skipped still get a summary
+    for session_id, messages in transcripts.items():
+        if not summaries.get(session_id):
+            summaries[session_id] = _extractive_summary(None, messages)
+    return summaries
+
+@job("summarize_session")
+async def summarize_session(payload: dict):
+    """Write Session.summary for one session right away"""
+    session_id = payload["session_id"]
+    with session_scope() as db:
+        transcripts = _transcripts(db, [session_id])
+    if not transcripts[session_id]:
+        return
+
+    from app.dependencies import get_llm_provider
+    summaries = await _summarize_batch(get_llm_provider(), transcripts)
+    with session_scope() as db:
+        db.query(Session).filter(Session.id == session_id).update({Session.summary: summaries[session_id]})
+    logger.info(f"Summarized session {session_id} ({len(transcripts[session_id])} messages)")
+
+@job("summarize_sessions")
+async def summarize_sessions(payload: dict):
+    """Summarize ended sessions without a summary, several per LLM call"""
+    limit = settings.session_summary_max_per_run
+    with session_scope() as db:
+        session_ids = [session_id for (session_id,) in db.query(Session.id).filter(
+            Session.ended_at.isnot(None), Session.summary.is_(None)
+        ).order_by(Session.ended_at).limit(limit)]
+        transcripts = _transcripts(db, session_ids) if session_ids else {}
+    if not session_ids:
+        return
+
+    from app.dependencies import get_llm_provider
+    llm_provider = get_llm_provider()
+    # Sessions without turns get an empty summary so they are not picked up again
+    summaries = {session_id: "" for session_id, messages in transcripts.items() if not messages}
+    pending = [session_id for session_id, messages in transcripts.items() if messages]
+    size = max(1, settings.session_summary_batch_size)
+    for i in range(0, len(pending), size):
+        batch = {session_id: transcripts[session_id] for session_id in pending[i:i + size]}
+        summaries.update(await _summarize_batch(llm_provider, batch))
+
+    with session_scope() as db:
+        for session_id, summary in summaries.items():
+            db.query(Session).filter(Session.id == session_id).update({Session.summary: summary})
+    logger.info(f"Summarized {len(pending)} sessions in {(len(pending) + size - 1) // size} LLM calls")
+
+    if len(session_ids) == limit:
+        # More waiting: keep going in another run instead of one long job
+        enqueue("summarize_sessions", priority=PRIORITY_LOW, idempotency_key=f"summarize_sessions:after:{session_ids[-1]}")
+
+@job("close_idle_sessions")
+def close_idle(payload: dict):
+    return close_idle_sessions()
+
+@job("cleanup_audio")
+def cleanup_audio(payload: dict):
+    """Delete temporary TTS audio older than AUDIO_MAX_AGE_SECONDS"""
+    cutoff = time.time() - payload.get("max_age_seconds", settings.audio_max_age_seconds)
+    deleted = 0
+    for directory in AUDIO_DIRS:
+        if not directory.exists():
+            continue
+        for path in directory.iterdir():
+            try:
+                if path.suffix in AUDIO_EXTENSIONS and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    deleted += 1
+            except FileNotFoundError:
+                pass  # removed by another worker
+    if deleted:
+        logger.info(f"Deleted {deleted} old audio files")
+    return deleted
+
+@job("purge_jobs")
+def purge_jobs(payload: dict):
+    """Delete done jobs older than JOBS_RETENTION_SECONDS"""
+    deleted = purge_finished(payload.get("retention_seconds", settings.jobs_retention_seconds))
+    if deleted:
+        logger.info(f"Purged {deleted} finished jobs")
+    return deleted
@@ -0,0 +1,126 @@
+"""Asyncio job worker: python -m app.jobs.worker
+
+Polls the queue, runs up to `jobs_worker_concurrency` handlers at once
+(sync handlers in threads) and re-enqueues periodic maintenance work.
+Run as many worker processes as needed; they coordinate through the DB.
+"""
+
+import asyncio
+import inspect
+import logging
+import signal
+import time
+from typing import Dict, Optional, Set
+from app.jobs import tasks  # noqa: F401 (registers the job handlers)
+from app.jobs.queue import PRIORITY_LOW, claim, complete, enqueue, extend_lease, fail, get_handler, worker_id
+from app.db.models import Job
+from app.services.tracing import LOG_FORMAT, install_log_filter, request_id_var, span
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def periodic_jobs():
+    """(job name, interval seconds) for the maintenance jobs every worker schedules"""
+    return (
+        ("cleanup_audio", settings.audio_cleanup_interval_seconds),
+        ("close_idle_sessions", settings.session_close_interval_seconds),
+        ("purge_jobs", settings.jobs_purge_interval_seconds)
+    )
+
+class JobWorker:
+    def __init__(self, concurrency: int = 4, poll_seconds: float = 1.0, heartbeat_seconds: Optional[float] = None):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds or settings.jobs_heartbeat_seconds
+        self.owner = worker_id()
+        self._running: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._next_run: Dict[str, float] = {}
+
+    async def execute(self, job: Job):
+        handler = get_handler(job.name)
+        if handler is None:
+            fail(job, f"No handler registered for job {job.name}")
+            return
+        started = time.monotonic()
+        request_token = request_id_var.set(f"job-{job.id}")
+        heartbeat = asyncio.create_task(self.heartbeat(job))
+        try:
+            with span(f"job {job.name}", root=True, job__id=job.id, job__attempt=job.attempts):
+                if inspect.iscoroutinefunction(handler):
+                    await handler(job.payload)
+                else:
+                    await asyncio.to_thread(handler, job.payload)
+        except Exception as e:
+            fail(job, f"{type(e).__name__}: {e}")
+            return
+        finally:
+            heartbeat.cancel()
+            request_id_var.reset(request_token)
+        if not complete(job):
+            return
+        logger.info(f"Job {job.name} ({job.id}) done in {time.monotonic() - started:.2f}s")
+
+    async def heartbeat(self, job: Job):
+        """Renew the job's lease while it runs, so long jobs are not retried elsewhere"""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            if not await asyncio.to_thread(extend_lease, job):
+                logger.warning(f"Job {job.name} ({job.id}) lost its lease to another worker")
+                return
+
+    def schedule_maintenance(self):
+        # One run per interval across all workers, thanks to the idempotency key
+        now = time.time()
+        for name, interval in periodic_jobs():
+            if now < self._next_run.get(name, 0.0):
+                continue
+            self._next_run[name] = now + interval
+            enqueue(name, priority=PRIORITY_LOW, idempotency_key=f"{name}:{int(now // interval)}")
+
+    async def run_once(self) -> int:
+        """Claim and run one batch of due jobs; returns how many ran"""
+        jobs = claim(self.concurrency, self.owner)
+        if jobs:
+            await asyncio.gather(*(self.execute(job) for job in jobs))
+        return len(jobs)
+
+    async def run(self):
+        logger.info(f"Job worker {self.owner} started (concurrency={self.concurrency})")
+        while not self._stopping.is_set():
+            self.schedule_maintenance()
+            free = self.concurrency - len(self._running)
+            jobs = claim(free, self.owner) if free > 0 else []
+            for job in jobs:
+                task = asyncio.create_task(self.execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            elif free <= len(jobs):
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+        if self._running:
+            logger.info(f"Job worker stopping, waiting for {len(self._running)} jobs")
+            await asyncio.wait(self._running)
+
+    def stop(self):
+        self._stopping.set()
+
+def main(concurrency: Optional[int] = None):
+    logging.basicConfig(level=settings.log_level.upper(), format=LOG_FORMAT)
+    install_log_filter()
+    worker = JobWorker(concurrency or settings.jobs_worker_concurrency, settings.jobs_poll_seconds)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
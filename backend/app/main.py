@@ -1,19 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pathlib import Path
 import os
 import logging
 
 from app.config import settings
-from app.api import user, session, pronunciation, lessons, auth, vocabulary, health
+from app.api import user, session, session_ws, pronunciation, lessons, auth, vocabulary, health, admin
+from app.providers.errors import ProviderError
+from app.services.lexicon import load_lexicon
+from app.services.lesson_store import lesson_store
+from app.services.loop_monitor import LoopMonitorMiddleware
+from app.services.profiler import ProfilerMiddleware
+from app.services.tracing import LOG_FORMAT, TracingMiddleware, install_log_filter
 
 # Configure logging
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
     level=getattr(logging, log_level),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    format=LOG_FORMAT
 )
+install_log_filter()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -47,6 +55,15 @@ def validate_startup_config():
 
 validate_startup_config()
 
+# Map the pronunciation lexicon once per worker (rebuilt here if its source changed)
+try:
+    load_lexicon()
+except Exception as e:
+    logger.warning(f"Pronunciation lexicon unavailable, using spelling rules only: {e}")
+
+# Parse and pre-serialize lesson content once per worker
+lesson_store.load()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +73,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Event loop lag / blocking-call detection (report on /api/health/metrics)
+if settings.loop_monitor_enabled:
+    app.add_middleware(LoopMonitorMiddleware)
+
+# Opt-in per-request sampling profiler (profiles under /api/admin/profiles)
+if settings.profiler_enabled:
+    app.add_middleware(ProfilerMiddleware)
+
+# Outermost: request id for logs and profiles, root span when TRACING_EXPORTER is set
+app.add_middleware(TracingMiddleware)
+
+# Upstream AI failures: 429/503 tell clients to back off, anything else is a bad gateway
+@app.exception_handler(ProviderError)
+async def provider_error_handler(request: Request, exc: ProviderError):
+    status_code = exc.status_code if exc.status_code in (429, 503, 504) else 502
+    headers = {}
+    if exc.retry_after:
+        headers["Retry-After"] = str(max(1, int(round(exc.retry_after))))
+    logger.warning(f"{request.method} {request.url.path} - provider={exc.provider} status={status_code}: {exc}")
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": "AI service is busy, please try again" if status_code in (429, 503) else "AI service unavailable"},
+        headers=headers
+    )
+
 # Create storage directory only if not on serverless (Vercel has read-only filesystem)
 try:
     storage_dir = Path("./storage")
@@ -73,9 +115,11 @@ app.include_router(health.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 app.include_router(user.router, prefix="/api")
 app.include_router(session.router, prefix="/api")
+app.include_router(session_ws.router, prefix="/api")
 app.include_router(pronunciation.router, prefix="/api")
 app.include_router(vocabulary.router, prefix="/api")
 app.include_router(lessons.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 @app.get("/api/")
 async def root():
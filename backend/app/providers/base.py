@@ -1,4 +1,5 @@
-from typing import Protocol
+from dataclasses import dataclass
+from typing import AsyncIterator, Protocol
 from app.schemas.macca import MaccaJsonResponse, UserProfile, SessionContext
 
 class ASRProvider(Protocol):
@@ -6,6 +7,25 @@ class ASRProvider(Protocol):
         """Transcribe audio to text"""
         ...
 
+@dataclass(frozen=True)
+class TranscriptHypothesis:
+    text: str  # full transcript so far, not just the newest words
+    is_final: bool = False
+
+class StreamingASRProvider(Protocol):
+    def stream_transcribe(
+        self,
+        audio_chunks: AsyncIterator[bytes],
+        sample_rate: int = 16000,
+        language: str = "en"
+    ) -> AsyncIterator[TranscriptHypothesis]:
+        """Transcribe mono PCM16 audio while it arrives
+
+        Yields partial hypotheses as they improve and exactly one final
+        hypothesis after `audio_chunks` is exhausted.
+        """
+        ...
+
 class LLMProvider(Protocol):
     async def generate_macca_response(
         self, 
@@ -19,4 +39,22 @@ class LLMProvider(Protocol):
 class TTSProvider(Protocol):
     async def synthesize_speech(self, text: str, language: str = "en") -> str:
         """Generate speech audio and return URL"""
+        ...
+
+@dataclass(frozen=True)
+class AudioChunk:
+    data: bytes  # whole encoded frames (Ogg pages for Opus), playable in order
+    mime_type: str
+    sentence: int  # index of the sentence this audio speaks
+    text: str  # that sentence, for captions
+
+class StreamingTTSProvider(Protocol):
+    mime_type: str
+    
+    def stream_speech(self, text_chunks: AsyncIterator[str], language: str = "en") -> AsyncIterator[AudioChunk]:
+        """Synthesize text as it arrives, one sentence at a time
+
+        Audio for a sentence is yielded as soon as it is ready, while later
+        sentences are still being written or synthesized.
+        """
         ...
\ No newline at end of file
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from typing import AsyncIterator, List
+from app.providers.base import ASRProvider, TranscriptHypothesis
+from app.services.endpointing import Endpointer, pcm_to_wav
+
+logger = logging.getLogger(__name__)
+
+class ChunkedStreamingASR:
+    """Streaming ASR on top of a one-shot provider (Groq Whisper)
+
+    Incoming audio is cut at the learner's pauses and each finished segment
+    is transcribed right away, concurrently with the rest of the speech.
+    When the stream ends only the audio after the last pause is left to
+    transcribe, instead of the whole recording.
+    """
+
+    def __init__(self, provider: ASRProvider):
+        self.provider = provider
+
+    async def _transcribe(self, pcm: bytes, sample_rate: int, language: str) -> str:
+        return (await self.provider.transcribe_audio(pcm_to_wav(pcm, sample_rate), language)).strip()
+
+    async def stream_transcribe(
+        self,
+        audio_chunks: AsyncIterator[bytes],
+        sample_rate: int = 16000,
+        language: str = "en"
+    ) -> AsyncIterator[TranscriptHypothesis]:
+        segmenter = Endpointer.from_settings(sample_rate, endpointing=False)
+        segments: List[asyncio.Task] = []
+        texts: List[str] = []  # transcripts of the leading finished segments
+        cut = 0
+        speech_at_cut = 0
+        chunks = audio_chunks.__aiter__()
+        next_chunk = asyncio.ensure_future(chunks.__anext__())
+        try:
+            while True:
+                waiting = {next_chunk}
+                if len(texts) < len(segments):
+                    waiting.add(segments[len(texts)])
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                # Partials only ever extend: segments are reported in order
+                grew = False
+                while len(texts) < len(segments) and segments[len(texts)].done():
+                    texts.append(segments[len(texts)].result())
+                    grew = True
+                if grew:
+                    yield TranscriptHypothesis(" ".join(t for t in texts if t))
+
+                if not next_chunk.done():
+                    continue
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                next_chunk = asyncio.ensure_future(chunks.__anext__())
+
+                segmenter.feed(chunk)
+                for pause in segmenter.pauses[len(segments):]:
+                    segments.append(asyncio.create_task(
+                        self._transcribe(bytes(segmenter.audio[cut:pause]), sample_rate, language)
+                    ))
+                    cut = pause
+                    speech_at_cut = segmenter.speech_frames
+
+            if segmenter.speech_frames > speech_at_cut:
+                segments.append(asyncio.create_task(
+                    self._transcribe(bytes(segmenter.audio[cut:]), sample_rate, language)
+                ))
+            texts = await asyncio.gather(*segments)
+            logger.info(f"Chunked ASR: {len(segments)} segments, {len(segmenter.audio)} bytes")
+            yield TranscriptHypothesis(" ".join(t for t in texts if t), is_final=True)
+        finally:
+            next_chunk.cancel()
+            for task in segments:
+                task.cancel()
@@ -0,0 +1,168 @@
+"""Circuit breaker that fails fast while an external AI provider is unhealthy"""
+
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+import httpx
+from app.providers.errors import ProviderError, ProviderRateLimitError
+from app.providers.limiter import UpstreamOverloadedError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(ProviderError):
+    """Call rejected without contacting the provider because its circuit is open"""
+
+    def __init__(self, provider: str, retry_after: Optional[float] = None):
+        super().__init__(f"{provider} circuit open", provider=provider, status_code=503, retry_after=retry_after)
+
+def _counts_as_failure(exc: BaseException) -> bool:
+    # Rate limiting and local load shedding mean "busy", not "broken"
+    if isinstance(exc, (ProviderRateLimitError, UpstreamOverloadedError, CircuitOpenError)):
+        return False
+    # Client errors (bad prompt, revoked key) are the request's fault, not the
+    # provider's: only 5xx, timeouts and transport errors judge its health
+    if isinstance(exc, ProviderError):
+        return exc.status_code is None or exc.status_code >= 500
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.HTTPError)
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a sliding time window
+
+    Closed: calls pass through and outcomes are recorded. When at least
+    `min_calls` calls in the last `window_seconds` have a failure rate at or
+    above the threshold, the circuit opens and calls fail fast for
+    `open_seconds`. It then goes half-open and lets `half_open_max_calls`
+    probes through; a successful probe closes it, a failed one re-opens it.
+    Calls slower than `slow_call_seconds` count as failures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        window_seconds: float = 30.0,
+        min_calls: int = 10,
+        open_seconds: float = 15.0,
+        half_open_max_calls: int = 1,
+        slow_call_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.slow_call_seconds = slow_call_seconds
+
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (timestamp, failed)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def failure_rate(self) -> float:
+        self._trim(time.monotonic())
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, failed in self._outcomes if failed) / len(self._outcomes)
+
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit {self.name}: {self.state} -> {state}")
+            self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+        self._half_open_in_flight = 0
+
+    def _before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError; True if it is a half-open probe"""
+        if self.state == OPEN:
+            remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, retry_after=remaining)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, retry_after=1.0)
+            self._half_open_in_flight += 1
+            return True
+        return False
+
+    def _record(self, failed: bool, probe: bool):
+        now = time.monotonic()
+        if probe:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN if failed else CLOSED)
+            return
+        if self.state != CLOSED:
+            # Started before the circuit opened: neither re-open (resetting
+            # the open timer) nor judge the half-open probe with it
+            return
+        self._outcomes.append((now, failed))
+        self._trim(now)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate() >= self.failure_rate_threshold:
+            self._transition(OPEN)
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        probe = self._before_call()
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, Exception) and _counts_as_failure(e):
+                self._record(True, probe)
+            elif probe and self.state == HALF_OPEN:
+                # Cancelled or non-health error: free the probe slot without judging
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            raise
+        slow = self.slow_call_seconds is not None and time.monotonic() - start > self.slow_call_seconds
+        self._record(slow, probe)
+        return result
+
+    def snapshot(self) -> dict:
+        snapshot = {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "calls_in_window": len(self._outcomes),
+            "rejected": self.rejected
+        }
+        if self.state == OPEN:
+            snapshot["retry_in_seconds"] = round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 2)
+        return snapshot
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Shared breaker per provider, so every request sees the same health state"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(
+            name,
+            failure_rate_threshold=settings.circuit_failure_rate_threshold,
+            window_seconds=settings.circuit_window_seconds,
+            min_calls=settings.circuit_min_calls,
+            open_seconds=settings.circuit_open_seconds,
+            half_open_max_calls=settings.circuit_half_open_max_calls,
+            slow_call_seconds=settings.circuit_slow_call_seconds
+        )
+    return _breakers[name]
+
+def breaker_states() -> Dict[str, dict]:
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
@@ -0,0 +1,31 @@
+from typing import Optional
+
+
+class ProviderError(Exception):
+    """Failure talking to an external AI provider (or a simulated one)"""
+
+    def __init__(
+        self,
+        message: str,
+        provider: Optional[str] = None,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ProviderRateLimitError(ProviderError):
+    """Upstream answered 429 Too Many Requests"""
+
+    def __init__(self, message: str, provider: Optional[str] = None, retry_after: Optional[float] = None):
+        super().__init__(message, provider=provider, status_code=429, retry_after=retry_after)
+
+
+class ProviderTimeoutError(ProviderError):
+    """Upstream did not answer within the client timeout"""
+
+    def __init__(self, message: str, provider: Optional[str] = None):
+        super().__init__(message, provider=provider, status_code=504)
@@ -1,18 +1,47 @@
 import httpx
 import json
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
 from app.providers.base import LLMProvider
-from app.schemas.macca import UserProfile, SessionContext, MaccaJsonResponse
+from app.providers.errors import ProviderError
+from app.providers.limiter import get_limiter, request_deadline_var
+from app.providers.circuit_breaker import get_breaker
+from app.schemas.macca import UserProfile, SessionContext, MaccaJsonResponse, ConversationMessage
+from app.services.prompt_assembly import assemble_messages, log_usage
+from app.services.tracing import traced
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+def parse_session_summaries(content: str, keys: List[str]) -> Dict[str, str]:
+    """Map a {"summaries": {"1": "..."}} completion back to session keys
+
+    Anything else (invalid JSON, wrong shape) yields {}, so the caller falls
+    back to extractive summaries instead of failing the whole batch.
+    """
+    try:
+        summaries = json.loads(content).get("summaries")
+    except (ValueError, AttributeError):
+        summaries = None
+    if not isinstance(summaries, dict):
+        logger.warning(f"Unexpected session summaries completion: {content[:200]!r}")
+        return {}
+    return {
+        keys[int(number) - 1]: str(text).strip()
+        for number, text in summaries.items()
+        if str(number).isdigit() and 0 < int(number) <= len(keys) and text
+    }
+
 class GroqLLMProvider(LLMProvider):
     def __init__(self):
         self.api_key = settings.groq_api_key
         self.model_id = settings.groq_model_id
         self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.limiter = get_limiter("groq_chat")
+        self.breaker = get_breaker("groq_chat")
+        # Summaries run in the background; they must not shed or trip user turns
+        self.background_limiter = get_limiter("groq_background", background=True)
+        self.background_breaker = get_breaker("groq_background")
     
     def _build_system_prompt(self, user_profile: UserProfile, session_context: SessionContext) -> str:
         mode = session_context.mode
@@ -36,13 +65,45 @@ Your response MUST be valid JSON with this structure:
 
 IMPORTANT: Always respond in ENGLISH. Keep replies natural and conversational."""
 
-        if mode == "live":
+        if mode == "live_conversation":
             base_prompt += "\n\nLive Mode: Have natural conversations. Provide feedback after each turn."
-        elif mode == "guided":
-            base_prompt += f"\n\nGuided Mode: Current task: {session_context.current_task or 'General practice'}. Guide the learner through structured exercises."
+        elif mode == "guided_lesson":
+            grammar = ", ".join(session_context.target_grammar) or "General practice"
+            base_prompt += f"\n\nGuided Mode: Current task: {session_context.lesson_objective or grammar}. Guide the learner through structured exercises."
+            if session_context.target_grammar:
+                base_prompt += f"\nTarget grammar: {grammar}"
+            if session_context.target_vocabulary:
+                base_prompt += f"\nTarget vocabulary: {', '.join(session_context.target_vocabulary)}"
+        elif mode == "pronunciation_coach":
+            base_prompt += "\n\nPronunciation Mode: Focus on pronunciation_feedback. Keep the reply to one or two short sentences."
+        
+        if user_profile.common_issues:
+            base_prompt += f"\n\nLearner's recurring mistakes (watch for these, most frequent first): {', '.join(user_profile.common_issues)}"
+        
+        if session_context.short_summary:
+            base_prompt += f"\n\nConversation so far (summary): {session_context.short_summary}"
         
         return base_prompt
     
+    async def _post(
+        self, client: httpx.AsyncClient, payload: dict, headers: dict, background: bool = False
+    ) -> httpx.Response:
+        # Chat completions have no side effects, so retries are safe
+        limiter = self.background_limiter if background else self.limiter
+        response = await limiter.run(
+            lambda: client.post(self.api_url, json=payload, headers=headers),
+            deadline=None if background else request_deadline_var.get()
+        )
+        if response.status_code != 200:
+            logger.error(f"Groq API error {response.status_code}: {response.text}")
+            raise ProviderError(
+                f"Groq API returned {response.status_code}",
+                provider=limiter.name,
+                status_code=response.status_code
+            )
+        return response
+    
+    @traced("llm.generate")
     async def generate_macca_response(
         self, 
         user_text: str, 
@@ -51,16 +112,20 @@ IMPORTANT: Always respond in ENGLISH. Keep replies natural and conversational.""
     ) -> MaccaJsonResponse:
         system_prompt = self._build_system_prompt(user_profile, session_context)
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_text}
-        ]
+        # System prompt, recent history trimmed to the mode's budget, then the utterance
+        prompt = assemble_messages(
+            system_prompt,
+            user_text,
+            session_context.mode,
+            history=session_context.recent_turns,
+            model_id=self.model_id
+        )
         
         payload = {
             "model": self.model_id,
-            "messages": messages,
+            "messages": prompt.messages,
             "temperature": 0.7,
-            "max_tokens": 2048,
+            "max_tokens": prompt.max_tokens,
             "response_format": {"type": "json_object"}
         }
         
@@ -71,13 +136,10 @@ IMPORTANT: Always respond in ENGLISH. Keep replies natural and conversational.""
         
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(self.api_url, json=payload, headers=headers)
-                
-                if response.status_code != 200:
-                    logger.error(f"Groq API error {response.status_code}: {response.text}")
-                    raise Exception(f"Groq API returned {response.status_code}")
+                response = await self.breaker.call(lambda: self._post(client, payload, headers))
                 
                 result = response.json()
+                log_usage("groq", self.model_id, session_context.mode, prompt.prompt_tokens, result.get("usage"))
                 content = result["choices"][0]["message"]["content"]
                 
                 data = json.loads(content)
@@ -91,3 +153,71 @@ IMPORTANT: Always respond in ENGLISH. Keep replies natural and conversational.""
         except Exception as e:
             logger.error(f"Groq LLM error: {e}")
             raise
+    
+    @traced("llm.summarize")
+    async def summarize_conversation(self, previous_summary: Optional[str], messages: List[ConversationMessage]) -> str:
+        """Fold older turns into the running summary with a short, cheap completion"""
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        payload = {
+            "model": self.model_id,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Update the running summary of an English speaking practice session. "
+                               "Keep what the learner shared about themselves, topics covered and recurring mistakes. "
+                               "Answer with the summary only, at most 80 words."
+                },
+                {
+                    "role": "user",
+                    "content": f"Current summary: {previous_summary or 'None'}\n\nNew turns:\n{transcript}"
+                }
+            ],
+            "temperature": 0.2,
+            "max_tokens": settings.memory_summary_max_tokens
+        }
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await self.background_breaker.call(
+                lambda: self._post(client, payload, headers, background=True)
+            )
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    @traced("llm.summarize_sessions")
+    async def summarize_sessions(self, sessions: Dict[str, List[ConversationMessage]]) -> Dict[str, str]:
+        """Summarize several finished sessions in one completion, keyed like `sessions`
+
+        Sessions the model leaves out are missing from the result.
+        """
+        keys = list(sessions)
+        blocks = "\n\n".join(
+            f"Session {i + 1}:\n" + "\n".join(f"{m.role}: {m.content}" for m in sessions[key])
+            for i, key in enumerate(keys)
+        )
+        payload = {
+            "model": self.model_id,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Summarize each finished English speaking practice session for the learner's history: "
+                               "topics covered, what the learner shared and recurring mistakes, at most 60 words each. "
+                               'Answer in JSON: {"summaries": {"1": "...", "2": "..."}} keyed by session number.'
+                },
+                {"role": "user", "content": blocks}
+            ],
+            "temperature": 0.2,
+            "max_tokens": settings.memory_summary_max_tokens * len(keys),
+            "response_format": {"type": "json_object"}
+        }
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await self.background_breaker.call(
+                lambda: self._post(client, payload, headers, background=True)
+            )
+        content = response.json()["choices"][0]["message"]["content"]
+        return parse_session_summaries(content, keys)
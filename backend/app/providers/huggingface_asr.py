@@ -1,8 +1,10 @@
 import logging
 import httpx
-import tempfile
-import os
 from typing import Optional
+from app.providers.errors import ProviderError
+from app.providers.limiter import get_limiter, request_deadline_var
+from app.providers.circuit_breaker import get_breaker
+from app.services.tracing import traced
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -11,8 +13,11 @@ class HuggingFaceASRProvider:
     def __init__(self):
         self.api_key = settings.groq_api_key
         self.api_url = "https://api.groq.com/openai/v1/audio/transcriptions"
+        self.limiter = get_limiter("groq_audio")
+        self.breaker = get_breaker("groq_audio")
         logger.info(f"Initialized Groq ASR Provider with whisper-large-v3")
     
+    @traced("asr.transcribe")
     async def transcribe_audio(self, audio_bytes: bytes, language: Optional[str] = "en") -> str:
         """Transcribe audio using Groq Whisper API"""
         
@@ -20,44 +25,33 @@ class HuggingFaceASRProvider:
             logger.warning("Empty audio bytes provided to ASR")
             return "Unable to transcribe audio"
         
-        temp_file = None
-        try:
-            logger.info(f"Transcribing audio ({len(audio_bytes)} bytes) with Groq Whisper")
-            
-            # Save to temp file (Groq needs multipart/form-data)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as f:
-                f.write(audio_bytes)
-                temp_file = f.name
-            
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            
+        logger.info(f"Transcribing audio ({len(audio_bytes)} bytes) with Groq Whisper")
+        
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        # Bytes are re-sent as-is on retry; transcription is idempotent
+        # WAV comes from PCM streamed over the voice WebSocket; uploads are webm
+        if audio_bytes[:4] == b"RIFF":
+            files = {"file": ("audio.wav", audio_bytes, "audio/wav")}
+        else:
+            files = {"file": ("audio.webm", audio_bytes, "audio/webm")}
+        data = {"model": "whisper-large-v3"}
+        
+        async def post() -> httpx.Response:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                with open(temp_file, 'rb') as audio_file:
-                    files = {"file": ("audio.webm", audio_file, "audio/webm")}
-                    data = {"model": "whisper-large-v3"}
-                    
-                    response = await client.post(
-                        self.api_url,
-                        headers=headers,
-                        files=files,
-                        data=data
-                    )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    transcript = result.get("text", "")
-                    logger.info(f"ASR transcription: {transcript[:100]}")
-                    return transcript
-                else:
-                    logger.warning(f"Groq ASR API returned {response.status_code}: {response.text[:200]}")
-                    return "[Audio transcription unavailable]"
-            
-        except Exception as e:
-            logger.error(f"Groq ASR error: {e}")
-            return "[Audio transcription unavailable]"
-        finally:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
\ No newline at end of file
+                response = await self.limiter.run(
+                    lambda: client.post(self.api_url, headers=headers, files=files, data=data),
+                    deadline=request_deadline_var.get()
+                )
+            if response.status_code != 200:
+                logger.warning(f"Groq ASR API returned {response.status_code}: {response.text[:200]}")
+                raise ProviderError(
+                    f"Groq ASR returned {response.status_code}",
+                    provider="groq_audio",
+                    status_code=response.status_code
+                )
+            return response
+        
+        response = await self.breaker.call(post)
+        transcript = response.json().get("text", "")
+        logger.info(f"ASR transcription: {transcript[:100]}")
+        return transcript
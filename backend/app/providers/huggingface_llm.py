@@ -3,22 +3,104 @@ import json
 import re
 import logging
 from typing import Optional
+from app.providers.errors import ProviderError
+from app.providers.circuit_breaker import get_breaker
+from app.services.prompt_assembly import assemble_messages, log_usage
 from app.config import settings
 
 logger = logging.getLogger(__name__)
+from app.services.tracing import traced
 from app.schemas.macca import (
     MaccaJsonResponse, MaccaFeedback, GrammarFeedback, 
     VocabularyFeedback, PronunciationFeedback, Drill,
     UserProfile, SessionContext
 )
 
+# Appended to the system prompt in order while they fit the mode's token budget
+FEW_SHOT_EXAMPLES = [
+    """Example 1 (live_conversation with grammar issue):
+User: "I go to market yesterday."
+Response:
+{
+  "reply": "Oh, you went to the market yesterday! That's great. What did you buy there?",
+  "feedback": {
+    "better_sentence": "I went to the market yesterday.",
+    "grammar": [{
+      "issue": "past_tense",
+      "original_text": "I go to market yesterday",
+      "explanation_language": "id",
+      "explanation": "Gunakan 'went' (past tense) untuk kejadian kemarin, bukan 'go' (present tense).",
+      "examples": ["I went to school yesterday.", "She went home early."]
+    }],
+    "vocabulary": [],
+    "pronunciation": []
+  },
+  "drills": [{
+    "type": "repeat_sentence",
+    "instruction": "Please repeat this corrected sentence:",
+    "sentence": "I went to the market yesterday."
+  }],
+  "next_prompt": "What did you buy at the market?"
+}""",
+    """Example 2 (guided_lesson focusing on past simple):
+User: "I work at a bank for three years."
+Response:
+{
+  "reply": "Good try! When talking about past experience, we use past tense. Let's practice.",
+  "feedback": {
+    "better_sentence": "I worked at a bank for three years.",
+    "grammar": [{
+      "issue": "past_simple",
+      "original_text": "I work at a bank for three years",
+      "explanation_language": "en",
+      "explanation": "Use past simple 'worked' for completed past actions.",
+      "examples": ["I worked there from 2018 to 2021.", "She studied English for five years."]
+    }],
+    "vocabulary": [],
+    "pronunciation": []
+  },
+  "drills": [{
+    "type": "short_answer",
+    "instruction": "Now tell me: Where did you study?",
+    "question": "Where did you study?"
+  }],
+  "next_prompt": "Tell me about your previous job using past tense."
+}""",
+    """Example 3 (pronunciation_coach):
+User: "I sink the answer is correct."
+Response:
+{
+  "reply": "Good effort! Let's work on the 'th' sound in 'think'.",
+  "feedback": {
+    "better_sentence": null,
+    "grammar": [],
+    "vocabulary": [],
+    "pronunciation": [{
+      "word": "think",
+      "target_sound": "/θ/",
+      "issue": "Pronounced as /s/ instead of /θ/",
+      "tip": "Place your tongue between your teeth and blow air gently.",
+      "severity": "medium"
+    }]
+  },
+  "drills": [{
+    "type": "repeat_sentence",
+    "instruction": "Practice this sentence with the 'th' sound:",
+    "sentence": "I think the answer is correct."
+  }],
+  "next_prompt": "Now try saying: 'I think about it every day.'"
+}""",
+]
+
 class HuggingFaceLLMProvider:
     def __init__(self):
         self.api_key = settings.hf_api_key
         self.model_id = settings.hf_llm_model_id
         self.base_url = settings.hf_api_base_url
+        self.breaker = get_breaker("hf_llm")
         logger.info(f"Initialized HF LLM Provider with model: {self.model_id}, base: {self.base_url}")
     
+    @traced("llm.generate")
     async def generate_macca_response(
         self, 
         user_text: str, 
@@ -35,14 +117,20 @@ class HuggingFaceLLMProvider:
         system_prompt = self._build_system_prompt(user_profile, session_context)
         user_prompt = f"User said: '{user_text}'\n\nProvide your response as valid JSON:"
         
+        prompt = assemble_messages(
+            system_prompt,
+            user_prompt,
+            session_context.mode,
+            history=session_context.recent_turns,
+            examples=FEW_SHOT_EXAMPLES,
+            model_id=self.model_id
+        )
+        
         # Use chat completions format for Router API
         payload = {
             "model": self.model_id,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            "max_tokens": 500,
+            "messages": prompt.messages,
+            "max_tokens": prompt.max_tokens,
             "temperature": 0.7
         }
         
@@ -56,18 +144,22 @@ class HuggingFaceLLMProvider:
         
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    url, 
-                    json=payload, 
-                    headers=headers
-                )
-                
-                if response.status_code != 200:
-                    error_msg = f"HF LLM API returned status {response.status_code}: {response.text[:200]}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+                async def post() -> httpx.Response:
+                    response = await client.post(
+                        url, 
+                        json=payload, 
+                        headers=headers
+                    )
+                    if response.status_code != 200:
+                        error_msg = f"HF LLM API returned status {response.status_code}: {response.text[:200]}"
+                        logger.error(error_msg)
+                        raise ProviderError(error_msg, provider="hf_llm", status_code=response.status_code)
+                    return response
                 
+                response = await self.breaker.call(post)
                 result = response.json()
+                if isinstance(result, dict):
+                    log_usage("hf", self.model_id, session_context.mode, prompt.prompt_tokens, result.get("usage"))
                 # Handle both old inference API and new router API response formats
                 if isinstance(result, list) and len(result) > 0:
                     generated_text = result[0].get("generated_text", "")
@@ -114,6 +206,7 @@ Session Context:
 - Lesson ID: {session_context.lesson_id or "N/A"}
 - Target Grammar: {', '.join(session_context.target_grammar) if session_context.target_grammar else "N/A"}
 - Lesson Step: {session_context.lesson_step or "N/A"}
+- Conversation Summary: {session_context.short_summary or "N/A"}
 
 Mode-Specific Instructions:
 {mode_instruction}
@@ -158,86 +251,7 @@ JSON Structure (STRICT):
     "question": "question to answer (for short_answer)"
   }}],
   "next_prompt": "Follow-up question or prompt"
-}}
-
-Few-Shot Examples:
-
-Example 1 (live_conversation with grammar issue):
-User: "I go to market yesterday."
-Response:
-{{
-  "reply": "Oh, you went to the market yesterday! That's great. What did you buy there?",
-  "feedback": {{
-    "better_sentence": "I went to the market yesterday.",
-    "grammar": [{{
-      "issue": "past_tense",
-      "original_text": "I go to market yesterday",
-      "explanation_language": "id",
-      "explanation": "Gunakan 'went' (past tense) untuk kejadian kemarin, bukan 'go' (present tense).",
-      "examples": ["I went to school yesterday.", "She went home early."]
-    }}],
-    "vocabulary": [],
-    "pronunciation": []
-  }},
-  "drills": [{{
-    "type": "repeat_sentence",
-    "instruction": "Please repeat this corrected sentence:",
-    "sentence": "I went to the market yesterday."
-  }}],
-  "next_prompt": "What did you buy at the market?"
-}}
-
-Example 2 (guided_lesson focusing on past simple):
-User: "I work at a bank for three years."
-Response:
-{{
-  "reply": "Good try! When talking about past experience, we use past tense. Let's practice.",
-  "feedback": {{
-    "better_sentence": "I worked at a bank for three years.",
-    "grammar": [{{
-      "issue": "past_simple",
-      "original_text": "I work at a bank for three years",
-      "explanation_language": "en",
-      "explanation": "Use past simple 'worked' for completed past actions.",
-      "examples": ["I worked there from 2018 to 2021.", "She studied English for five years."]
-    }}],
-    "vocabulary": [],
-    "pronunciation": []
-  }},
-  "drills": [{{
-    "type": "short_answer",
-    "instruction": "Now tell me: Where did you study?",
-    "question": "Where did you study?"
-  }}],
-  "next_prompt": "Tell me about your previous job using past tense."
-}}
-
-Example 3 (pronunciation_coach):
-User: "I sink the answer is correct."
-Response:
-{{
-  "reply": "Good effort! Let's work on the 'th' sound in 'think'.",
-  "feedback": {{
-    "better_sentence": null,
-    "grammar": [],
-    "vocabulary": [],
-    "pronunciation": [{{
-      "word": "think",
-      "target_sound": "/θ/",
-      "issue": "Pronounced as /s/ instead of /θ/",
-      "tip": "Place your tongue between your teeth and blow air gently.",
-      "severity": "medium"
-    }}]
-  }},
-  "drills": [{{
-    "type": "repeat_sentence",
-    "instruction": "Practice this sentence with the 'th' sound:",
-    "sentence": "I think the answer is correct."
-  }}],
-  "next_prompt": "Now try saying: 'I think about it every day.'"
-}}
-
-Now respond to the user's input following these examples."""
+}}"""
         
         return prompt
     
@@ -1,15 +1,45 @@
 import logging
+import httpx
 from typing import Optional
+from app.providers.errors import ProviderError
+from app.providers.circuit_breaker import get_breaker
 from app.services.storage import StorageService
+from app.services.tracing import traced
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 class HuggingFaceTTSProvider:
+    mime_type = "audio/flac"
+    
     def __init__(self, storage_service: StorageService):
         self.storage_service = storage_service
+        self.breaker = get_breaker("hf_tts")
         logger.info(f"TTS Provider initialized (disabled in production)")
     
+    @traced("tts.synthesize")
     async def synthesize_speech(self, text: str, voice: Optional[str] = None) -> str:
         """TTS disabled in production to prevent serverless crashes"""
         logger.info(f"TTS disabled: {text[:50]}...")
-        return None
\ No newline at end of file
+        return None
+    
+    @traced("tts.synthesize_audio")
+    async def synthesize_audio(self, text: str, language: str = "en") -> bytes:
+        """One sentence through the HF inference API (used by streaming TTS)"""
+        url = f"{settings.hf_api_base_url}/models/{settings.hf_tts_model_id}"
+        headers = {"Authorization": f"Bearer {settings.hf_api_key}"}
+        
+        async def post() -> httpx.Response:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(url, headers=headers, json={"inputs": text})
+            if response.status_code != 200:
+                logger.warning(f"HF TTS API returned {response.status_code}: {response.text[:200]}")
+                raise ProviderError(
+                    f"HF TTS returned {response.status_code}",
+                    provider="hf_tts",
+                    status_code=response.status_code
+                )
+            return response
+        
+        response = await self.breaker.call(post)
+        return response.content
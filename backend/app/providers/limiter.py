@@ -0,0 +1,279 @@
+"""Per-upstream concurrency limiter with token bucket, bounded queue and retries"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, Optional
+import httpx
+from app.providers.errors import ProviderError, ProviderRateLimitError, ProviderTimeoutError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+# time.monotonic() deadline of the user request being served; None outside requests
+request_deadline_var: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+@contextmanager
+def request_budget(seconds: Optional[float] = None) -> Iterator[None]:
+    """Set the deadline that interactive upstream calls in this block pass to the limiter"""
+    token = request_deadline_var.set(time.monotonic() + (seconds or settings.request_budget_seconds))
+    try:
+        yield
+    finally:
+        request_deadline_var.reset(token)
+
+class UpstreamOverloadedError(ProviderError):
+    """Request shed locally because the upstream queue is full or its deadline passed"""
+
+    def __init__(self, message: str, provider: Optional[str] = None, retry_after: Optional[float] = None):
+        super().__init__(message, provider=provider, status_code=503, retry_after=retry_after)
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Retry-After / Groq reset headers ("7", "7.66s", "2m59.56s", "120ms") to seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+class UpstreamLimiter:
+    """Bounds in-flight and per-second requests to one upstream API
+
+    Callers wait in a bounded queue for a concurrency slot and a rate token;
+    when the queue is full or the wait would exceed the deadline the request
+    is shed with UpstreamOverloadedError instead of piling onto the upstream.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 8,
+        requests_per_second: float = 1.0,
+        burst: Optional[int] = None,
+        max_queue: int = 32,
+        queue_timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst or max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0  # set from Retry-After / exhausted rate-limit headers
+        self._waiting = 0
+        self._in_flight = 0
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._bucket_lock: Optional[asyncio.Lock] = None
+
+    def _ensure_primitives(self):
+        # asyncio primitives bind to one loop; rebuild them if the loop changed (tests, reloads)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._bucket_lock = asyncio.Lock()
+            self._in_flight = 0
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "tokens": round(self._tokens, 2),
+            "blocked_for_seconds": round(max(0.0, self._blocked_until - time.monotonic()), 2)
+        }
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.requests_per_second)
+
+    async def _acquire_token(self, deadline: float):
+        async with self._bucket_lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(0.0, self._blocked_until - now)
+                if wait == 0.0 and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                if wait == 0.0:
+                    wait = (1.0 - self._tokens) / self.requests_per_second
+                if now + wait > deadline:
+                    raise UpstreamOverloadedError(
+                        f"{self.name} rate limit wait exceeds queue deadline",
+                        provider=self.name,
+                        retry_after=wait
+                    )
+                await asyncio.sleep(wait)
+
+    async def _acquire(self, deadline: float):
+        if not self._slots.locked():
+            # Free slot: take it without queueing
+            await self._slots.acquire()
+        else:
+            if self._waiting >= self.max_queue:
+                raise UpstreamOverloadedError(
+                    f"{self.name} queue full ({self._waiting} waiting)",
+                    provider=self.name,
+                    retry_after=self.queue_timeout
+                )
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise UpstreamOverloadedError(
+                    f"{self.name} queue deadline exceeded",
+                    provider=self.name,
+                    retry_after=self.queue_timeout
+                )
+            finally:
+                self._waiting -= 1
+        try:
+            await self._acquire_token(deadline)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._in_flight += 1
+
+    def _release(self):
+        self._in_flight -= 1
+        self._slots.release()
+
+    def _observe_headers(self, response: httpx.Response):
+        """Honor Retry-After and Groq's x-ratelimit-* headers"""
+        now = time.monotonic()
+        retry_after = parse_duration(response.headers.get("retry-after"))
+        if response.status_code == 429 and retry_after is None:
+            retry_after = self.backoff_base
+
+        for kind in ("requests", "tokens"):
+            remaining = response.headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = parse_duration(response.headers.get(f"x-ratelimit-reset-{kind}"))
+            if remaining is not None and reset is not None:
+                try:
+                    if float(remaining) <= 0:
+                        retry_after = max(retry_after or 0.0, reset)
+                except ValueError:
+                    pass
+
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            logger.warning(f"{self.name} rate limited, pausing requests for {retry_after:.2f}s")
+        return retry_after
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Full jitter so retries from a burst don't re-synchronize
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[httpx.Response]],
+        idempotent: bool = True,
+        deadline: Optional[float] = None
+    ) -> httpx.Response:
+        """Execute `call` under the limiter and return its response
+
+        Retryable failures (429, 5xx, timeouts, transport errors) are retried
+        with jittered backoff only for idempotent calls. A final 429 raises
+        ProviderRateLimitError; other non-2xx responses are returned for the
+        caller to handle. `deadline` (time.monotonic() based) bounds the whole
+        call including queueing and retries.
+        """
+        self._ensure_primitives()
+        attempts = 1 + (self.max_retries if idempotent else 0)
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            queue_deadline = time.monotonic() + self.queue_timeout
+            if deadline is not None:
+                queue_deadline = min(queue_deadline, deadline)
+            await self._acquire(queue_deadline)
+            try:
+                response = await call()
+            except httpx.TimeoutException as e:
+                if last_attempt:
+                    raise ProviderTimeoutError(f"{self.name} timed out: {e}", provider=self.name)
+                logger.warning(f"{self.name} timeout (attempt {attempt + 1}/{attempts}), retrying")
+                retry_after = None
+            except httpx.TransportError as e:
+                if last_attempt:
+                    raise ProviderError(f"{self.name} unreachable: {e}", provider=self.name, status_code=502)
+                logger.warning(f"{self.name} transport error (attempt {attempt + 1}/{attempts}): {e}")
+                retry_after = None
+            else:
+                retry_after = self._observe_headers(response)
+                if response.status_code not in RETRYABLE_STATUS:
+                    return response
+                if last_attempt:
+                    if response.status_code == 429:
+                        raise ProviderRateLimitError(
+                            f"{self.name} rate limited",
+                            provider=self.name,
+                            retry_after=retry_after
+                        )
+                    return response
+                logger.warning(
+                    f"{self.name} returned {response.status_code} (attempt {attempt + 1}/{attempts}), retrying"
+                )
+            finally:
+                self._release()
+
+            delay = self._backoff(attempt, retry_after)
+            if deadline is not None and time.monotonic() + delay > deadline:
+                # Not worth retrying past the point the caller gives up
+                raise UpstreamOverloadedError(
+                    f"{self.name} retry budget exhausted",
+                    provider=self.name,
+                    retry_after=delay
+                )
+            await asyncio.sleep(delay)
+
+        raise ProviderError(f"{self.name} request failed", provider=self.name)
+
+_limiters: Dict[str, UpstreamLimiter] = {}
+
+def get_limiter(name: str, background: bool = False) -> UpstreamLimiter:
+    """Shared Groq limiter per endpoint, so all requests in this process draw from one budget
+
+    Background limiters get a smaller budget of their own, so summary jobs
+    never take rate tokens or queue slots from user turns.
+    """
+    if name not in _limiters:
+        _limiters[name] = UpstreamLimiter(
+            name,
+            max_concurrency=settings.groq_background_max_concurrency if background else settings.groq_max_concurrency,
+            requests_per_second=(
+                settings.groq_background_requests_per_minute if background else settings.groq_requests_per_minute
+            ) / 60.0,
+            burst=None if background else settings.groq_burst,
+            max_queue=settings.groq_queue_size,
+            queue_timeout=settings.groq_queue_timeout_seconds,
+            max_retries=settings.groq_max_retries
+        )
+    return _limiters[name]
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import re
+from functools import lru_cache
+from typing import AsyncIterator, List, Protocol, Tuple
+import numpy as np
+from app.providers.base import TranscriptHypothesis
+from app.services.tracing import traced
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (start seconds, end seconds, text) relative to the decoded window
+Word = Tuple[float, float, str]
+
+class SpeechEngine(Protocol):
+    def transcribe(self, samples: np.ndarray, language: str) -> List[Word]:
+        """Decode float32 mono samples into timed words"""
+        ...
+
+class WhisperEngine:
+    """faster-whisper model held for the life of the process"""
+
+    def __init__(self, model: str, device: str = "cpu", compute_type: str = "int8"):
+        from faster_whisper import WhisperModel  # optional dependency
+        self.model = WhisperModel(model, device=device, compute_type=compute_type)
+        logger.info(f"Loaded local ASR model {model} ({device}, {compute_type})")
+
+    def transcribe(self, samples: np.ndarray, language: str) -> List[Word]:
+        segments, _ = self.model.transcribe(
+            samples,
+            language=language,
+            beam_size=1,
+            word_timestamps=True,
+            condition_on_previous_text=False
+        )
+        return [(w.start, w.end, w.word.strip()) for segment in segments for w in segment.words]
+
+@lru_cache(maxsize=1)
+def get_whisper_engine() -> WhisperEngine:
+    return WhisperEngine(settings.local_asr_model, settings.local_asr_device, settings.local_asr_compute_type)
+
+def _same_word(a: Word, b: Word) -> bool:
+    return re.sub(r"[^\w']", "", a[2].lower()) == re.sub(r"[^\w']", "", b[2].lower())
+
+class LocalStreamingASRProvider:
+    """Streaming ASR with a local engine decoding overlapping windows
+
+    Every `step_seconds` of new audio the uncommitted tail of the utterance
+    is decoded again. Words that two consecutive decodes agree on are
+    committed and their audio dropped, so each window overlaps the previous
+    one only by the still-uncertain part. Windows longer than
+    `window_seconds` commit everything but the last step regardless.
+    """
+
+    def __init__(self, engine: SpeechEngine, window_seconds: float = 8.0, step_seconds: float = 1.0):
+        self.engine = engine
+        self.window_seconds = window_seconds
+        self.step_seconds = step_seconds
+
+    @classmethod
+    def from_settings(cls) -> "LocalStreamingASRProvider":
+        return cls(
+            get_whisper_engine(),
+            window_seconds=settings.local_asr_window_seconds,
+            step_seconds=settings.local_asr_step_seconds
+        )
+
+    @traced("asr.decode")
+    async def _decode(self, samples: np.ndarray, language: str) -> List[Word]:
+        # Decoding is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self.engine.transcribe, samples, language)
+
+    async def stream_transcribe(
+        self,
+        audio_chunks: AsyncIterator[bytes],
+        sample_rate: int = 16000,
+        language: str = "en"
+    ) -> AsyncIterator[TranscriptHypothesis]:
+        step = int(self.step_seconds * sample_rate)
+        window = self.window_seconds * sample_rate
+        buffer = np.zeros(0, dtype=np.float32)
+        committed: List[str] = []
+        previous: List[Word] = []
+        undecoded = 0
+
+        async for chunk in audio_chunks:
+            samples = np.frombuffer(chunk, dtype="<i2").astype(np.float32) / 32768.0
+            buffer = np.concatenate((buffer, samples))
+            undecoded += len(samples)
+            if undecoded < step:
+                continue
+            undecoded = 0
+
+            words = await self._decode(buffer, language)
+            stable = 0
+            while stable < min(len(words), len(previous)) and _same_word(words[stable], previous[stable]):
+                stable += 1
+            if len(buffer) > window:
+                horizon = (len(buffer) - step) / sample_rate
+                while stable < len(words) and words[stable][1] <= horizon:
+                    stable += 1
+                if not words:
+                    buffer = buffer[-step:]  # long silence: keep the window bounded
+
+            if stable:
+                committed.extend(w[2] for w in words[:stable])
+                trim = words[stable - 1][1]
+                buffer = buffer[int(trim * sample_rate):]
+                words = [(start - trim, end - trim, text) for start, end, text in words[stable:]]
+            previous = words
+            yield TranscriptHypothesis(" ".join(committed + [w[2] for w in words]))
+
+        words = await self._decode(buffer, language) if len(buffer) else []
+        yield TranscriptHypothesis(" ".join(committed + [w[2] for w in words]), is_final=True)
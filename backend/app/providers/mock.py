@@ -1,19 +1,255 @@
 import asyncio
+import io
+import logging
+import math
+import random
+import threading
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
 from app.schemas.macca import (
     MaccaJsonResponse, MaccaFeedback, GrammarFeedback, 
     VocabularyFeedback, PronunciationFeedback, Drill,
-    UserProfile, SessionContext
+    UserProfile, SessionContext, ConversationMessage
 )
+from app.providers.errors import ProviderError, ProviderRateLimitError, ProviderTimeoutError
+from app.services.tracing import set_attributes, traced
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared RNG so a fixed MOCK_SEED reproduces a whole load-test run
+_rng = random.Random(settings.mock_seed)
+
+# Trace samples are read once per file and shared by all mock instances
+_trace_cache: Dict[str, Dict[Optional[str], List[float]]] = {}
+
+def _load_trace(path: str) -> Dict[Optional[str], List[float]]:
+    """Load recorded latencies (ms) keyed by provider name (None = any provider)
+
+    Each non-empty line is either `latency_ms` or `provider,latency_ms`.
+    """
+    if path in _trace_cache:
+        return _trace_cache[path]
+    
+    samples: Dict[Optional[str], List[float]] = {}
+    for line in Path(path).read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "," in line:
+            provider, value = line.split(",", 1)
+            key = provider.strip() or None
+        else:
+            key, value = None, line
+        try:
+            samples.setdefault(key, []).append(float(value) / 1000.0)
+        except ValueError:
+            logger.warning(f"Skipping invalid latency trace line: {line}")
+    
+    _trace_cache[path] = samples
+    return samples
+
+class TraceReplay:
+    """Recorded latencies replayed in order, wrapping around
+
+    Providers are built per request, so the cursor lives here, shared by
+    every LatencyModel replaying the same trace, not on the model.
+    """
+
+    def __init__(self, samples: List[float]):
+        self.samples = samples
+        self._pos = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> float:
+        with self._lock:
+            value = self.samples[self._pos % len(self.samples)]
+            self._pos += 1
+        return value
+
+# One replay per (trace file, provider), so the whole app walks each trace once in order
+_trace_replays: Dict[Tuple[str, Optional[str]], TraceReplay] = {}
+
+def _trace_replay(path: str, provider: str) -> Optional[TraceReplay]:
+    samples = _load_trace(path)
+    key = provider if samples.get(provider) else None
+    if not samples.get(key):
+        return None
+    if (path, key) not in _trace_replays:
+        _trace_replays[(path, key)] = TraceReplay(samples[key])
+    return _trace_replays[(path, key)]
+
+class LatencyModel:
+    """Samples simulated upstream latency in seconds"""
+    
+    def __init__(
+        self,
+        median_seconds: float,
+        distribution: str = "fixed",
+        sigma: float = 0.5,
+        trace: Union[List[float], TraceReplay, None] = None,
+        rng: Optional[random.Random] = None
+    ):
+        if distribution not in ("fixed", "lognormal", "trace"):
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        if distribution == "trace" and not trace:
+            raise ValueError("Trace distribution requires recorded latency samples")
+        self.median_seconds = median_seconds
+        self.distribution = distribution
+        self.sigma = sigma
+        self.trace = trace if isinstance(trace, TraceReplay) else TraceReplay(trace or [])
+        self.rng = rng or _rng
+    
+    @classmethod
+    def from_settings(cls, provider: str, median_seconds: float) -> "LatencyModel":
+        median = median_seconds * settings.mock_latency_scale
+        distribution = settings.mock_latency_distribution
+        trace = None
+        if distribution == "trace":
+            if not settings.mock_latency_trace_file:
+                raise ValueError("MOCK_LATENCY_TRACE_FILE is required for trace distribution")
+            trace = _trace_replay(settings.mock_latency_trace_file, provider)
+        return cls(median, distribution=distribution, sigma=settings.mock_latency_sigma, trace=trace)
+    
+    def sample(self) -> float:
+        if self.distribution == "lognormal":
+            if self.median_seconds <= 0:
+                return 0.0
+            return self.rng.lognormvariate(math.log(self.median_seconds), self.sigma)
+        if self.distribution == "trace":
+            # Replay in recorded order so bursts and slow streaks are preserved
+            return self.trace.next()
+        return self.median_seconds
+
+class FaultModel:
+    """Decides whether a simulated call fails, and how"""
+    
+    def __init__(
+        self,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        timeout_seconds: float = 30.0,
+        retry_after_seconds: float = 1.0,
+        rng: Optional[random.Random] = None
+    ):
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_seconds = timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.rng = rng or _rng
+    
+    @classmethod
+    def from_settings(cls) -> "FaultModel":
+        return cls(
+            error_rate=settings.mock_error_rate,
+            timeout_rate=settings.mock_timeout_rate,
+            rate_limit_rate=settings.mock_rate_limit_rate,
+            timeout_seconds=settings.mock_timeout_seconds,
+            retry_after_seconds=settings.mock_retry_after_seconds
+        )
+    
+    def draw(self) -> Optional[str]:
+        """Return "rate_limit", "timeout", "error" or None for a successful call"""
+        roll = self.rng.random()
+        for outcome, rate in (
+            ("rate_limit", self.rate_limit_rate),
+            ("timeout", self.timeout_rate),
+            ("error", self.error_rate)
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return None
+
+class MockUpstream:
+    """Simulated upstream call: latency, optional token streaming and injected faults"""
+    
+    def __init__(self, name: str, latency: LatencyModel, faults: FaultModel):
+        self.name = name
+        self.latency = latency
+        self.faults = faults
+    
+    @classmethod
+    def from_settings(cls, name: str, median_seconds: float) -> "MockUpstream":
+        return cls(name, LatencyModel.from_settings(name, median_seconds), FaultModel.from_settings())
+    
+    async def call(self, output_tokens: int = 0, tokens_per_second: float = 0.0) -> None:
+        outcome = self.faults.draw()
+        
+        if outcome == "rate_limit":
+            # Real rate limiters reject quickly, before any generation happens
+            await asyncio.sleep(min(self.latency.sample(), 0.05))
+            raise ProviderRateLimitError(
+                f"Mock {self.name} rate limited",
+                provider=self.name,
+                retry_after=self.faults.retry_after_seconds
+            )
+        if outcome == "timeout":
+            await asyncio.sleep(self.faults.timeout_seconds)
+            raise ProviderTimeoutError(f"Mock {self.name} timed out", provider=self.name)
+        
+        delay = self.latency.sample()
+        if tokens_per_second > 0 and output_tokens > 0:
+            delay += output_tokens / tokens_per_second
+        await asyncio.sleep(delay)
+        
+        if outcome == "error":
+            raise ProviderError(f"Mock {self.name} returned 500", provider=self.name, status_code=500)
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return max(1, len(text) // 4)
 
 class MockLLMProvider:
+    def __init__(self, upstream: Optional[MockUpstream] = None, tokens_per_second: Optional[float] = None):
+        self.upstream = upstream or MockUpstream.from_settings("mock_llm", 1.0)
+        self.tokens_per_second = (
+            settings.mock_llm_tokens_per_second if tokens_per_second is None else tokens_per_second
+        )
+    
+    @traced("llm.generate")
     async def generate_macca_response(
         self, 
         user_text: str, 
         user_profile: UserProfile, 
         session_context: SessionContext
     ) -> MaccaJsonResponse:
-        await asyncio.sleep(1)  # Simulate processing
-        
+        response = self._build_response(user_text, user_profile, session_context)
+        output_tokens = _estimate_tokens(response.model_dump_json())
+        set_attributes(llm__completion_tokens=output_tokens)
+        # Latency is time-to-first-token plus streaming the generated JSON
+        await self.upstream.call(
+            output_tokens=output_tokens,
+            tokens_per_second=self.tokens_per_second
+        )
+        return response
+    
+    @traced("llm.summarize")
+    async def summarize_conversation(self, previous_summary: Optional[str], messages: List[ConversationMessage]) -> str:
+        learner_said = [m.content for m in messages if m.role == "user"]
+        summary = " ".join(filter(None, [previous_summary, "Learner talked about: " + "; ".join(s[:60] for s in learner_said)]))
+        await self.upstream.call(output_tokens=_estimate_tokens(summary), tokens_per_second=self.tokens_per_second)
+        return summary
+
+    @traced("llm.summarize_sessions")
+    async def summarize_sessions(self, sessions: Dict[str, List[ConversationMessage]]) -> Dict[str, str]:
+        summaries = {
+            key: "Learner talked about: " + "; ".join(m.content[:60] for m in messages if m.role == "user")
+            for key, messages in sessions.items()
+        }
+        output = sum(_estimate_tokens(text) for text in summaries.values())
+        await self.upstream.call(output_tokens=output, tokens_per_second=self.tokens_per_second)
+        return summaries
+    
+    def _build_response(
+        self, 
+        user_text: str, 
+        user_profile: UserProfile, 
+        session_context: SessionContext
+    ) -> MaccaJsonResponse:
         if session_context.mode == "live_conversation":
             return MaccaJsonResponse(
                 reply=f"That's interesting! You mentioned '{user_text[:30]}...'. Can you tell me more about that?",
@@ -66,11 +302,33 @@ class MockLLMProvider:
             )
 
 class MockASRProvider:
+    def __init__(self, upstream: Optional[MockUpstream] = None):
+        self.upstream = upstream or MockUpstream.from_settings("mock_asr", 0.5)
+    
+    @traced("asr.transcribe")
     async def transcribe_audio(self, audio_bytes: bytes, language: str = "en") -> str:
-        await asyncio.sleep(0.5)
+        await self.upstream.call()
         return "I have five years of experience in software development."
 
 class MockTTSProvider:
+    mime_type = "audio/wav"
+    
+    def __init__(self, upstream: Optional[MockUpstream] = None):
+        self.upstream = upstream or MockUpstream.from_settings("mock_tts", 1.0)
+    
+    @traced("tts.synthesize")
     async def synthesize_speech(self, text: str, language: str = "en") -> str:
-        await asyncio.sleep(1)
-        return f"/static/audio/mock_audio_{hash(text) % 1000}.wav"
\ No newline at end of file
+        await self.upstream.call()
+        return f"/static/audio/mock_audio_{hash(text) % 1000}.wav"
+    
+    @traced("tts.synthesize_audio")
+    async def synthesize_audio(self, text: str, language: str = "en") -> bytes:
+        """Silent WAV about as long as the text would take to say"""
+        await self.upstream.call()
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(bytes(2 * 16000 * max(1, len(text.split())) // 3))
+        return buffer.getvalue()
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""LLM provider that hedges slow primary calls and falls back on errors"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from app.providers.base import LLMProvider
+from app.services.tracing import traced
+from app.schemas.macca import MaccaJsonResponse, UserProfile, SessionContext, ConversationMessage
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """Rolling window of call latencies (successes, and cancelled calls as lower bounds)"""
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+class RoutingLLMProvider:
+    """Send to a primary backend, hedge to a secondary past the primary's p95
+
+    If the primary has not answered by its hedge deadline, the same request
+    is sent to the secondary and whichever succeeds first wins; the loser is
+    cancelled. A primary error falls back to the secondary immediately.
+    """
+
+    def __init__(
+        self,
+        primary: LLMProvider,
+        secondary: Optional[LLMProvider] = None,
+        hedging_enabled: bool = True,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 1.0,
+        max_hedge_delay: float = 8.0,
+        default_hedge_delay: float = 3.0,
+        min_samples: int = 20,
+        window: int = 200
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.hedging_enabled = hedging_enabled
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.primary_latency = LatencyTracker(window)
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.fallbacks = 0
+
+    def hedge_delay(self) -> float:
+        """Deadline before hedging, derived from recent primary latencies"""
+        if len(self.primary_latency.samples) < self.min_samples:
+            return self.default_hedge_delay
+        observed = self.primary_latency.quantile(self.hedge_quantile)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, observed))
+
+    def stats(self) -> dict:
+        return {
+            "hedge_delay_seconds": round(self.hedge_delay(), 3),
+            "primary_samples": len(self.primary_latency.samples),
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "fallbacks": self.fallbacks
+        }
+
+    async def _call_primary(self, *args) -> MaccaJsonResponse:
+        start = time.monotonic()
+        try:
+            response = await self.primary.generate_macca_response(*args)
+        except asyncio.CancelledError:
+            # Lost to a hedge: it took at least this long. Skipping it would
+            # bias the quantile, and so the hedge delay, toward fast calls.
+            self.primary_latency.record(time.monotonic() - start)
+            raise
+        self.primary_latency.record(time.monotonic() - start)
+        return response
+
+    @traced("llm.route")
+    async def generate_macca_response(
+        self,
+        user_text: str,
+        user_profile: UserProfile,
+        session_context: SessionContext
+    ) -> MaccaJsonResponse:
+        args = (user_text, user_profile, session_context)
+        if self.secondary is None:
+            return await self._call_primary(*args)
+
+        primary_task = asyncio.ensure_future(self._call_primary(*args))
+        secondary_task = None
+        try:
+            if self.hedging_enabled:
+                done, _ = await asyncio.wait({primary_task}, timeout=self.hedge_delay())
+            else:
+                done, _ = await asyncio.wait({primary_task})
+
+            if primary_task in done:
+                if primary_task.exception() is None:
+                    return primary_task.result()
+                self.fallbacks += 1
+                logger.warning(f"Primary LLM failed, falling back to secondary: {primary_task.exception()}")
+                return await self.secondary.generate_macca_response(*args)
+
+            self.hedges_fired += 1
+            logger.info(f"Primary LLM exceeded {self.hedge_delay():.2f}s, hedging to secondary")
+            secondary_task = asyncio.ensure_future(self.secondary.generate_macca_response(*args))
+
+            pending = {primary_task, secondary_task}
+            first_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary_task:
+                            self.hedges_won += 1
+                        return task.result()
+                    logger.warning(f"Hedged LLM call failed: {task.exception()}")
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for task in (primary_task, secondary_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def summarize_conversation(self, previous_summary: Optional[str], messages: List[ConversationMessage]) -> str:
+        # Background work: no hedging, just fall back if the primary fails
+        try:
+            return await self.primary.summarize_conversation(previous_summary, messages)
+        except Exception as e:
+            if self.secondary is None or not hasattr(self.secondary, "summarize_conversation"):
+                raise
+            logger.warning(f"Primary summary failed, falling back to secondary: {e}")
+            return await self.secondary.summarize_conversation(previous_summary, messages)
+
+    async def summarize_sessions(self, sessions: Dict[str, List[ConversationMessage]]) -> Dict[str, str]:
+        try:
+            return await self.primary.summarize_sessions(sessions)
+        except Exception as e:
+            if self.secondary is None or not hasattr(self.secondary, "summarize_sessions"):
+                raise
+            logger.warning(f"Primary session summaries failed, falling back to secondary: {e}")
+            return await self.secondary.summarize_sessions(sessions)
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import shutil
+import struct
+from typing import AsyncIterator, List, Protocol
+from app.providers.base import AudioChunk
+from app.providers.errors import ProviderError
+from app.services.sentence_stream import stream_sentences
+from app.services.tracing import traced
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OPUS_MIME = "audio/ogg; codecs=opus"
+_OGG_HEADER = struct.Struct("<4sBBqIIIB")  # capture, version, type, granule, serial, seq, crc, segments
+
+class SpeechSynthesizer(Protocol):
+    mime_type: str
+
+    async def synthesize_audio(self, text: str, language: str = "en") -> bytes:
+        """Synthesize one short text and return the encoded audio"""
+        ...
+
+def ogg_pages(data: bytes) -> List[bytes]:
+    """Split an Ogg stream into its pages (each independently appendable)"""
+    pages = []
+    offset = 0
+    while offset + _OGG_HEADER.size <= len(data):
+        capture, *_, segments = _OGG_HEADER.unpack_from(data, offset)
+        if capture != b"OggS":
+            raise ValueError(f"Bad Ogg page at byte {offset}")
+        table_end = offset + _OGG_HEADER.size + segments
+        end = table_end + sum(data[offset + _OGG_HEADER.size:table_end])
+        pages.append(data[offset:end])
+        offset = end
+    return pages
+
+async def encode_opus(audio: bytes, bitrate: str = "24k") -> bytes:
+    """Transcode any ffmpeg-readable audio to Ogg Opus"""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", "-f", "ogg", "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    encoded, errors = await process.communicate(audio)
+    if process.returncode != 0:
+        raise ProviderError(f"Opus encoding failed: {errors.decode(errors='replace')[:200]}", provider="tts_encoder")
+    return encoded
+
+class SentenceStreamingTTS:
+    """Streaming TTS over a per-sentence synthesizer
+
+    Text is cut into sentences as it arrives and up to `lookahead` sentences
+    are synthesized concurrently, but audio is always yielded in sentence
+    order, so the first sentence can play while later ones are still being
+    generated. Output is Ogg Opus when ffmpeg is available (re-encoded if
+    the synthesizer produces something else) and is chunked on page
+    boundaries so a client can append each chunk to its playback buffer.
+    Other formats (FLAC or WAV files) cannot be cut safely, so each sentence
+    is sent as a single chunk.
+    """
+
+    def __init__(self, synthesizer: SpeechSynthesizer, lookahead: int = 2, opus: bool = True, chunk_bytes: int = 16384):
+        self.synthesizer = synthesizer
+        self.lookahead = max(1, lookahead)
+        self.chunk_bytes = chunk_bytes
+        self.encode = opus and synthesizer.mime_type != OPUS_MIME and shutil.which("ffmpeg") is not None
+        self.mime_type = OPUS_MIME if self.encode else synthesizer.mime_type
+
+    @classmethod
+    def from_settings(cls, synthesizer: SpeechSynthesizer) -> "SentenceStreamingTTS":
+        return cls(
+            synthesizer,
+            lookahead=settings.tts_sentence_lookahead,
+            opus=settings.tts_opus_enabled,
+            chunk_bytes=settings.tts_chunk_bytes
+        )
+
+    @traced("tts.sentence")
+    async def _render(self, sentence: str, language: str) -> bytes:
+        audio = await self.synthesizer.synthesize_audio(sentence, language)
+        return await encode_opus(audio) if self.encode else audio
+
+    def _chunks(self, audio: bytes) -> List[bytes]:
+        if self.mime_type != OPUS_MIME:
+            return [audio]
+        # Group whole Ogg pages; a page is never split across chunks
+        chunks: List[bytes] = []
+        current = b""
+        for page in ogg_pages(audio):
+            if current and len(current) + len(page) > self.chunk_bytes:
+                chunks.append(current)
+                current = b""
+            current += page
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def stream_speech(self, text_chunks: AsyncIterator[str], language: str = "en") -> AsyncIterator[AudioChunk]:
+        # The bounded queue caps how far synthesis runs ahead of playback
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.lookahead)
+
+        async def produce():
+            try:
+                async for sentence in stream_sentences(text_chunks):
+                    await queue.put((sentence, asyncio.create_task(self._render(sentence, language))))
+            finally:
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            index = 0
+            while (item := await queue.get()) is not None:
+                sentence, task = item
+                for data in self._chunks(await task):
+                    yield AudioChunk(data=data, mime_type=self.mime_type, sentence=index, text=sentence)
+                index += 1
+            await producer  # surface errors from the text stream
+            logger.info(f"Streamed TTS for {index} sentences ({self.mime_type})")
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item:
+                    item[1].cancel()
+
+async def single_text(text: str) -> AsyncIterator[str]:
+    """Adapt a complete reply to the text-stream input"""
+    yield text
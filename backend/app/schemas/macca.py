@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Literal
 from datetime import datetime
 import uuid
@@ -65,6 +65,10 @@ class UserProfileUpdate(BaseModel):
     explanation_language: Optional[ExplanationLanguage] = None
 
 # Session schemas
+class ConversationMessage(BaseModel):
+    role: Literal["user", "assistant"]
+    content: str
+
 class SessionContext(BaseModel):
     session_id: str
     mode: SessionMode
@@ -75,6 +79,7 @@ class SessionContext(BaseModel):
     target_vocabulary: List[str] = []
     lesson_step: Optional[int] = None
     short_summary: Optional[str] = None
+    recent_turns: List[ConversationMessage] = []
 
 class SessionStart(BaseModel):
     mode: SessionMode
@@ -90,6 +95,7 @@ class SessionTurn(BaseModel):
 class ConversationTurn(BaseModel):
     user_text: str
     mode: Literal["live", "guided", "pronunciation"]
+    session_id: Optional[str] = None
 
 class ConversationResponse(BaseModel):
     macca_text: str
@@ -109,9 +115,55 @@ class PronunciationFeedbackLegacy(BaseModel):
     tip_en: str
     score: int
 
+class PronunciationBatchAnalysis(BaseModel):
+    words: List[str] = Field(..., min_length=1)
+
+class PronunciationWordResult(BaseModel):
+    word: str
+    feedback: List[PronunciationFeedbackLegacy]
+    cached: bool = False
+    source: Literal["lexicon", "cache", "llm"] = "llm"
+
+class PronunciationBatchResponse(BaseModel):
+    results: List[PronunciationWordResult]
+
 class Lesson(BaseModel):
     id: str
     title: str
     subtitle: str
     steps: List[str]
-    current_step: int = 1
\ No newline at end of file
+    current_step: int = 1
+    level: Optional[str] = None
+    target_grammar: List[str] = []
+    target_vocabulary: List[str] = []
+
+class LessonStep(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    title: str
+    prompt: str  # what Macca says to open the step
+    target_phrases: List[str] = []
+
+class LessonContent(BaseModel):
+    """A lesson as authored in app/content/lessons"""
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    version: int = 1
+    title: str
+    subtitle: str
+    level: Optional[str] = None
+    target_grammar: List[str] = []
+    target_vocabulary: List[str] = []
+    steps: List[LessonStep] = Field(..., min_length=1)
+
+    def summary(self) -> Lesson:
+        return Lesson(
+            id=self.id,
+            title=self.title,
+            subtitle=self.subtitle,
+            steps=[step.title for step in self.steps],
+            level=self.level,
+            target_grammar=self.target_grammar,
+            target_vocabulary=self.target_vocabulary
+        )
@@ -0,0 +1,133 @@
+"""Per-session conversation memory: recent turns verbatim, older turns summarized"""
+
+import asyncio
+import logging
+from typing import List, Optional
+from app.schemas.macca import ConversationMessage, SessionContext
+from app.services.prompt_assembly import count_tokens
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _extractive_summary(previous_summary: Optional[str], messages: List[ConversationMessage], max_chars: int = 600) -> str:
+    """Cheap local fallback when the LLM provider has no summarize call"""
+    learner_said = [m.content.strip() for m in messages if m.role == "user" and m.content.strip()]
+    parts = [previous_summary] if previous_summary else []
+    if learner_said:
+        parts.append("Learner said: " + " / ".join(s[:120] for s in learner_said))
+    summary = " ".join(parts)
+    return summary[-max_chars:]
+
+class ConversationMemory:
+    """Bounded rolling window of one session's conversation
+
+    The last `max_turns` exchanges are kept verbatim. Older messages are moved
+    to a pending list and folded into `summary` by a background LLM call once
+    `summarize_batch` exchanges have accumulated, so prompts stay roughly the
+    same size no matter how long the session runs. Messages not yet covered by
+    the summary still go into prompts, budget permitting.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 6,
+        summarize_batch: int = 4,
+        token_budget: int = 1500
+    ):
+        self.max_turns = max_turns
+        self.summarize_batch = summarize_batch
+        self.token_budget = token_budget
+        self.summary: Optional[str] = None
+        self.turns: List[ConversationMessage] = []
+        self._pending: List[ConversationMessage] = []
+        self._summarizing: Optional[asyncio.Task] = None
+        self.summarized: List[ConversationMessage] = []  # batch of the latest summary run
+
+    @classmethod
+    def from_settings(cls) -> "ConversationMemory":
+        return cls(
+            max_turns=settings.memory_recent_turns,
+            summarize_batch=settings.memory_summarize_batch,
+            token_budget=settings.memory_token_budget
+        )
+
+    def to_state(self) -> dict:
+        return {
+            "summary": self.summary,
+            "turns": [m.model_dump() for m in self.turns],
+            "pending": [m.model_dump() for m in self._pending]
+        }
+
+    def load_state(self, state: dict):
+        self.summary = state.get("summary")
+        self.turns = [ConversationMessage(**m) for m in state.get("turns", [])]
+        self._pending = [ConversationMessage(**m) for m in state.get("pending", [])]
+
+    def add_exchange(self, user_text: str, reply: str):
+        self.turns.append(ConversationMessage(role="user", content=user_text))
+        self.turns.append(ConversationMessage(role="assistant", content=reply))
+        overflow = len(self.turns) - self.max_turns * 2
+        if overflow > 0:
+            self._pending.extend(self.turns[:overflow])
+            self.turns = self.turns[overflow:]
+
+    def apply(self, context: SessionContext):
+        """Fill the context's summary and recent turns within the token budget"""
+        budget = self.token_budget
+        summary = self.summary
+        if summary and count_tokens(summary) > budget // 3:
+            # Keep the most recent part of an oversized summary
+            summary = summary[-(budget // 3) * 4:]
+        budget -= count_tokens(summary)
+
+        # Pending and in-flight messages are in neither turns nor the summary yet
+        unsummarized = self._pending + self.turns
+        if self._summarizing and not self._summarizing.done():
+            unsummarized = self.summarized + unsummarized
+
+        recent: List[ConversationMessage] = []
+        for message in reversed(unsummarized):
+            cost = count_tokens(message.content)
+            if cost > budget:
+                break
+            recent.append(message)
+            budget -= cost
+
+        context.short_summary = summary
+        context.recent_turns = list(reversed(recent))
+
+    def maybe_summarize(self, llm_provider) -> Optional[asyncio.Task]:
+        """Start a background summary if enough old turns are pending"""
+        if len(self._pending) < self.summarize_batch * 2:
+            return None
+        if self._summarizing and not self._summarizing.done():
+            return None
+        batch = self._pending
+        self._pending = []
+        self.summarized = batch
+        self._summarizing = asyncio.create_task(self._summarize(llm_provider, batch))
+        return self._summarizing
+
+    def without_summarized(self, pending: List[dict]) -> List[dict]:
+        """Another copy's pending state minus the batch this copy summarized
+
+        The batch is a run of consecutive messages, so it is matched as one.
+        """
+        batch = [m.model_dump() for m in self.summarized]
+        if not batch:
+            return pending
+        for start in range(len(pending) - len(batch) + 1):
+            if pending[start:start + len(batch)] == batch:
+                return pending[:start] + pending[start + len(batch):]
+        return pending
+
+    async def _summarize(self, llm_provider, batch: List[ConversationMessage]):
+        summarize = getattr(llm_provider, "summarize_conversation", None)
+        try:
+            if summarize is None:
+                self.summary = _extractive_summary(self.summary, batch)
+            else:
+                self.summary = await summarize(self.summary, batch)
+        except Exception as e:
+            logger.warning(f"Conversation summary failed, using extractive fallback: {e}")
+            self.summary = _extractive_summary(self.summary, batch)
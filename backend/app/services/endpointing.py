@@ -0,0 +1,107 @@
+"""End-of-speech detection for audio streamed in while the learner talks"""
+
+import io
+import wave
+from typing import List, Optional
+import numpy as np
+from app.config import settings
+
+PAUSE = "pause"
+ENDPOINT = "endpoint"
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap raw mono PCM16 in a WAV header so file-based ASR accepts it"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buffer.getvalue()
+
+class Endpointer:
+    """Energy VAD over one utterance of PCM16 audio
+
+    Audio is cut into fixed frames and each frame's RMS is compared with a
+    threshold. Once speech has started, a short run of silent frames reports
+    PAUSE (once per pause; a good moment to transcribe speculatively) and a
+    longer run reports ENDPOINT, as does reaching the maximum length.
+    `pauses` keeps the byte offset in `audio` of each PAUSE, where the audio
+    can be cut without splitting a word; `speech_frames` only grows while
+    the learner is talking. Passing endpoint_ms=None only reports pauses.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        threshold: float = 0.015,
+        pause_ms: int = 300,
+        endpoint_ms: Optional[int] = 700,
+        max_seconds: Optional[float] = 30.0
+    ):
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, sample_rate * frame_ms // 1000)
+        self.threshold = threshold
+        self.pause_frames = max(1, pause_ms // frame_ms)
+        self.endpoint_frames = max(self.pause_frames + 1, endpoint_ms // frame_ms) if endpoint_ms else None
+        self.max_bytes = int(max_seconds * sample_rate) * 2 if max_seconds else None
+        self.audio = bytearray()
+        self.pauses: List[int] = []
+        self.speech_frames = 0
+        self.ended = False
+        self._pending = bytearray()
+        self._silent_frames = 0
+        self._paused = False
+
+    @classmethod
+    def from_settings(cls, sample_rate: Optional[int] = None, endpointing: bool = True) -> "Endpointer":
+        return cls(
+            sample_rate=sample_rate or settings.voice_ws_sample_rate,
+            frame_ms=settings.voice_ws_frame_ms,
+            threshold=settings.voice_ws_speech_threshold,
+            pause_ms=settings.voice_ws_pause_ms,
+            endpoint_ms=settings.voice_ws_endpoint_ms if endpointing else None,
+            max_seconds=settings.voice_ws_max_utterance_seconds if endpointing else None
+        )
+
+    @property
+    def speech_started(self) -> bool:
+        return self.speech_frames > 0
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """Add audio; returns the PAUSE/ENDPOINT events it caused, in order"""
+        if self.ended:
+            return []
+        self.audio += chunk
+        self._pending += chunk
+        events: List[str] = []
+
+        frame_bytes = self.frame_samples * 2
+        offset = len(self.audio) - len(self._pending)  # end of the last processed frame
+        usable = len(self._pending) - len(self._pending) % frame_bytes
+        if usable:
+            samples = np.frombuffer(bytes(self._pending[:usable]), dtype="<i2").astype(np.float32) / 32768.0
+            del self._pending[:usable]
+            rms = np.sqrt(np.mean(samples.reshape(-1, self.frame_samples) ** 2, axis=1))
+            for loud in rms >= self.threshold:
+                offset += frame_bytes
+                if loud:
+                    self.speech_frames += 1
+                    self._silent_frames = 0
+                    self._paused = False
+                elif self.speech_frames:
+                    self._silent_frames += 1
+                    if not self._paused and self._silent_frames >= self.pause_frames:
+                        self._paused = True
+                        self.pauses.append(offset)
+                        events.append(PAUSE)
+                    if self.endpoint_frames and self._silent_frames >= self.endpoint_frames:
+                        self.ended = True
+                        events.append(ENDPOINT)
+                        return events
+
+        if self.max_bytes and len(self.audio) >= self.max_bytes:
+            self.ended = True
+            events.append(ENDPOINT)
+        return events
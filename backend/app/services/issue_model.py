@@ -0,0 +1,71 @@
+"""Per-user model of recurring mistakes, kept on the user row
+
+Every FeedbackIssue write also bumps a decayed count for its
+(type, issue_code) in `User.issue_model`, so old mistakes fade with a
+half-life of `issue_model_half_life_days` and the learner's current
+weaknesses rank first. Auth already loads the user for every request, so
+turn endpoints read the model with no extra query; only the
+`issue_model_max_codes` strongest entries are kept to keep the row small.
+
+    {"grammar:past_simple": [2.7, 1767225600.0], ...}  # key -> [count, as-of unix time]
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session as DBSession
+from app.db.models import User
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _decay(count: float, as_of: float, now: float) -> float:
+    half_life = settings.issue_model_half_life_days * 86400
+    return count * 0.5 ** (max(0.0, now - as_of) / half_life)
+
+def record_issues(model: Optional[dict], issues: Iterable[Tuple[str, str]], now: Optional[float] = None) -> dict:
+    """Return the model with each (type, issue_code) counted once more
+
+    A new dict is returned so SQLAlchemy sees the JSON column change.
+    """
+    now = now or time.time()
+    updated: Dict[str, list] = dict(model or {})
+    for issue_type, issue_code in issues:
+        key = f"{issue_type}:{issue_code}"
+        count, as_of = updated.get(key, (0.0, now))
+        updated[key] = [round(_decay(count, as_of, now) + 1.0, 4), now]
+    limit = settings.issue_model_max_codes
+    if len(updated) > limit:
+        ranked = sorted(updated.items(), key=lambda item: _decay(item[1][0], item[1][1], now), reverse=True)
+        updated = dict(ranked[:limit])
+    return updated
+
+def top_issues(model: Optional[dict], limit: int = 5, issue_type: Optional[str] = None, now: Optional[float] = None) -> List[str]:
+    """Issues by current decayed count, strongest first
+
+    Entries keep their type ("pronunciation: think", "grammar: past_simple")
+    so the prompt can tell a mispronounced word from a grammar point; with
+    `issue_type`, only that type's bare codes are returned.
+    """
+    if not model:
+        return []
+    now = now or time.time()
+    scores: Dict[str, float] = {}
+    for key, (count, as_of) in model.items():
+        kind, _, code = key.partition(":")
+        if issue_type and kind != issue_type:
+            continue
+        score = _decay(count, as_of, now)
+        if score >= settings.issue_model_min_count:
+            scores[code if issue_type else f"{kind}: {code}"] = score
+    return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+def bump_user_issues(db: DBSession, user_id: str, issues: List[Tuple[str, str]]):
+    """Fold newly written FeedbackIssue rows into the user's model, in the caller's transaction"""
+    if not issues:
+        return
+    # Row lock (PostgreSQL) so concurrent jobs for one user don't lose counts
+    user = db.query(User).filter(User.id == user_id).with_for_update().first()
+    if user is None:
+        return
+    user.issue_model = record_issues(user.issue_model, issues)
@@ -0,0 +1,130 @@
+"""Server-side progression through a guided lesson's steps"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from app.schemas.macca import LessonContent, MaccaJsonResponse, SessionContext
+from app.services.transcript_matching import normalize_text
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class CompiledStep:
+    number: int  # 1-based, as shown to the learner
+    title: str
+    opening_prompt: str
+    objective: str  # fixed per step so the LLM system prompt is identical across turns
+    target_phrases: Tuple[str, ...]
+    phrase_stems: Tuple[Tuple[str, ...], ...]  # normalized fixed parts of each phrase
+
+@dataclass(frozen=True)
+class CompiledLesson:
+    source: LessonContent
+    steps: Tuple[CompiledStep, ...]
+
+    @property
+    def id(self) -> str:
+        return self.source.id
+
+def _phrase_stem(phrase: str) -> Tuple[str, ...]:
+    """'I have worked as ... for ... years' -> ('i have worked as', 'for', 'years')"""
+    return tuple(part for part in (normalize_text(p) for p in phrase.split("...")) if part)
+
+def _compile(lesson: LessonContent) -> CompiledLesson:
+    steps = []
+    for number, step in enumerate(lesson.steps, start=1):
+        objective = f"{lesson.title} - {step.title} ({number}/{len(lesson.steps)})"
+        if step.target_phrases:
+            objective += ". Get the learner to use: " + "; ".join(step.target_phrases)
+        steps.append(CompiledStep(
+            number=number,
+            title=step.title,
+            opening_prompt=step.prompt,
+            objective=objective,
+            target_phrases=tuple(step.target_phrases),
+            phrase_stems=tuple(_phrase_stem(p) for p in step.target_phrases)
+        ))
+    return CompiledLesson(source=lesson, steps=tuple(steps))
+
+_compiled: Dict[str, CompiledLesson] = {}
+
+def compile_lesson(lesson: LessonContent) -> CompiledLesson:
+    """Per-step prompts are built once per lesson version, not per turn"""
+    compiled = _compiled.get(lesson.id)
+    if compiled is None or compiled.source is not lesson:
+        compiled = _compiled[lesson.id] = _compile(lesson)
+    return compiled
+
+def phrase_used(stems: Tuple[str, ...], transcript: str) -> bool:
+    """All fixed parts of a phrase template appear in order in the transcript"""
+    text = f" {normalize_text(transcript)} "
+    position = 0
+    for stem in stems:
+        found = text.find(f" {stem} ", position)
+        if found < 0:
+            return False
+        position = found + len(stem) + 1
+    return True
+
+@dataclass
+class StepOutcome:
+    step_complete: bool
+    lesson_complete: bool
+    next_prompt: Optional[str] = None  # opening prompt of the step just entered
+
+@dataclass
+class LessonProgress:
+    """Where one session is in its lesson
+
+    A step is complete when the learner uses one of its target phrases
+    without grammar feedback (or, for steps without phrases, gives a
+    grammatical answer of a few words). After `max_attempts` turns on the
+    same step the lesson moves on anyway so nobody gets stuck.
+    """
+    lesson: CompiledLesson
+    step: int = 1
+    attempts: int = 0
+    completed: bool = False
+
+    @property
+    def total_steps(self) -> int:
+        return len(self.lesson.steps)
+
+    @property
+    def current(self) -> CompiledStep:
+        return self.lesson.steps[min(self.step, self.total_steps) - 1]
+
+    def apply(self, context: SessionContext):
+        source = self.lesson.source
+        context.lesson_id = source.id
+        context.lesson_step = self.current.number
+        context.lesson_objective = self.current.objective
+        context.target_grammar = list(source.target_grammar)
+        context.target_vocabulary = list(source.target_vocabulary)
+
+    def criteria_met(self, transcript: str, response: MaccaJsonResponse) -> bool:
+        if response.grammar_feedback:
+            return False
+        step = self.current
+        if step.phrase_stems:
+            return any(phrase_used(stems, transcript) for stems in step.phrase_stems)
+        return len(normalize_text(transcript).split()) >= settings.lesson_min_answer_words
+
+    def record_turn(self, transcript: str, response: MaccaJsonResponse) -> StepOutcome:
+        if self.completed:
+            return StepOutcome(step_complete=True, lesson_complete=True)
+
+        self.attempts += 1
+        met = self.criteria_met(transcript, response)
+        if not met and self.attempts < settings.lesson_max_attempts_per_step:
+            return StepOutcome(step_complete=False, lesson_complete=False)
+
+        if not met:
+            logger.info(f"Lesson {self.lesson.id}: moving past step {self.step} after {self.attempts} attempts")
+        self.attempts = 0
+        if self.step >= self.total_steps:
+            self.completed = True
+            return StepOutcome(step_complete=True, lesson_complete=True)
+        self.step += 1
+        return StepOutcome(step_complete=True, lesson_complete=False, next_prompt=self.current.opening_prompt)
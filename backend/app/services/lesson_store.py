@@ -0,0 +1,131 @@
+"""Lesson catalog loaded from app/content/lessons into an immutable, id-indexed store"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+from pydantic import ValidationError
+from app.schemas.macca import LessonContent
+from app.config import settings
+
+try:
+    import yaml
+except ImportError:  # JSON lessons still load without PyYAML
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LESSONS_DIR = Path(__file__).resolve().parent.parent / "content" / "lessons"
+_EXTENSIONS = (".yaml", ".yml", ".json")
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes  # serialized once per load, sent as-is
+    etag: str
+
+@dataclass(frozen=True)
+class LessonSnapshot:
+    lessons: Mapping[str, LessonContent]
+    lesson_list: CachedBody
+    lesson_bodies: Mapping[str, CachedBody]
+    signature: Tuple[Tuple[str, int, int], ...]
+
+def _cached(payload) -> CachedBody:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CachedBody(body=body, etag=f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+
+def _read(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        if path.suffix == ".json":
+            return json.load(f)
+        if yaml is None:
+            raise RuntimeError("PyYAML is not installed")
+        return yaml.safe_load(f)
+
+class LessonStore:
+    """Lessons parsed and serialized once, then served from memory
+
+    Each load builds a complete new snapshot and swaps it in with a single
+    assignment, so requests never see a half-loaded catalog and lookups are
+    a dict get no matter how many lessons exist. The directory is re-checked
+    at most every `reload_seconds` and reloaded only if a file changed.
+    """
+
+    def __init__(self, directory: Path, reload_seconds: float = 2.0):
+        self.directory = directory
+        self.reload_seconds = reload_seconds
+        self._snapshot: Optional[LessonSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self) -> Tuple[Tuple[str, int, int], ...]:
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(_EXTENSIONS) and e.is_file()]
+        except FileNotFoundError:
+            return ()
+        return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in entries))
+
+    def load(self) -> LessonSnapshot:
+        signature = self._signature()
+        lessons: Dict[str, LessonContent] = {}
+        for name, _, _ in signature:
+            path = self.directory / name
+            try:
+                lesson = LessonContent.model_validate(_read(path))
+            except (OSError, ValueError, RuntimeError, ValidationError) as e:
+                # A broken file is skipped; the rest of the catalog still loads
+                logger.error(f"Skipping lesson file {path}: {e}")
+                continue
+            if lesson.id in lessons:
+                logger.error(f"Skipping lesson file {path}: duplicate lesson id {lesson.id}")
+                continue
+            lessons[lesson.id] = lesson
+
+        summaries = {lesson_id: lesson.summary().model_dump() for lesson_id, lesson in lessons.items()}
+        snapshot = LessonSnapshot(
+            lessons=MappingProxyType(lessons),
+            lesson_list=_cached(list(summaries.values())),
+            lesson_bodies=MappingProxyType({lesson_id: _cached(s) for lesson_id, s in summaries.items()}),
+            signature=signature
+        )
+        self._snapshot = snapshot
+        self._checked_at = time.monotonic()
+        logger.info(f"Loaded {len(lessons)} lessons from {self.directory}")
+        return snapshot
+
+    def current(self) -> LessonSnapshot:
+        """Latest snapshot, reloading first if the lesson files changed"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                return self._snapshot or self.load()
+        if time.monotonic() - self._checked_at < self.reload_seconds:
+            return snapshot
+        if not self._lock.acquire(blocking=False):
+            return snapshot  # another request is already checking
+        try:
+            self._checked_at = time.monotonic()
+            if self._signature() != snapshot.signature:
+                return self.load()
+            return snapshot
+        finally:
+            self._lock.release()
+
+    def get(self, lesson_id: Optional[str]) -> Optional[LessonContent]:
+        if not lesson_id:
+            return None
+        return self.current().lessons.get(lesson_id)
+
+    def all(self) -> List[LessonContent]:
+        return list(self.current().lessons.values())
+
+lesson_store = LessonStore(
+    Path(settings.lessons_dir) if settings.lessons_dir else DEFAULT_LESSONS_DIR,
+    reload_seconds=settings.lessons_reload_seconds
+)
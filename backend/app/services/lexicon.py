@@ -0,0 +1,238 @@
+"""Memory-mapped pronunciation lexicon with Indonesian-learner confusion pairs
+
+The CMUdict-style source is compiled once into a binary index file:
+
+    header   <4sIIII  magic, fingerprint, entries, buckets, reserved
+    table    buckets x <II  (crc32 of word, record offset; 0 = empty)
+    records  u8 len + word, u8 len + phonemes (ASCII), u8 count + pair ids
+
+The table is open-addressed at <= 50% load, so a lookup is one crc32 and
+usually one probe. Only the pages a lookup touches become resident, which
+keeps a 100k-word lexicon at a few hundred KB of RSS per worker, shared
+between workers through the page cache.
+
+Build it ahead of time with `python -m app.services.lexicon build`; the app
+also rebuilds it at startup when the source or confusion pairs change.
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import zlib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_SOURCE = DATA_DIR / "lexicon.txt"
+CONFUSIONS_FILE = DATA_DIR / "l1_confusions_id.json"
+
+_MAGIC = b"MLX1"
+_HEADER = struct.Struct("<4sIIII")
+_SLOT = struct.Struct("<II")
+_STRESS = re.compile(r"\d")
+
+@dataclass(frozen=True)
+class ConfusionPair:
+    target: str  # ARPAbet phoneme the word needs
+    substitute: Optional[str]  # what learners tend to say instead; None = general advice
+    position: str  # any, initial, final
+    tip_id: str
+    tip_en: str
+
+    def applies_to(self, phonemes: List[str]) -> bool:
+        if self.position == "initial":
+            return bool(phonemes) and phonemes[0] == self.target
+        if self.position == "final":
+            return bool(phonemes) and phonemes[-1] == self.target
+        return self.target in phonemes
+
+@dataclass(frozen=True)
+class LexiconEntry:
+    word: str
+    phonemes: Tuple[str, ...]
+    confusions: Tuple[ConfusionPair, ...]
+
+@lru_cache(maxsize=4)
+def load_confusions(path: Path = CONFUSIONS_FILE) -> List[ConfusionPair]:
+    with open(path, encoding="utf-8") as f:
+        return [ConfusionPair(**pair) for pair in json.load(f)]
+
+def _word_hash(word: bytes) -> int:
+    # 0 marks an empty slot's offset, not its hash, so any value is fine here
+    return zlib.crc32(word)
+
+def read_source(path: Path) -> Iterator[Tuple[str, List[str]]]:
+    """Parse CMUdict-format lines, skipping comments and alternate pronunciations"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith((";;;", "#")):
+                continue
+            parts = line.split()
+            word = parts[0].lower()
+            if word.endswith(")"):  # WORD(1) variants
+                continue
+            phonemes = [_STRESS.sub("", p).upper() for p in parts[1:]]
+            if phonemes:
+                yield word, phonemes
+
+def _fingerprint(source: Path, confusions_path: Path) -> int:
+    stat = source.stat()
+    seed = f"{source.resolve()}:{stat.st_size}:{int(stat.st_mtime)}".encode()
+    return zlib.crc32(confusions_path.read_bytes(), zlib.crc32(seed))
+
+def build_index(source: Path, out_path: Path, confusions_path: Path = CONFUSIONS_FILE) -> int:
+    """Compile the lexicon source into the binary index; returns entry count"""
+    pairs = load_confusions(confusions_path)
+    words: Dict[bytes, bytes] = {}
+    for word, phonemes in read_source(source):
+        key = word.encode("utf-8")[:255]
+        if key in words:
+            continue
+        pair_ids = [i for i, pair in enumerate(pairs) if pair.applies_to(phonemes)][:255]
+        words[key] = (
+            bytes([len(key)]) + key
+            + bytes([min(255, len(" ".join(phonemes)))]) + " ".join(phonemes).encode("ascii")[:255]
+            + bytes([len(pair_ids)]) + bytes(pair_ids)
+        )
+
+    buckets = 1
+    while buckets < max(8, len(words) * 2):
+        buckets *= 2
+    mask = buckets - 1
+    table = bytearray(buckets * _SLOT.size)
+    records = bytearray()
+    records_start = _HEADER.size + len(table)
+
+    for key, record in words.items():
+        h = _word_hash(key)
+        slot = h & mask
+        while _SLOT.unpack_from(table, slot * _SLOT.size)[1]:
+            slot = (slot + 1) & mask
+        _SLOT.pack_into(table, slot * _SLOT.size, h, records_start + len(records))
+        records += record
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so workers starting together never map a partial file
+    fd, tmp = tempfile.mkstemp(dir=out_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _fingerprint(source, confusions_path), len(words), buckets, 0))
+        f.write(table)
+        f.write(records)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, out_path)
+    return len(words)
+
+class LexiconIndex:
+    """Read-only view over a built index file"""
+
+    def __init__(self, path: Path, confusions: List[ConfusionPair]):
+        self.path = path
+        self.confusions = confusions
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.fingerprint, self.entries, self.buckets, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a lexicon index")
+        self._mask = self.buckets - 1
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def __contains__(self, word: str) -> bool:
+        return self._find(word.lower().encode("utf-8")) is not None
+
+    def _find(self, key: bytes) -> Optional[int]:
+        """Offset just past the word in its record, or None"""
+        h = _word_hash(key)
+        slot = h & self._mask
+        while True:
+            slot_hash, offset = _SLOT.unpack_from(self._mm, _HEADER.size + slot * _SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == h:
+                length = self._mm[offset]
+                if self._mm[offset + 1:offset + 1 + length] == key:
+                    return offset + 1 + length
+            slot = (slot + 1) & self._mask
+
+    def phonemes(self, word: str) -> Optional[List[str]]:
+        offset = self._find(word.lower().encode("utf-8"))
+        if offset is None:
+            return None
+        length = self._mm[offset]
+        return self._mm[offset + 1:offset + 1 + length].decode("ascii").split()
+
+    def lookup(self, word: str) -> Optional[LexiconEntry]:
+        word = word.lower()
+        offset = self._find(word.encode("utf-8"))
+        if offset is None:
+            return None
+        length = self._mm[offset]
+        phonemes = tuple(self._mm[offset + 1:offset + 1 + length].decode("ascii").split())
+        offset += 1 + length
+        count = self._mm[offset]
+        pair_ids = self._mm[offset + 1:offset + 1 + count]
+        return LexiconEntry(word, phonemes, tuple(self.confusions[i] for i in pair_ids))
+
+    def close(self):
+        self._mm.close()
+
+_lexicon: Optional[LexiconIndex] = None
+
+def _index_path() -> Path:
+    return Path(settings.lexicon_index_file)
+
+def load_lexicon() -> Optional[LexiconIndex]:
+    """Map the index, rebuilding it first if the source or pairs changed"""
+    global _lexicon
+    source = Path(settings.lexicon_source_file) if settings.lexicon_source_file else DEFAULT_SOURCE
+    confusions = load_confusions()
+    fingerprint = _fingerprint(source, CONFUSIONS_FILE)
+
+    for path in (_index_path(), Path(tempfile.gettempdir()) / "macca_lexicon.idx"):
+        try:
+            if path.exists():
+                try:
+                    index = LexiconIndex(path, confusions)
+                except (ValueError, struct.error):
+                    index = None  # truncated or foreign file: rebuild it
+                if index is not None and index.fingerprint == fingerprint:
+                    _lexicon = index
+                    break
+                if index is not None:
+                    index.close()
+            count = build_index(source, path)
+            logger.info(f"Built pronunciation lexicon index {path} ({count} words)")
+            _lexicon = LexiconIndex(path, confusions)
+            break
+        except OSError as e:
+            # Read-only filesystem (serverless): try the temp dir next
+            logger.warning(f"Could not use lexicon index at {path}: {e}")
+
+    if _lexicon is not None:
+        logger.info(f"Pronunciation lexicon: {len(_lexicon)} words from {source.name}")
+    return _lexicon
+
+def get_lexicon() -> Optional[LexiconIndex]:
+    if _lexicon is None:
+        return load_lexicon()
+    return _lexicon
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["build"]:
+        print("usage: python -m app.services.lexicon build [SOURCE] [OUT]")
+        sys.exit(1)
+    source = Path(sys.argv[2]) if len(sys.argv) > 2 else (Path(settings.lexicon_source_file) if settings.lexicon_source_file else DEFAULT_SOURCE)
+    out = Path(sys.argv[3]) if len(sys.argv) > 3 else _index_path()
+    print(f"{build_index(source, out)} words -> {out}")
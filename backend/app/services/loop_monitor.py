@@ -0,0 +1,225 @@
+"""Event-loop lag and blocking-call detector
+
+A task on the event loop wakes every `interval` seconds and records how
+late it woke up (loop lag). A watchdog thread checks that heartbeat; when
+the loop has been stuck for longer than `threshold`, it grabs the loop
+thread's stack *while it is still blocked*, so the report points at the
+synchronous DB query, password hash or CPU loop responsible rather than
+at whatever ran next. Offenders are aggregated by their innermost frame in
+our own code, logged, and served on /api/health/metrics.
+
+With `loop_monitor_asyncio_debug`, asyncio's own slow-callback warnings
+(debug mode, `slow_callback_duration = threshold`) are collected as well.
+Debug mode adds overhead, so it is meant for development.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.dirname(APP_DIR)
+
+def _location(frame) -> str:
+    filename = os.path.relpath(frame.f_code.co_filename, BACKEND_DIR)
+    return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+def blocking_location(frame) -> str:
+    """Innermost frame in our code (the caller of the blocking library), else innermost overall"""
+    innermost = frame
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(APP_DIR) and frame.f_code.co_filename != __file__:
+            return _location(frame)
+        frame = frame.f_back
+    return _location(innermost)
+
+class _SlowCallbackHandler(logging.Handler):
+    """Collects asyncio debug-mode 'Executing <Handle ...> took N seconds' warnings"""
+
+    def __init__(self, monitor: "LoopMonitor"):
+        super().__init__(logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if message.startswith("Executing"):
+            self.monitor.slow_callbacks.append(message[:300])
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        asyncio_debug: bool = False,
+        max_offenders: int = 50,
+        window: int = 600
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.asyncio_debug = asyncio_debug
+        self.max_offenders = max_offenders
+        self.lags: Deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.offenders: Dict[str, dict] = {}
+        self.slow_callbacks: Deque[str] = deque(maxlen=50)
+        self.in_flight: Dict[int, str] = {}  # id(scope) -> "GET /api/..."
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._captured_for: Optional[float] = None
+        self._pending: Optional[dict] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._slow_callback_handler: Optional[logging.Handler] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "LoopMonitor":
+        return cls(
+            interval=settings.loop_monitor_interval_seconds,
+            threshold=settings.loop_monitor_threshold_seconds,
+            asyncio_debug=settings.loop_monitor_asyncio_debug,
+            max_offenders=settings.loop_monitor_max_offenders
+        )
+
+    def ensure_started(self):
+        """Start on the running loop; cheap to call on every request
+
+        Started lazily so each (forked) worker monitors its own loop, and
+        restarted if the app is served by a new loop (tests).
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._pending = None
+        self._task = loop.create_task(self._tick())
+        if self.asyncio_debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+            if self._slow_callback_handler is None:
+                self._slow_callback_handler = _SlowCallbackHandler(self)
+                logging.getLogger("asyncio").addHandler(self._slow_callback_handler)
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+            self._watchdog.start()
+        logger.info(f"Event loop monitor started (interval={self.interval}s, threshold={self.threshold}s, asyncio_debug={self.asyncio_debug})")
+
+    async def _tick(self):
+        while True:
+            started = time.monotonic()
+            self._heartbeat = started
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, time.monotonic() - started - self.interval))
+
+    def _watch(self):
+        while True:
+            time.sleep(self.threshold / 2)
+            beat = self._heartbeat
+            if time.monotonic() - beat < self.interval + self.threshold or self._captured_for == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._captured_for = beat
+            try:
+                requests = list(self.in_flight.values())[:5]
+            except RuntimeError:  # changed under us: the loop got unstuck
+                requests = []
+            with self._lock:
+                self._pending = {
+                    "location": blocking_location(frame),
+                    "stack": traceback.format_stack(frame)[-12:],
+                    "requests": requests
+                }
+
+    def record_lag(self, lag: float):
+        self.lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag < self.threshold:
+            return
+        self.stalls += 1
+        with self._lock:
+            capture, self._pending = self._pending, None
+        if capture is None:
+            # Shorter than the watchdog's resolution: lag is known, culprit is not
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms")
+            return
+        self._record_offender(capture, lag)
+        logger.warning(
+            f"Event loop blocked for {lag * 1000:.0f}ms at {capture['location']} "
+            f"(requests: {', '.join(capture['requests']) or 'none'})\n{''.join(capture['stack'])}"
+        )
+
+    def _record_offender(self, capture: dict, lag: float):
+        offender = self.offenders.get(capture["location"])
+        if offender is None:
+            if len(self.offenders) >= self.max_offenders:
+                # Forget the least costly offender to stay bounded
+                del self.offenders[min(self.offenders, key=lambda k: self.offenders[k]["total_seconds"])]
+            offender = self.offenders[capture["location"]] = {
+                "location": capture["location"], "count": 0, "total_seconds": 0.0, "max_seconds": 0.0
+            }
+        offender["count"] += 1
+        offender["total_seconds"] += lag
+        offender["max_seconds"] = max(offender["max_seconds"], lag)
+        offender["last_stack"] = capture["stack"]
+        offender["last_requests"] = capture["requests"]
+
+    def snapshot(self, details: bool = True) -> dict:
+        """Lag and offender metrics; `details=False` drops stacks, request paths and callback reprs"""
+        ordered = sorted(self.lags)
+
+        def quantile(q: float) -> Optional[float]:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4) if ordered else None
+
+        offenders: List[dict] = sorted(self.offenders.values(), key=lambda o: o["total_seconds"], reverse=True)
+        if not details:
+            offenders = [{k: v for k, v in o.items() if k not in ("last_stack", "last_requests")} for o in offenders]
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "asyncio_debug": self.asyncio_debug,
+            "lag_seconds": {
+                "last": round(self.lags[-1], 4) if self.lags else None,
+                "p50": quantile(0.5),
+                "p99": quantile(0.99),
+                "max": round(self.max_lag, 4)
+            },
+            "stalls": self.stalls,
+            "offenders": [{**o, "total_seconds": round(o["total_seconds"], 4), "max_seconds": round(o["max_seconds"], 4)} for o in offenders],
+            "slow_callbacks": list(self.slow_callbacks) if details else len(self.slow_callbacks)
+        }
+
+class LoopMonitorMiddleware:
+    """Starts the monitor and tracks in-flight requests for attribution"""
+
+    def __init__(self, app, monitor: Optional[LoopMonitor] = None):
+        self.app = app
+        self.monitor = monitor or loop_monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        self.monitor.ensure_started()
+        key = id(scope)
+        self.monitor.in_flight[key] = f"{scope.get('method', 'WS')} {scope['path']}"
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.in_flight.pop(key, None)
+
+loop_monitor = LoopMonitor.from_settings()
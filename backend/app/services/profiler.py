@@ -0,0 +1,251 @@
+"""Opt-in sampling profiler for individual requests
+
+A single background thread samples the stacks of the requests being
+profiled every `profiler_interval_ms`. While a request's task is running on
+the loop, its live frames are sampled; while it is suspended, its await
+chain is, ending in an `[await]` leaf. So a profile is wall-clock: an LLM
+call shows up as time spent awaiting it, a synchronous DB query as time
+in the driver. Samples are stored as folded stacks ("a;b;c 12" per line),
+which flamegraph.pl and speedscope read directly.
+
+Profiles go to the state backend, so with Redis every worker's profiles
+can be listed and downloaded from any worker.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.services.state_backend import StateBackend, state_backend
+from app.services.tracing import request_id_var
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX_KEY = "profiles:index"
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+def _label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{frame.f_code.co_name} ({filename}:{frame.f_code.co_firstlineno})".replace(";", ",")
+
+def _is_loop_dispatch(frame) -> bool:
+    # asyncio's Handle._run: everything below it is event loop machinery
+    return frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(os.path.join("asyncio", "events.py"))
+
+def running_stack(frame) -> List[str]:
+    """Live frames of the running task, outermost first"""
+    stack = []
+    while frame is not None and not _is_loop_dispatch(frame):
+        stack.append(_label(frame))
+        frame = frame.f_back
+    return stack[::-1]
+
+def awaiting_stack(task: asyncio.Task) -> List[str]:
+    """Await chain of a suspended task, outermost first"""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            stack.append(_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    stack.append("[await]")
+    return stack
+
+def _current_task(loop) -> Optional[asyncio.Task]:
+    current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+    return current_tasks.get(loop) if isinstance(current_tasks, dict) else None
+
+@dataclass
+class Profile:
+    request_id: str
+    method: str
+    path: str
+    task: asyncio.Task
+    loop: asyncio.AbstractEventLoop
+    thread_id: int
+    started_at: float = field(default_factory=time.time)
+    started: float = field(default_factory=time.perf_counter)
+    duration_seconds: float = 0.0
+    status_code: Optional[int] = None
+    samples: Counter = field(default_factory=Counter)
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration_seconds, 4),
+            "samples": sum(self.samples.values()),
+            "worker_pid": os.getpid()
+        }
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, backend: Optional[StateBackend] = None, max_profiles: int = 100, ttl_seconds: float = 86400):
+        self.interval = interval
+        self.backend = backend or state_backend
+        self.max_profiles = max_profiles
+        self.ttl_seconds = ttl_seconds
+        self._active: Dict[int, Profile] = {}  # by id(): clients may reuse a request id
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "SamplingProfiler":
+        return cls(
+            interval=settings.profiler_interval_ms / 1000,
+            max_profiles=settings.profiler_max_profiles,
+            ttl_seconds=settings.profiler_ttl_seconds
+        )
+
+    def start(self, method: str, path: str, request_id: Optional[str] = None) -> Profile:
+        """Profile the calling task until `stop`"""
+        if not request_id or not REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        profile = Profile(
+            request_id=request_id,
+            method=method,
+            path=path,
+            task=asyncio.current_task(),
+            loop=asyncio.get_running_loop(),
+            thread_id=threading.get_ident()
+        )
+        with self._lock:
+            self._active[id(profile)] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return profile
+
+    def stop(self, profile: Profile, status_code: Optional[int] = None, overwrite: bool = True):
+        with self._lock:
+            self._active.pop(id(profile), None)
+        profile.duration_seconds = time.perf_counter() - profile.started
+        profile.status_code = status_code
+        if not self.save(profile, overwrite):
+            logger.warning(f"Profile {profile.request_id} already exists; kept the stored one")
+            return
+        logger.info(f"Profiled {profile.method} {profile.path} ({profile.request_id}): {profile.duration_seconds * 1000:.0f}ms, {sum(profile.samples.values())} samples")
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                # Under the lock, so `stop` never sees a profile mid-sample
+                active = list(self._active.values())
+                if active:
+                    frames = sys._current_frames()
+                    for profile in active:
+                        self.sample(profile, frames)
+            if not active:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            time.sleep(self.interval)
+
+    def sample(self, profile: Profile, frames: Optional[dict] = None):
+        if profile.task.done():
+            return
+        frames = frames if frames is not None else sys._current_frames()
+        current = _current_task(profile.loop)
+        if current is profile.task:
+            stack = running_stack(frames.get(profile.thread_id))
+        else:
+            stack = awaiting_stack(profile.task)
+        if stack:
+            profile.samples[";".join(stack)] += 1
+
+    # Storage: one key per profile plus a bounded index of recent ids
+    def save(self, profile: Profile, overwrite: bool = True) -> bool:
+        data = {**profile.summary(), "folded": profile.folded()}
+        key = f"profile:{profile.request_id}"
+        if overwrite:
+            self.backend.set(key, json.dumps(data), ttl_seconds=self.ttl_seconds)
+        elif not self.backend.set_if_absent(key, json.dumps(data), ttl_seconds=self.ttl_seconds):
+            return False
+        index = [entry for entry in self.recent() if entry["request_id"] != profile.request_id]
+        index.insert(0, profile.summary())
+        self.backend.set(INDEX_KEY, json.dumps(index[:self.max_profiles]), ttl_seconds=self.ttl_seconds)
+        return True
+
+    def recent(self) -> List[dict]:
+        raw = self.backend.get(INDEX_KEY)
+        return json.loads(raw) if raw else []
+
+    def load(self, request_id: str) -> Optional[dict]:
+        raw = self.backend.get(f"profile:{request_id}")
+        return json.loads(raw) if raw else None
+
+def admin_token_valid(candidate: Optional[str]) -> bool:
+    """Constant-time check against PROFILER_ADMIN_TOKEN (False while it is unset)
+
+    Compared as bytes: compare_digest rejects non-ASCII str arguments.
+    """
+    token = settings.profiler_admin_token
+    if not token or not candidate:
+        return False
+    return hmac.compare_digest(candidate.encode("utf-8"), token.encode("utf-8"))
+
+def should_sample() -> bool:
+    return settings.profiler_sample_rate > 0 and random.random() < settings.profiler_sample_rate
+
+class ProfilerMiddleware:
+    """Profiles sampled or explicitly requested HTTP requests
+
+    Profiles are named after the request id that TracingMiddleware logs and
+    returns in X-Request-ID. Sampled requests choose that id without the
+    admin token, so their profiles are only stored under an unused id and
+    never overwrite an existing profile.
+    """
+
+    def __init__(self, app, profiler: Optional[SamplingProfiler] = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        requested = admin_token_valid(headers.get("x-profile-token"))
+        if not requested and not should_sample():
+            return await self.app(scope, receive, send)
+
+        profile = self.profiler.start(scope["method"], scope["path"], request_id_var.get() or headers.get("x-request-id"))
+        status = {}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if requested:
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", profile.request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            # Saving is a state backend round trip; keep it off the loop
+            await asyncio.to_thread(self.profiler.stop, profile, status.get("code"), requested)
+
+request_profiler = SamplingProfiler.from_settings()
@@ -0,0 +1,146 @@
+"""Token-budget aware prompt assembly with a local tokenizer"""
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+from app.schemas.macca import ConversationMessage
+from app.services.tracing import set_attributes
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough BPE behaviour for English: words, numbers and punctuation runs
+_PIECES = re.compile(r"\w+|[^\w\s]+")
+
+@dataclass(frozen=True)
+class ModeBudget:
+    prompt_tokens: int  # system prompt + examples + history + user text
+    max_output_tokens: int  # sent as max_tokens; generation time scales with it
+
+# A pronunciation tip is a sentence or two of JSON; a guided lesson turn also
+# carries drills and a next prompt.
+MODE_BUDGETS: Dict[str, ModeBudget] = {
+    "live_conversation": ModeBudget(prompt_tokens=3000, max_output_tokens=600),
+    "guided_lesson": ModeBudget(prompt_tokens=3500, max_output_tokens=900),
+    "pronunciation_coach": ModeBudget(prompt_tokens=2000, max_output_tokens=350),
+}
+
+def _heuristic_count(text: str) -> int:
+    # Long words split into several BPE pieces; ~1 token per 4 chars of a piece
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _PIECES.findall(text))
+
+@lru_cache(maxsize=8)
+def get_token_counter(model_id: str) -> Callable[[str], int]:
+    """Best available local tokenizer for `model_id`
+
+    Uses the model's own tokenizer.json via `tokenizers` when TOKENIZER_FILE
+    is set, else tiktoken's cl100k_base (close to Llama 3's BPE), else a
+    regex estimate. Nothing here calls the network.
+    """
+    if settings.tokenizer_file:
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_file(settings.tokenizer_file)
+            logger.info(f"Token counting for {model_id} with {settings.tokenizer_file}")
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer file {settings.tokenizer_file}: {e}")
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        logger.info(f"Token counting for {model_id} with heuristic estimate")
+        return _heuristic_count
+
+def count_tokens(text: Optional[str], model_id: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    return get_token_counter(model_id or settings.groq_model_id)(text)
+
+# Chat templates add a few tokens of role markup per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+@dataclass
+class AssembledPrompt:
+    messages: List[dict]
+    prompt_tokens: int
+    max_tokens: int
+    examples_used: int
+    history_used: int
+
+def assemble_messages(
+    system_prompt: str,
+    user_text: str,
+    mode: str,
+    history: Sequence[ConversationMessage] = (),
+    examples: Sequence[str] = (),
+    model_id: Optional[str] = None
+) -> AssembledPrompt:
+    """Build chat messages that fit the mode's prompt budget
+
+    The system prompt and the current utterance are always sent. Few-shot
+    examples are added in order, then history newest-first, while they fit.
+    """
+    budget = MODE_BUDGETS.get(mode, MODE_BUDGETS["live_conversation"])
+    count = lambda text: count_tokens(text, model_id) + MESSAGE_OVERHEAD_TOKENS
+
+    used = count(system_prompt) + count(user_text)
+
+    kept_examples: List[str] = []
+    for example in examples:
+        cost = count_tokens(example, model_id)
+        if used + cost > budget.prompt_tokens:
+            break
+        kept_examples.append(example)
+        used += cost
+
+    kept_history: List[ConversationMessage] = []
+    for message in reversed(history):
+        cost = count(message.content)
+        if used + cost > budget.prompt_tokens:
+            break
+        kept_history.append(message)
+        used += cost
+    kept_history.reverse()
+
+    system_content = system_prompt
+    if kept_examples:
+        system_content += "\n\nFew-Shot Examples:\n\n" + "\n\n".join(kept_examples) + \
+            "\n\nNow respond to the user's input following these examples."
+
+    messages = [{"role": "system", "content": system_content}]
+    messages += [{"role": m.role, "content": m.content} for m in kept_history]
+    messages.append({"role": "user", "content": user_text})
+
+    if len(kept_examples) < len(examples) or len(kept_history) < len(history):
+        logger.info(
+            f"Prompt trimmed for {mode}: examples {len(kept_examples)}/{len(examples)}, "
+            f"history {len(kept_history)}/{len(history)}, ~{used} tokens"
+        )
+
+    return AssembledPrompt(
+        messages=messages,
+        prompt_tokens=used,
+        max_tokens=budget.max_output_tokens,
+        examples_used=len(kept_examples),
+        history_used=len(kept_history)
+    )
+
+def log_usage(provider: str, model_id: str, mode: str, estimated_prompt_tokens: int, usage: Optional[dict]):
+    """Log the upstream's reported token usage next to our local estimate"""
+    set_attributes(llm__model=model_id, llm__mode=mode, llm__estimated_prompt_tokens=estimated_prompt_tokens)
+    if not usage:
+        return
+    set_attributes(
+        llm__prompt_tokens=usage.get("prompt_tokens"),
+        llm__completion_tokens=usage.get("completion_tokens"),
+        llm__total_tokens=usage.get("total_tokens")
+    )
+    logger.info(
+        f"LLM usage provider={provider} model={model_id} mode={mode} "
+        f"prompt_tokens={usage.get('prompt_tokens')} (est {estimated_prompt_tokens}) "
+        f"completion_tokens={usage.get('completion_tokens')} total_tokens={usage.get('total_tokens')}"
+    )
@@ -0,0 +1,57 @@
+"""Per-word pronunciation guidance cache shared by the analyze endpoints"""
+
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.schemas.macca import PronunciationFeedbackLegacy
+from app.config import settings
+
+_NON_WORD = re.compile(r"[^a-z' -]")
+
+def normalize_word(word: str) -> str:
+    return _NON_WORD.sub("", word.lower()).strip()
+
+class PronunciationGuidanceCache:
+    """LRU of LLM pronunciation tips keyed by (word, explanation language)
+
+    Guidance for a word does not depend on who asks, so a lesson's target
+    vocabulary only costs an LLM call the first time any learner drills it.
+    """
+
+    def __init__(self, max_words: int = 5000, ttl_seconds: float = 86400):
+        self.max_words = max_words
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[PronunciationFeedbackLegacy]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, word: str, language: str) -> Optional[List[PronunciationFeedbackLegacy]]:
+        key = (normalize_word(word), language)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, word: str, language: str, feedback: List[PronunciationFeedbackLegacy]):
+        key = (normalize_word(word), language)
+        self._entries[key] = (time.monotonic(), feedback)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_words:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"words": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+pronunciation_cache = PronunciationGuidanceCache(
+    max_words=settings.pronunciation_cache_max_words,
+    ttl_seconds=settings.pronunciation_cache_ttl_seconds
+)
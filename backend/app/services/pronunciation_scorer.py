@@ -0,0 +1,255 @@
+"""Phoneme-level pronunciation scoring against a CMUdict-style lexicon
+
+The recognized transcript and the target word are both mapped to ARPAbet
+phonemes and aligned with a weighted edit distance whose substitution cost
+comes from articulatory features, so "tink" for "think" costs less than
+"pink". Each target phoneme gets a goodness score from its alignment cost;
+the worst one becomes the feedback's target_sound.
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.services.lexicon import get_lexicon, load_confusions
+
+logger = logging.getLogger(__name__)
+
+# Place (0 bilabial .. 8 glottal), manner, voiced
+_CONSONANTS: Dict[str, Tuple[int, str, int]] = {
+    "P": (0, "stop", 0), "B": (0, "stop", 1), "M": (0, "nasal", 1), "W": (0, "glide", 1),
+    "F": (1, "fricative", 0), "V": (1, "fricative", 1),
+    "TH": (2, "fricative", 0), "DH": (2, "fricative", 1),
+    "T": (3, "stop", 0), "D": (3, "stop", 1), "N": (3, "nasal", 1), "S": (3, "fricative", 0),
+    "Z": (3, "fricative", 1), "L": (3, "lateral", 1), "R": (4, "approximant", 1),
+    "SH": (5, "fricative", 0), "ZH": (5, "fricative", 1), "CH": (5, "affricate", 0), "JH": (5, "affricate", 1),
+    "Y": (6, "glide", 1), "K": (7, "stop", 0), "G": (7, "stop", 1), "NG": (7, "nasal", 1),
+    "HH": (8, "fricative", 0),
+}
+
+# Height (0 high .. 3 low), backness (0 front .. 2 back), rounded, diphthong
+_VOWELS: Dict[str, Tuple[float, float, int, int]] = {
+    "IY": (0, 0, 0, 0), "IH": (0.5, 0.2, 0, 0), "EY": (1, 0, 0, 1), "EH": (1.5, 0, 0, 0),
+    "AE": (2.5, 0, 0, 0), "AA": (3, 2, 0, 0), "AH": (2, 1, 0, 0), "AO": (2.5, 2, 1, 0),
+    "OW": (1, 2, 1, 1), "UH": (0.5, 1.8, 1, 0), "UW": (0, 2, 1, 0), "ER": (1.5, 1, 0, 0),
+    "AW": (2.5, 1, 1, 1), "AY": (2.5, 0.5, 0, 1), "OY": (2, 1.5, 1, 1),
+}
+
+PHONEMES: List[str] = list(_CONSONANTS) + list(_VOWELS)
+PHONEME_INDEX: Dict[str, int] = {p: i for i, p in enumerate(PHONEMES)}
+
+IPA = {
+    "P": "p", "B": "b", "M": "m", "W": "w", "F": "f", "V": "v", "TH": "θ", "DH": "ð",
+    "T": "t", "D": "d", "N": "n", "S": "s", "Z": "z", "L": "l", "R": "r", "SH": "ʃ",
+    "ZH": "ʒ", "CH": "tʃ", "JH": "dʒ", "Y": "j", "K": "k", "G": "g", "NG": "ŋ", "HH": "h",
+    "IY": "iː", "IH": "ɪ", "EY": "eɪ", "EH": "ɛ", "AE": "æ", "AA": "ɑː", "AH": "ʌ", "AO": "ɔː",
+    "OW": "oʊ", "UH": "ʊ", "UW": "uː", "ER": "ɜːr", "AW": "aʊ", "AY": "aɪ", "OY": "ɔɪ",
+}
+
+INDEL_COST = 1.0
+# A substituted sound is never "good": near misses score up to this
+SUBSTITUTION_CEILING = 70
+
+def _build_substitution_costs() -> np.ndarray:
+    """Pairwise substitution cost in [0, 1] from articulatory features"""
+    n = len(PHONEMES)
+    is_vowel = np.array([p in _VOWELS for p in PHONEMES])
+
+    place = np.array([_CONSONANTS[p][0] if p in _CONSONANTS else 0 for p in PHONEMES], dtype=float)
+    manners = sorted({m for _, m, _ in _CONSONANTS.values()})
+    manner = np.array([manners.index(_CONSONANTS[p][1]) if p in _CONSONANTS else -1 for p in PHONEMES])
+    voiced = np.array([_CONSONANTS[p][2] if p in _CONSONANTS else 1 for p in PHONEMES], dtype=float)
+    consonant_cost = (
+        0.45 * np.minimum(np.abs(place[:, None] - place[None, :]) / 3.0, 1.0)
+        + 0.35 * (manner[:, None] != manner[None, :])
+        + 0.2 * np.abs(voiced[:, None] - voiced[None, :])
+    )
+
+    features = np.array([_VOWELS.get(p, (0, 0, 0, 0)) for p in PHONEMES], dtype=float)
+    vowel_cost = (
+        0.4 * np.abs(features[:, None, 0] - features[None, :, 0]) / 3.0
+        + 0.3 * np.abs(features[:, None, 1] - features[None, :, 1]) / 2.0
+        + 0.15 * np.abs(features[:, None, 2] - features[None, :, 2])
+        + 0.15 * np.abs(features[:, None, 3] - features[None, :, 3])
+    )
+
+    costs = np.where(is_vowel[:, None] & is_vowel[None, :], vowel_cost, consonant_cost)
+    costs = np.where(is_vowel[:, None] != is_vowel[None, :], 1.0, costs)
+    costs[np.arange(n), np.arange(n)] = 0.0
+    return np.clip(costs, 0.0, 1.0)
+
+SUBSTITUTION_COSTS = _build_substitution_costs()
+
+# Spelling -> phoneme rules, longest match first
+_G2P_RULES: List[Tuple[str, List[str]]] = sorted([
+    ("tch", ["CH"]), ("dge", ["JH"]), ("igh", ["AY"]), ("ough", ["AO"]), ("tion", ["SH", "AH", "N"]),
+    ("sion", ["ZH", "AH", "N"]), ("th", ["TH"]), ("sh", ["SH"]), ("ch", ["CH"]), ("ph", ["F"]),
+    ("ng", ["NG"]), ("nk", ["NG", "K"]), ("ck", ["K"]), ("wh", ["W"]), ("qu", ["K", "W"]), ("kn", ["N"]), ("wr", ["R"]),
+    ("ee", ["IY"]), ("ea", ["IY"]), ("oo", ["UW"]), ("ai", ["EY"]), ("ay", ["EY"]), ("oa", ["OW"]),
+    ("ou", ["AW"]), ("ow", ["OW"]), ("oi", ["OY"]), ("oy", ["OY"]), ("au", ["AO"]), ("aw", ["AO"]),
+    ("er", ["ER"]), ("ir", ["ER"]), ("ur", ["ER"]), ("ar", ["AA", "R"]), ("or", ["AO", "R"]),
+    ("a", ["AE"]), ("e", ["EH"]), ("i", ["IH"]), ("o", ["AA"]), ("u", ["AH"]), ("y", ["IY"]),
+    ("b", ["B"]), ("c", ["K"]), ("d", ["D"]), ("f", ["F"]), ("g", ["G"]), ("h", ["HH"]), ("j", ["JH"]),
+    ("k", ["K"]), ("l", ["L"]), ("m", ["M"]), ("n", ["N"]), ("p", ["P"]), ("r", ["R"]), ("s", ["S"]),
+    ("t", ["T"]), ("v", ["V"]), ("w", ["W"]), ("x", ["K", "S"]), ("z", ["Z"]),
+], key=lambda rule: -len(rule[0]))
+
+_G2P_SINGLE = {spelling: sounds for spelling, sounds in _G2P_RULES if len(spelling) == 1}
+
+_WORD = re.compile(r"[a-z']+")
+
+def g2p(word: str) -> List[str]:
+    """Rough English spelling-to-phoneme fallback for words not in the lexicon"""
+    word = word.lower().replace("'", "")
+    if word.endswith("e") and len(word) > 2 and word[-2] not in "aeiou":
+        word = word[:-1]  # silent final e
+    phonemes: List[str] = []
+    i = 0
+    while i < len(word):
+        for spelling, sounds in _G2P_RULES:
+            if word.startswith(spelling, i):
+                if sounds == ["ER"] and word[i + 2:i + 3] in ("a", "e", "i", "o", "u", "y", "r"):
+                    sounds = _G2P_SINGLE[spelling[0]] + ["R"]  # "very", "firing": r starts the next syllable
+                if not phonemes or phonemes[-1] != sounds[0] or len(sounds) > 1:
+                    phonemes.extend(sounds)
+                i += len(spelling)
+                break
+        else:
+            i += 1
+    return phonemes
+
+def pronounce(text: str) -> List[str]:
+    """ARPAbet phonemes for a word or phrase (lexicon first, then spelling rules)"""
+    lexicon = get_lexicon()
+    phonemes: List[str] = []
+    for word in _WORD.findall(text.lower()):
+        known = lexicon.phonemes(word) if lexicon else None
+        phonemes.extend(p for p in (known or g2p(word)) if p in PHONEME_INDEX)
+    return phonemes
+
+def align(target: Sequence[str], heard: Sequence[str]) -> Tuple[float, List[Tuple[Optional[str], Optional[str]]]]:
+    """Weighted edit-distance alignment of two phoneme sequences
+
+    Rows are filled with NumPy: substitutions and deletions come from the
+    previous row, and insertions along the row are a running minimum of
+    `row[k] - k * INDEL_COST`, so there is no inner Python loop.
+    """
+    t = np.array([PHONEME_INDEX[p] for p in target], dtype=int)
+    h = np.array([PHONEME_INDEX[p] for p in heard], dtype=int)
+    n, m = len(t), len(h)
+    offsets = np.arange(m + 1) * INDEL_COST
+
+    dp = np.empty((n + 1, m + 1))
+    dp[0] = offsets
+    for i in range(1, n + 1):
+        candidate = np.empty(m + 1)
+        candidate[0] = dp[i - 1, 0] + INDEL_COST
+        candidate[1:] = np.minimum(
+            dp[i - 1, :-1] + SUBSTITUTION_COSTS[t[i - 1], h],
+            dp[i - 1, 1:] + INDEL_COST
+        )
+        dp[i] = np.minimum.accumulate(candidate - offsets) + offsets
+
+    pairs: List[Tuple[Optional[str], Optional[str]]] = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and np.isclose(dp[i, j], dp[i - 1, j - 1] + SUBSTITUTION_COSTS[t[i - 1], h[j - 1]]):
+            pairs.append((target[i - 1], heard[j - 1]))
+            i, j = i - 1, j - 1
+        elif i > 0 and np.isclose(dp[i, j], dp[i - 1, j] + INDEL_COST):
+            pairs.append((target[i - 1], None))
+            i -= 1
+        else:
+            pairs.append((None, heard[j - 1]))
+            j -= 1
+    pairs.reverse()
+    return float(dp[n, m]), pairs
+
+@dataclass
+class PhonemeScore:
+    phoneme: str
+    heard: Optional[str]  # None when the sound was dropped
+    score: int
+
+    @property
+    def ipa(self) -> str:
+        return f"/{IPA.get(self.phoneme, self.phoneme.lower())}/"
+
+@dataclass
+class WordScore:
+    word: str
+    heard_text: str
+    score: int
+    phonemes: List[PhonemeScore] = field(default_factory=list)
+    inserted: List[str] = field(default_factory=list)
+
+    def weakest(self, threshold: int = 75, limit: int = 3) -> List[PhonemeScore]:
+        weak = [p for p in self.phonemes if p.score < threshold]
+        return sorted(weak, key=lambda p: p.score)[:limit]
+
+def _score_against(target_text: str, target: List[str], heard_text: str) -> WordScore:
+    heard = pronounce(heard_text)
+    _, pairs = align(target, heard)
+    phonemes: List[PhonemeScore] = []
+    inserted: List[str] = []
+    for expected, got in pairs:
+        if expected is None:
+            inserted.append(got)
+        elif got is None:
+            phonemes.append(PhonemeScore(expected, None, 0))
+        else:
+            cost = SUBSTITUTION_COSTS[PHONEME_INDEX[expected], PHONEME_INDEX[got]]
+            ceiling = 100 if expected == got else SUBSTITUTION_CEILING
+            phonemes.append(PhonemeScore(expected, got, int(round(ceiling * (1 - cost)))))
+    score = np.mean([p.score for p in phonemes]) if phonemes else 0.0
+    score -= 10.0 * len(inserted) / max(1, len(target))
+    return WordScore(
+        word=target_text,
+        heard_text=heard_text,
+        score=int(round(max(0.0, min(100.0, score)))),
+        phonemes=phonemes,
+        inserted=inserted
+    )
+
+def sound_tip(phoneme: PhonemeScore) -> Tuple[str, str]:
+    """Indonesian/English tip for a weak phoneme"""
+    if phoneme.heard is None:
+        return (f"Jangan hilangkan bunyi {phoneme.ipa}. Ucapkan dengan jelas, terutama di akhir kata.",
+                f"Don't drop the {phoneme.ipa} sound. Say it clearly, especially at the end of the word.")
+    pairs = [pair for pair in load_confusions() if pair.target == phoneme.phoneme]
+    for pair in sorted(pairs, key=lambda pair: pair.substitute != phoneme.heard):
+        if pair.substitute in (phoneme.heard, None):
+            return pair.tip_id, pair.tip_en
+    heard = f"/{IPA.get(phoneme.heard, phoneme.heard.lower())}/"
+    return (f"Bunyi {phoneme.ipa} terdengar seperti {heard}. Dengarkan dan ulangi pelan-pelan.",
+            f"The {phoneme.ipa} sound came out as {heard}. Listen and repeat slowly.")
+
+def score_pronunciation(target_text: str, transcript: str) -> WordScore:
+    """Score what was recognized against the target word or phrase
+
+    For a single target word each recognized word is tried and the best
+    match wins, so fillers like "uh, think" don't sink the score.
+    """
+    start = time.perf_counter()
+    target = pronounce(target_text)
+    heard_words = _WORD.findall(transcript.lower())
+
+    if not target or not heard_words:
+        result = WordScore(
+            word=target_text,
+            heard_text=transcript,
+            score=0,
+            phonemes=[PhonemeScore(p, None, 0) for p in target]
+        )
+    elif len(_WORD.findall(target_text.lower())) == 1:
+        result = max(
+            (_score_against(target_text, target, heard) for heard in heard_words),
+            key=lambda s: s.score
+        )
+    else:
+        result = _score_against(target_text, target, " ".join(heard_words))
+
+    logger.debug(f"Scored '{target_text}' vs '{transcript}' = {result.score} in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return result
@@ -0,0 +1,35 @@
+"""Per-client request rate limits for routes that spend upstream quota"""
+
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.config import settings
+
+class ClientRateLimiter:
+    """Fixed-window request counter per client key, LRU-bounded
+
+    Counts are per process, so with several workers a client gets up to
+    `limit` requests per window on each of them.
+    """
+
+    def __init__(self, limit: int, window_seconds: float = 60.0, max_clients: int = 10000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_clients = max_clients
+        self._windows: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+
+    def check(self, key: str) -> Optional[float]:
+        """Count a request; None if allowed, else seconds until the window resets"""
+        now = time.monotonic()
+        started, count = self._windows.get(key, (now, 0))
+        if now - started >= self.window_seconds:
+            started, count = now, 0
+        if count >= self.limit:
+            return self.window_seconds - (now - started)
+        self._windows[key] = (started, count + 1)
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_clients:
+            self._windows.popitem(last=False)
+        return None
+
+speech_stream_limiter = ClientRateLimiter(settings.tts_stream_requests_per_minute)
@@ -0,0 +1,48 @@
+"""Split streamed reply text into sentences as soon as each one is complete"""
+
+import re
+from typing import AsyncIterator, List
+
+_BOUNDARY = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s)")
+_ABBREVIATIONS = frozenset({"mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "approx"})
+
+class SentenceBuffer:
+    """Collects text deltas and releases complete sentences
+
+    A sentence ends at ., ! or ? followed by whitespace, except after a
+    common abbreviation ("Mr. Smith"); decimals never match because no
+    space follows the dot. Fragments shorter than `min_chars` ("Ok.") are
+    merged into the next sentence so TTS is not called for a single word.
+    """
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._text = ""
+
+    def push(self, text: str) -> List[str]:
+        self._text += text
+        sentences: List[str] = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._text):
+            before = self._text[start:match.start()].split()
+            if match.group().startswith(".") and before and before[-1].lower().rstrip(".") in _ABBREVIATIONS:
+                continue
+            sentence = self._text[start:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self._text = self._text[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest, self._text = self._text.strip(), ""
+        return [rest] if rest else []
+
+async def stream_sentences(text_chunks: AsyncIterator[str], min_chars: int = 12) -> AsyncIterator[str]:
+    buffer = SentenceBuffer(min_chars)
+    async for text in text_chunks:
+        for sentence in buffer.push(text):
+            yield sentence
+    for sentence in buffer.flush():
+        yield sentence
@@ -0,0 +1,119 @@
+"""Closing sessions: duration when they end, summaries later in batches
+
+`duration_seconds` is written the moment a session ends, either through
+`POST /session/{id}/end` or by the worker closing sessions idle for
+`session_idle_close_seconds`, so the progress dashboard only sums a column.
+Summaries need the LLM and nobody waits for them: ended sessions are
+picked up by one `summarize_sessions` job per window (pushed into the
+off-peak hours if configured), which summarizes several per call.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select
+from app.db.database import session_scope
+from app.db.models import Session, Utterance
+from app.jobs.queue import PRIORITY_LOW, enqueue
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; they are UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+END_EXPLICIT = "ended"
+END_IDLE = "idle"
+
+def close_session(row: Session, ended_at: datetime, reason: str = END_EXPLICIT) -> bool:
+    """Record the end time and duration; False if the session was already closed
+
+    Explicitly ending an idle-closed session keeps its recorded times but
+    stops later turns from reopening it.
+    """
+    if row.ended_at is not None:
+        if reason == END_EXPLICIT:
+            row.end_reason = END_EXPLICIT
+        return False
+    ended_at = as_utc(ended_at)
+    started_at = as_utc(row.started_at) or ended_at
+    row.ended_at = ended_at
+    row.duration_seconds = max(0, int((ended_at - started_at).total_seconds()))
+    row.end_reason = reason
+    return True
+
+def can_reopen(row: Session) -> bool:
+    """Only idle closes are undone by a later turn; an explicit end is final"""
+    return row.end_reason == END_IDLE
+
+def reopen_session(row: Session):
+    """A turn after an idle close continues the session"""
+    row.ended_at = None
+    row.duration_seconds = None
+    row.end_reason = None
+    row.summary = None
+
+def parse_hours(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'1-6' -> (1, 6): from 01:00 up to 06:00 UTC"""
+    if not spec:
+        return None
+    start, end = (int(part) % 24 for part in spec.split("-", 1))
+    return start, end
+
+def _in_hours(hour: int, hours: Tuple[int, int]) -> bool:
+    start, end = hours
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+def summary_run_at(now: datetime) -> datetime:
+    """End of the current batching window, moved into the off-peak hours if set"""
+    window = settings.session_summary_window_seconds
+    run_at = datetime.fromtimestamp((now.timestamp() // window + 1) * window, timezone.utc)
+    hours = parse_hours(settings.session_summary_offpeak_hours)
+    if hours and not _in_hours(run_at.hour, hours):
+        start = run_at.replace(hour=hours[0], minute=0, second=0, microsecond=0)
+        run_at = start if start > run_at else start + timedelta(days=1)
+    return run_at
+
+def schedule_summaries(now: Optional[datetime] = None) -> str:
+    """Make sure a summary run is queued for the sessions ended so far"""
+    now = now or datetime.now(timezone.utc)
+    run_at = summary_run_at(now)
+    return enqueue(
+        "summarize_sessions",
+        priority=PRIORITY_LOW,
+        idempotency_key=f"summarize_sessions:{int(run_at.timestamp())}",
+        delay_seconds=(run_at - now).total_seconds()
+    )
+
+def close_idle_sessions(now: Optional[datetime] = None, limit: int = 500) -> List[str]:
+    """Close open sessions without a turn for `session_idle_close_seconds`
+
+    They end at their last utterance (or start, if they had none), so the
+    idle time is not counted as practice.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(seconds=settings.session_idle_close_seconds)).replace(tzinfo=None)
+    last_turn = select(
+        Utterance.session_id, func.max(Utterance.created_at).label("last_at")
+    ).join(Session, Session.id == Utterance.session_id).where(
+        Session.ended_at.is_(None)
+    ).group_by(Utterance.session_id).subquery()
+
+    closed = []
+    with session_scope() as db:
+        rows = db.query(Session, last_turn.c.last_at).outerjoin(
+            last_turn, last_turn.c.session_id == Session.id
+        ).filter(
+            Session.ended_at.is_(None),
+            func.coalesce(last_turn.c.last_at, Session.started_at) < cutoff
+        ).limit(limit).all()
+        for row, last_at in rows:
+            if close_session(row, last_at or row.started_at, reason=END_IDLE):
+                closed.append(row.id)
+    if closed:
+        logger.info(f"Closed {len(closed)} idle sessions")
+        schedule_summaries(now)
+    return closed
@@ -0,0 +1,182 @@
+"""Registry of active conversation sessions keyed by session id"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from app.schemas.macca import SessionContext
+from app.services.conversation_memory import ConversationMemory
+from app.services.lesson_runtime import LessonProgress, compile_lesson
+from app.services.lesson_store import lesson_store
+from app.services.state_backend import StateBackend, state_backend
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ActiveSession:
+    session_id: str
+    user_id: Optional[str]  # None for anonymous (non-persisted) sessions
+    context: SessionContext
+    persisted: bool = False
+    turn_count: int = 0
+    memory: ConversationMemory = field(default_factory=ConversationMemory.from_settings)
+    lesson: Optional[LessonProgress] = None  # guided lessons only
+    last_active: float = field(default_factory=time.monotonic)
+    revision: Optional[str] = None  # unique per save, to spot copies changed by another worker
+
+    def to_state(self) -> dict:
+        state = {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "context": self.context.model_dump(exclude={"short_summary", "recent_turns"}),
+            "persisted": self.persisted,
+            "turn_count": self.turn_count,
+            "memory": self.memory.to_state(),
+            "revision": self.revision
+        }
+        if self.lesson:
+            state["lesson"] = {
+                "step": self.lesson.step,
+                "attempts": self.lesson.attempts,
+                "completed": self.lesson.completed
+            }
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ActiveSession":
+        active = cls(
+            session_id=state["session_id"],
+            user_id=state["user_id"],
+            context=SessionContext(**state["context"]),
+            persisted=state["persisted"],
+            turn_count=state["turn_count"],
+            revision=state.get("revision")
+        )
+        active.memory.load_state(state["memory"])
+        lesson_state = state.get("lesson")
+        lesson = lesson_store.get(active.context.lesson_id) if lesson_state else None
+        if lesson is not None:
+            active.lesson = LessonProgress(
+                compile_lesson(lesson),
+                step=lesson_state["step"],
+                attempts=lesson_state["attempts"],
+                completed=lesson_state["completed"]
+            )
+        return active
+
+class SessionRegistry:
+    """LRU of active sessions with idle expiry
+
+    Turn endpoints look sessions up here by id instead of querying the
+    user's latest session, so persistence is a direct primary-key write.
+    Entries missing after a restart are rehydrated from the DB by the caller.
+
+    With a shared state backend every save also writes a snapshot there, and
+    a lookup reuses the local object only if the snapshot still carries the
+    revision this worker last saved or loaded; otherwise the session is
+    rebuilt from the snapshot. Revisions are random, not counters, so two
+    workers saving over the same snapshot never end up with the same one.
+    So any worker can take any turn, including for anonymous sessions.
+
+    Backend calls block (Redis round trips), so async code calls the
+    registry through asyncio.to_thread; the local LRU is guarded by a lock.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_seconds: float = 3600, backend: Optional[StateBackend] = None):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.backend = backend
+        self._sessions: "OrderedDict[str, ActiveSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def shared(self) -> bool:
+        return self.backend is not None and self.backend.shared
+
+    def _key(self, session_id: str) -> str:
+        return f"session:{session_id}"
+
+    def _remember(self, active: ActiveSession) -> ActiveSession:
+        active.last_active = time.monotonic()
+        with self._lock:
+            self._sessions[active.session_id] = active
+            self._sessions.move_to_end(active.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return active
+
+    def register(self, active: ActiveSession) -> ActiveSession:
+        self._remember(active)
+        self.save(active)
+        return active
+
+    def save(self, active: ActiveSession):
+        """Publish the session's state after a turn changed it"""
+        if not self.shared:
+            return
+        active.revision = uuid.uuid4().hex
+        self.backend.set(self._key(active.session_id), json.dumps(active.to_state()), ttl_seconds=self.idle_seconds)
+
+    def save_summary(self, active: ActiveSession):
+        """Publish a background summary without undoing turns saved elsewhere"""
+        if not self.shared:
+            return
+        raw = self.backend.get(self._key(active.session_id))
+        if raw is None:
+            return
+        state = json.loads(raw)
+        if state.get("revision") == active.revision:
+            self.save(active)
+            return
+        # Not atomic: a turn saved in between loses only this summary update.
+        # The other copy may still list the summarized turns as pending.
+        state["memory"]["summary"] = active.memory.summary
+        state["memory"]["pending"] = active.memory.without_summarized(state["memory"].get("pending", []))
+        state["revision"] = uuid.uuid4().hex
+        self.backend.set(self._key(active.session_id), json.dumps(state), ttl_seconds=self.idle_seconds)
+
+    def get(self, session_id: str) -> Optional[ActiveSession]:
+        if self.shared:
+            raw = self.backend.get(self._key(session_id))
+            if raw is None:
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+                return None
+            state = json.loads(raw)
+            with self._lock:
+                active = self._sessions.get(session_id)
+            if active is None or active.revision != state.get("revision"):
+                active = ActiveSession.from_state(state)
+            return self._remember(active)
+
+        with self._lock:
+            active = self._sessions.get(session_id)
+            if active is None:
+                return None
+            now = time.monotonic()
+            if now - active.last_active > self.idle_seconds:
+                del self._sessions[session_id]
+                return None
+            active.last_active = now
+            self._sessions.move_to_end(session_id)
+            return active
+
+    def remove(self, session_id: str) -> Optional[ActiveSession]:
+        if self.shared:
+            self.backend.delete(self._key(session_id))
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+session_registry = SessionRegistry(
+    max_sessions=settings.active_session_max,
+    idle_seconds=settings.active_session_idle_seconds,
+    backend=state_backend
+)
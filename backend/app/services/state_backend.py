@@ -0,0 +1,113 @@
+"""Key-value store for state that every worker must see
+
+`memory://` keeps values in this process (development, single worker).
+`redis://` / `rediss://` uses a Redis-compatible server, so any number of
+workers and nodes share sessions and profiles. `fakeredis://` runs an
+in-process Redis stand-in for tests; every backend created from it talks to
+one fake server, so it exercises the shared code paths like real Redis.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Protocol, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class StateBackend(Protocol):
+    shared: bool  # visible to other processes
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        ...
+
+    def set_if_absent(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> bool:
+        """Set `key` only if it has no value; True if it was set"""
+        ...
+
+    def delete(self, key: str):
+        ...
+
+class InMemoryStateBackend:
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[str]:
+        item = self._values.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._values[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._values[key] = (value, expires_at)
+
+    def set_if_absent(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> bool:
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._values[key] = (value, expires_at)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+class RedisStateBackend:
+    shared = True
+
+    def __init__(self, client, prefix: str = "macca:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        self.client.set(self.prefix + key, value, px=int(ttl_seconds * 1000) if ttl_seconds else None)
+
+    def set_if_absent(self, key: str, value: str, ttl_seconds: Optional[float] = None) -> bool:
+        return bool(self.client.set(self.prefix + key, value, px=int(ttl_seconds * 1000) if ttl_seconds else None, nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+_fake_server = None
+
+def _fake_redis():
+    global _fake_server
+    import fakeredis  # test dependency
+    if _fake_server is None:
+        _fake_server = fakeredis.FakeServer()
+    return fakeredis.FakeStrictRedis(server=_fake_server)
+
+def create_state_backend(url: Optional[str], prefix: str = "macca:") -> StateBackend:
+    if not url or url.startswith("memory://"):
+        return InMemoryStateBackend()
+    if url.startswith("fakeredis://"):
+        return RedisStateBackend(_fake_redis(), prefix)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+        # redis-py reconnects after fork, so a preloaded app is safe to share
+        return RedisStateBackend(redis.Redis.from_url(url, socket_timeout=2.0), prefix)
+    raise ValueError(f"Unsupported STATE_BACKEND_URL: {url}")
+
+state_backend = create_state_backend(settings.state_backend_url, settings.state_key_prefix)
+logger.info(f"State backend: {type(state_backend).__name__} (shared={state_backend.shared})")
@@ -0,0 +1,318 @@
+"""Request tracing: one span tree per request, job or turn
+
+Spans follow the OpenTelemetry data model (W3C trace and span ids, parent
+links, attributes, status) and are exported per finished trace:
+
+    console  indented span tree through the `app.tracing` logger
+    file     OTLP/JSON lines (`resourceSpans`) in TRACING_FILE, readable by
+             the OpenTelemetry Collector's otlpjsonfile receiver
+
+Spans are only created inside a trace, so with TRACING_EXPORTER unset the
+instrumentation in providers and the DB layer costs one context lookup.
+The current request id is also attached to every log record, so log lines
+of one turn can be grepped together even without an exporter.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from app.config import settings
+from app.providers.limiter import request_deadline_var
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}")
+REQUEST_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: str = "internal"  # internal, server, client
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    error: Optional[str] = None
+    trace: Optional["Trace"] = None
+    root: bool = False  # exported with its trace when it ends
+
+    def set(self, **attributes):
+        """Set attributes; a double underscore in a keyword is a dot (http__method -> http.method)"""
+        self.attributes.update({k.replace("__", "."): v for k, v in attributes.items() if v is not None})
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+class Trace:
+    """Spans of one trace, exported once the root span ends"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def set_attributes(**attributes):
+    """Annotate the current span, if any (token counts, payload sizes)"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+def tracing_enabled() -> bool:
+    return bool(settings.tracing_exporter)
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+def start_span(name: str, kind: str = "internal", root: bool = False, traceparent: Optional[str] = None, **attributes) -> Optional[Span]:
+    """Start a child of the current span, or a new trace when `root`; None if not tracing"""
+    parent = _current_span.get()
+    if parent is None:
+        if not root or not tracing_enabled() or random.random() >= settings.tracing_sample_rate:
+            return None
+        match = TRACEPARENT.fullmatch(traceparent or "")
+        span = Span(
+            name=name,
+            trace_id=match.group(1) if match else _new_id(128),
+            span_id=_new_id(64),
+            parent_id=match.group(2) if match else None,
+            kind=kind,
+            trace=Trace(),
+            root=True
+        )
+    else:
+        span = Span(name=name, trace_id=parent.trace_id, span_id=_new_id(64), parent_id=parent.span_id, kind=kind, trace=parent.trace)
+    span.set(**attributes)
+    return span
+
+def end_span(span: Span, error: Optional[BaseException] = None):
+    span.end_ns = time.time_ns()
+    if error is not None and span.error is None:
+        span.error = f"{type(error).__name__}: {error}"[:300]
+    span.trace.add(span)
+    if span.root:
+        export(span)
+
+@contextmanager
+def span(name: str, kind: str = "internal", root: bool = False, traceparent: Optional[str] = None, **attributes) -> Iterator[Optional[Span]]:
+    """`with span("llm.generate", provider="groq") as s:` - a no-op outside a trace unless `root`"""
+    active = start_span(name, kind=kind, root=root, traceparent=traceparent, **attributes)
+    if active is None:
+        yield None
+        return
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        end_span(active, e)
+        raise
+    else:
+        end_span(active)
+    finally:
+        _current_span.reset(token)
+
+def _size_attributes(prefix: str, value: Any) -> Dict[str, int]:
+    if isinstance(value, (bytes, bytearray)):
+        return {f"{prefix}__bytes": len(value)}
+    if isinstance(value, str):
+        return {f"{prefix}__chars": len(value)}
+    return {}
+
+def traced(name: str):
+    """Trace an async provider method, recording input and output sizes"""
+    def decorate(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if _current_span.get() is None:
+                return await method(self, *args, **kwargs)
+            attributes = _size_attributes("input", args[0]) if args else {}
+            with span(name, kind="client", provider=type(self).__name__, **attributes) as active:
+                result = await method(self, *args, **kwargs)
+                active.set(**_size_attributes("output", result))
+                return result
+        return wrapper
+    return decorate
+
+# Exporters
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+def otlp_json(spans: List[Span]) -> dict:
+    """OTLP/JSON ExportTraceServiceRequest for one trace"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": settings.tracing_service_name}},
+            {"key": "process.pid", "value": {"intValue": str(os.getpid())}}
+        ]},
+        "scopeSpans": [{
+            "scope": {"name": "app.services.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": OTLP_KINDS.get(s.kind, 1),
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {}
+            } for s in spans]
+        }]
+    }]}
+
+def format_tree(spans: List[Span]) -> str:
+    """Indented span tree with durations, children in start order"""
+    children: Dict[Optional[str], List[Span]] = {}
+    ids = {s.span_id for s in spans}
+    for s in sorted(spans, key=lambda s: s.start_ns):
+        children.setdefault(s.parent_id if s.parent_id in ids else None, []).append(s)
+    lines = []
+
+    def walk(parent: Optional[str], depth: int):
+        for s in children.get(parent, []):
+            attributes = " ".join(f"{k}={v}" for k, v in s.attributes.items() if k != "db.statement")
+            error = f" ERROR {s.error}" if s.error else ""
+            lines.append(f"{'  ' * depth}{s.name} {s.duration_ms:.1f}ms {attributes}{error}".rstrip())
+            walk(s.span_id, depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+_file_lock = threading.Lock()
+
+def export(root: Span):
+    spans = root.trace.spans
+    try:
+        if settings.tracing_exporter == "console":
+            logger.info(f"trace {root.trace_id}\n{format_tree(spans)}")
+        elif settings.tracing_exporter == "file":
+            line = json.dumps(otlp_json(spans))
+            with _file_lock, open(settings.tracing_file, "a") as f:
+                f.write(line + "\n")
+    except Exception as e:
+        logger.warning(f"Trace export failed: {e}")
+
+# Requests and logs
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+class RequestIdFilter(logging.Filter):
+    """Adds `request_id` to every log record ("-" outside requests)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+def install_log_filter():
+    """Give the root handlers (configured with LOG_FORMAT) the request id"""
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
+
+class TracingMiddleware:
+    """Request id for every request, and a root span per HTTP request when tracing
+
+    WebSocket connections only get the request id; voice sessions trace
+    each turn as its own root span instead. The id comes from the client's
+    X-Request-ID or is generated, is visible to inner middleware (the
+    profiler names profiles after it) and is returned in the X-Request-ID
+    response header. HTTP requests also get a deadline that bounds their
+    waits on upstream limiters.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        request_id = headers.get("x-request-id", "")
+        if not REQUEST_ID.fullmatch(request_id):
+            request_id = _new_id(64)
+            scope = {**scope, "headers": [*scope["headers"], (b"x-request-id", request_id.encode("latin-1"))]}
+        request_token = request_id_var.set(request_id)
+        # Voice sessions budget each turn instead of the whole connection
+        deadline_token = request_deadline_var.set(
+            time.monotonic() + settings.request_budget_seconds if scope["type"] == "http" else None
+        )
+        response = {"bytes": 0}
+
+        async def send_traced(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                if not any(k.lower() == b"x-request-id" for k, _ in message.get("headers", [])):
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]}
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        method = scope.get("method", "WS")
+        try:
+            with span(
+                f"{method} {scope['path']}", kind="server", root=scope["type"] == "http", traceparent=headers.get("traceparent"),
+                http__method=method, http__target=scope["path"], request_id=request_id,
+                http__request_content_length=int(headers["content-length"]) if headers.get("content-length", "").isdigit() else None
+            ) as active:
+                await self.app(scope, receive, send_traced)
+                if active is not None:
+                    active.set(http__status_code=response.get("status"), http__response_bytes=response["bytes"])
+        finally:
+            request_deadline_var.reset(deadline_token)
+            request_id_var.reset(request_token)
+
+# Database statements
+
+def instrument_engine(engine):
+    """Child span per SQL statement executed inside a trace"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        active = start_span("db.query", kind="client", db__system=engine.dialect.name, db__statement=statement[:300])
+        conn.info.setdefault("trace_spans", []).append(active)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("trace_spans")
+        active = stack.pop() if stack else None
+        if active is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                active.set(db__rows=cursor.rowcount)
+            end_span(active)
+
+    @event.listens_for(engine, "handle_error")
+    def error(context):
+        stack = context.connection.info.get("trace_spans") if context.connection is not None else None
+        active = stack.pop() if stack else None
+        if active is not None:
+            end_span(active, context.original_exception)
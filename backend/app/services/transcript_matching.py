@@ -0,0 +1,297 @@
+"""Graded matching of an ASR transcript against a target word, phrase or sentence
+
+Words are compared by spelling (edit distance) and by sound (Metaphone
+codes), then aligned word by word so a drill sentence gets a score plus the
+words that were skipped, added or misheard. Edit distance uses rapidfuzz's
+C implementation when it is installed and a NumPy row-vectorized version
+otherwise; `batch_char_similarity` scores many pairs in one NumPy pass.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Sequence
+import numpy as np
+from app.schemas.macca import Drill
+
+try:
+    from rapidfuzz.distance import Levenshtein as _rf_levenshtein
+except ImportError:  # optional C-backed edit distance
+    _rf_levenshtein = None
+
+_PUNCTUATION = re.compile(r"[^a-z0-9' ]+")
+_SPACES = re.compile(r"\s+")
+_CONTRACTIONS = {"i'm": "i am", "it's": "it is", "don't": "do not", "can't": "cannot", "i've": "i have",
+                 "you're": "you are", "we're": "we are", "they're": "they are", "that's": "that is",
+                 "isn't": "is not", "doesn't": "does not", "didn't": "did not", "won't": "will not"}
+
+# Phonetic weight in word similarity; spelling covers the rest
+PHONETIC_WEIGHT = 0.5
+MATCH_THRESHOLD = 0.8
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip punctuation and expand common contractions"""
+    text = _PUNCTUATION.sub(" ", text.lower().replace("-", " ").replace("’", "'"))
+    words = [_CONTRACTIONS.get(w, w).strip("'") for w in text.split()]
+    return _SPACES.sub(" ", " ".join(w for w in words if w)).strip()
+
+def _np_levenshtein(a: str, b: str) -> int:
+    if not a or not b:
+        return max(len(a), len(b))
+    source = np.frombuffer(a.encode("utf-32-le"), dtype=np.uint32)
+    target = np.frombuffer(b.encode("utf-32-le"), dtype=np.uint32)
+    offsets = np.arange(len(b) + 1)
+    row = offsets.copy()
+    for i in range(1, len(a) + 1):
+        candidate = np.empty_like(row)
+        candidate[0] = i
+        candidate[1:] = np.minimum(row[:-1] + (target != source[i - 1]), row[1:] + 1)
+        # Insertions along the row: running minimum of candidate[k] - k
+        row = np.minimum.accumulate(candidate - offsets) + offsets
+    return int(row[-1])
+
+def _py_levenshtein(a: str, b: str) -> int:
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        diagonal, row[0] = row[0], i
+        for j, cb in enumerate(b, start=1):
+            diagonal, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, diagonal + (ca != cb))
+    return row[-1]
+
+# Below this many DP cells NumPy's per-call overhead outweighs vectorizing
+_NUMPY_MIN_CELLS = 1024
+
+def levenshtein(a: str, b: str) -> int:
+    if _rf_levenshtein is not None:
+        return _rf_levenshtein.distance(a, b)
+    if len(a) * len(b) < _NUMPY_MIN_CELLS:
+        return _py_levenshtein(a, b)
+    return _np_levenshtein(a, b)
+
+def char_similarity(a: str, b: str) -> float:
+    longest = max(len(a), len(b))
+    return 1.0 if longest == 0 else 1.0 - levenshtein(a, b) / longest
+
+def batch_char_similarity(targets: Sequence[str], heard: Sequence[str]) -> np.ndarray:
+    """Pairwise char similarity for two equal-length lists, all pairs at once
+
+    Strings are padded into a (batch, length) code matrix and one DP row is
+    advanced for every pair per step, so Python overhead is per character
+    position rather than per pair.
+    """
+    if len(targets) != len(heard):
+        raise ValueError("targets and heard must be the same length")
+    if not targets:
+        return np.zeros(0)
+    if _rf_levenshtein is not None:
+        return np.array([char_similarity(a, b) for a, b in zip(targets, heard)])
+
+    n = len(targets)
+    len_a = np.array([len(a) for a in targets])
+    len_b = np.array([len(b) for b in heard])
+    max_a, max_b = int(len_a.max()), int(len_b.max())
+    codes_a = np.zeros((n, max(1, max_a)), dtype=np.uint32)
+    codes_b = np.full((n, max(1, max_b)), 0xFFFFFFFF, dtype=np.uint32)
+    for k, (a, b) in enumerate(zip(targets, heard)):
+        if a:
+            codes_a[k, :len(a)] = np.frombuffer(a.encode("utf-32-le"), dtype=np.uint32)
+        if b:
+            codes_b[k, :len(b)] = np.frombuffer(b.encode("utf-32-le"), dtype=np.uint32)
+
+    offsets = np.arange(max_b + 1)
+    row = np.tile(offsets, (n, 1))
+    distance = len_b.copy()  # for empty targets
+    for i in range(1, max_a + 1):
+        candidate = np.empty_like(row)
+        candidate[:, 0] = i
+        mismatch = codes_b[:, :max_b] != codes_a[:, i - 1:i]
+        candidate[:, 1:] = np.minimum(row[:, :-1] + mismatch, row[:, 1:] + 1)
+        row = np.minimum.accumulate(candidate - offsets, axis=1) + offsets
+        done = len_a == i
+        distance[done] = row[done, len_b[done]]
+
+    longest = np.maximum(np.maximum(len_a, len_b), 1)
+    return 1.0 - distance / longest
+
+# Sets, not strings: "" in "aeiou" is True and would match past the word end
+_VOWELS = frozenset("aeiou")
+_FRONT = frozenset("iey")
+
+@lru_cache(maxsize=4096)
+def metaphone(word: str) -> str:
+    """Original Metaphone key (Philips 1990), enough to group sound-alikes"""
+    w = re.sub(r"[^a-z]", "", word.lower())
+    if not w:
+        return ""
+    for prefix, replacement in (("kn", "n"), ("gn", "n"), ("pn", "n"), ("ae", "e"), ("wr", "r")):
+        if w.startswith(prefix):
+            w = replacement + w[2:]
+            break
+    if w.startswith("x"):
+        w = "s" + w[1:]
+    elif w.startswith("wh"):
+        w = "w" + w[2:]
+
+    vowels = _VOWELS
+    key = []
+    for i, c in enumerate(w):
+        prev = w[i - 1] if i > 0 else ""
+        nxt = w[i + 1] if i + 1 < len(w) else ""
+        after = w[i + 2] if i + 2 < len(w) else ""
+        if c == prev and c != "c":
+            continue
+        if c in vowels:
+            if i == 0:
+                key.append(c.upper())
+        elif c == "b":
+            if not (prev == "m" and i == len(w) - 1):
+                key.append("B")
+        elif c == "c":
+            if nxt == "i" and after == "a" or nxt == "h":
+                key.append("X" if prev != "s" else "K")
+            elif nxt in _FRONT:
+                if prev != "s":
+                    key.append("S")
+            else:
+                key.append("K")
+        elif c == "d":
+            key.append("J" if nxt == "g" and after in _FRONT else "T")
+        elif c == "g":
+            if nxt == "h" and after and after not in vowels:
+                continue
+            if nxt == "n" and (after == "" or w[i + 2:] == "ed"):
+                continue
+            if prev == "d" and nxt in _FRONT:
+                continue
+            key.append("J" if nxt in _FRONT else "K")
+        elif c == "h":
+            if prev in ("c", "s", "p", "t", "g"):
+                continue
+            if nxt in vowels and prev not in vowels:
+                key.append("H")
+        elif c == "k":
+            if prev != "c":
+                key.append("K")
+        elif c == "p":
+            key.append("F" if nxt == "h" else "P")
+        elif c == "q":
+            key.append("K")
+        elif c == "s":
+            if nxt == "h" or (nxt == "i" and after in ("o", "a")):
+                key.append("X")
+            else:
+                key.append("S")
+        elif c == "t":
+            if nxt == "i" and after in ("o", "a"):
+                key.append("X")
+            elif nxt == "h":
+                key.append("0")  # theta
+            elif not (nxt == "c" and after == "h"):
+                key.append("T")
+        elif c == "v":
+            key.append("F")
+        elif c == "w" or c == "y":
+            if nxt in vowels:
+                key.append(c.upper())
+        elif c == "x":
+            key.append("KS")
+        elif c == "z":
+            key.append("S")
+        else:
+            key.append(c.upper())
+    return "".join(key)
+
+@lru_cache(maxsize=65536)
+def word_similarity(target: str, heard: str) -> float:
+    """0..1 blend of spelling and Metaphone similarity"""
+    if target == heard:
+        return 1.0
+    phonetic = char_similarity(metaphone(target), metaphone(heard))
+    return (1 - PHONETIC_WEIGHT) * char_similarity(target, heard) + PHONETIC_WEIGHT * phonetic
+
+@dataclass
+class WordMatch:
+    target: Optional[str]  # None for an extra word the learner added
+    heard: Optional[str]  # None for a skipped word
+    similarity: float
+
+    @property
+    def ok(self) -> bool:
+        return self.similarity >= MATCH_THRESHOLD
+
+@dataclass
+class TranscriptMatch:
+    target: str
+    transcript: str
+    score: int  # 0-100
+    char_similarity: float
+    phonetic_similarity: float
+    words: List[WordMatch] = field(default_factory=list)
+
+    @property
+    def problems(self) -> List[WordMatch]:
+        """Target words that were skipped or misheard, in sentence order"""
+        return [w for w in self.words if w.target is not None and not w.ok]
+
+def align_words(target: List[str], heard: List[str]) -> List[WordMatch]:
+    """Word-level alignment maximizing similarity (skips and extras cost 1)"""
+    n, m = len(target), len(heard)
+    similarity = [[word_similarity(t, h) for h in heard] for t in target]
+    cost = [[float(i + j) if i == 0 or j == 0 else 0.0 for j in range(m + 1)] for i in range(n + 1)]
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            cost[i][j] = min(
+                cost[i - 1][j - 1] + 1 - similarity[i - 1][j - 1],
+                cost[i - 1][j] + 1,
+                cost[i][j - 1] + 1
+            )
+
+    matches: List[WordMatch] = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and abs(cost[i][j] - (cost[i - 1][j - 1] + 1 - similarity[i - 1][j - 1])) < 1e-9:
+            matches.append(WordMatch(target[i - 1], heard[j - 1], similarity[i - 1][j - 1]))
+            i, j = i - 1, j - 1
+        elif i > 0 and abs(cost[i][j] - (cost[i - 1][j] + 1)) < 1e-9:
+            matches.append(WordMatch(target[i - 1], None, 0.0))
+            i -= 1
+        else:
+            matches.append(WordMatch(None, heard[j - 1], 0.0))
+            j -= 1
+    matches.reverse()
+    return matches
+
+def match_transcript(target: str, transcript: str) -> TranscriptMatch:
+    """Score a transcript against a target word, phrase or sentence"""
+    target_norm = normalize_text(target)
+    heard_norm = normalize_text(transcript)
+    target_words = target_norm.split()
+    heard_words = heard_norm.split()
+
+    if len(target_words) == 1 and heard_words:
+        # Single word: take the best-matching heard word, ignoring fillers
+        best = max(heard_words, key=lambda h: word_similarity(target_words[0], h))
+        words = [WordMatch(target_words[0], best, word_similarity(target_words[0], best))]
+    else:
+        words = align_words(target_words, heard_words)
+
+    matched = [w.similarity for w in words if w.target is not None]
+    extras = sum(1 for w in words if w.target is None)
+    score = 100 * (sum(matched) / max(1, len(target_words))) - 5 * extras
+    return TranscriptMatch(
+        target=target,
+        transcript=transcript,
+        score=int(round(max(0.0, min(100.0, score)))),
+        char_similarity=char_similarity(target_norm, heard_norm),
+        phonetic_similarity=char_similarity(
+            " ".join(metaphone(w) for w in target_words),
+            " ".join(metaphone(w) for w in heard_words)
+        ),
+        words=words
+    )
+
+def match_drill(drill: Drill, transcript: str) -> Optional[TranscriptMatch]:
+    """Score a repeat-sentence drill; open questions have no fixed target"""
+    if drill.type != "repeat_sentence" or not drill.sentence:
+        return None
+    return match_transcript(drill.sentence, transcript)
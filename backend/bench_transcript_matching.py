@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Benchmark transcript matching over large batches
+
+Usage: python bench_transcript_matching.py [pairs]
+"""
+
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services import transcript_matching
+from app.services.transcript_matching import batch_char_similarity, char_similarity, match_transcript
+
+SENTENCES = [
+    "I went to the office yesterday",
+    "I have five years of experience in software development",
+    "Could you tell me more about the position",
+    "I would like a cup of coffee please",
+    "Three free throws were thrown through the hoop",
+    "The weather is very nice this month",
+]
+
+def mutate(text: str, rng: random.Random) -> str:
+    words = text.lower().split()
+    for i, word in enumerate(words):
+        roll = rng.random()
+        if roll < 0.1:
+            words[i] = word.replace("th", "t").replace("v", "f")
+        elif roll < 0.15:
+            words[i] = ""
+    return " ".join(w for w in words if w)
+
+def timed(label: str, fn, count: int):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms  {elapsed / count * 1e6:8.1f} us/pair")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    targets = [rng.choice(SENTENCES) for _ in range(count)]
+    heard = [mutate(t, rng) for t in targets]
+    
+    print(f"{count} pairs, rapidfuzz={'yes' if transcript_matching._rf_levenshtein else 'no'}")
+    timed("match_transcript (word alignment)", lambda: [match_transcript(t, h) for t, h in zip(targets, heard)], count)
+    timed("char_similarity (pairwise)", lambda: [char_similarity(t, h) for t, h in zip(targets, heard)], count)
+    
+    previous, transcript_matching._rf_levenshtein = transcript_matching._rf_levenshtein, None
+    try:
+        timed("char_similarity (NumPy, pairwise)", lambda: [char_similarity(t, h) for t, h in zip(targets, heard)], count)
+        timed("batch_char_similarity (NumPy, batched)", lambda: batch_char_similarity(targets, heard), count)
+    finally:
+        transcript_matching._rf_levenshtein = previous
+
+if __name__ == "__main__":
+    main()
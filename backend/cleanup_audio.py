@@ -1,28 +1,15 @@
 #!/usr/bin/env python3
 """
 Auto-cleanup script for temporary TTS audio files.
-Deletes audio files older than 1 hour.
-Run this as a cron job: */30 * * * * /path/to/cleanup_audio.py
+Deletes audio files older than AUDIO_MAX_AGE_SECONDS (default 1 hour).
+The job worker (python -m app.jobs.worker) already runs this every
+AUDIO_CLEANUP_INTERVAL_SECONDS; the cron form is for deployments without it:
+*/30 * * * * /path/to/cleanup_audio.py
 """
-import os
-import time
-from pathlib import Path
-
-AUDIO_DIR = Path(__file__).parent / "storage" / "audio"
-MAX_AGE_SECONDS = 3600  # 1 hour
+from app.jobs.tasks import cleanup_audio
 
 def cleanup_old_audio():
-    if not AUDIO_DIR.exists():
-        return
-    
-    now = time.time()
-    deleted = 0
-    
-    for audio_file in AUDIO_DIR.glob("*.mp3"):
-        if now - audio_file.stat().st_mtime > MAX_AGE_SECONDS:
-            audio_file.unlink()
-            deleted += 1
-    
+    deleted = cleanup_audio({})
     if deleted > 0:
         print(f"Deleted {deleted} old audio files")
 
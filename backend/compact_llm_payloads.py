@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Move uncompressed utterances.raw_llm_json payloads into the compressed
+raw_llm_json_z column, in small batches so the table stays writable.
+Run once after adding the raw_llm_json_z column; safe to re-run.
+"""
+import sys
+from sqlalchemy import null
+from app.db.database import session_scope
+from app.db.models import Utterance
+
+BATCH_SIZE = 500
+
+def compact_payloads(batch_size: int = BATCH_SIZE) -> int:
+    moved = 0
+    last_id = ""
+    while True:
+        with session_scope() as db:
+            # Paged by id, so rows holding a JSON 'null' (written by earlier
+            # versions of this script) are cleared once instead of forever
+            rows = db.query(Utterance).options(*Utterance.payload_options()).filter(
+                Utterance.legacy_raw_llm_json.isnot(None),
+                Utterance.id > last_id
+            ).order_by(Utterance.id).limit(batch_size).all()
+            for row in rows:
+                if row.raw_llm_json is None and row.legacy_raw_llm_json is not None:
+                    row.raw_llm_json = row.legacy_raw_llm_json
+                row.legacy_raw_llm_json = null()
+            if rows:
+                last_id = rows[-1].id
+        moved += len(rows)
+        if len(rows) < batch_size:
+            break
+    return moved
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else BATCH_SIZE
+    print(f"Compacted {compact_payloads(batch_size)} utterance payloads")
@@ -0,0 +1,39 @@
+"""Production entrypoint: gunicorn -c gunicorn.conf.py app.main:app
+
+One uvicorn worker per core. The app is imported once in the master before
+forking (preload_app), so numpy, the lesson catalog and the memory-mapped
+lexicon are loaded once and their pages shared copy-on-write by all
+workers. Set STATE_BACKEND_URL=redis://... when running more than one
+worker so sessions and the anonymous profile are shared (QUICK_START.md).
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Voice turns wait on ASR + LLM + TTS; give them room before the worker is recycled
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound slow leaks from native libraries
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = 500
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+def on_starting(server):
+    from app.config import settings
+    if workers > 1 and settings.state_backend_url.startswith("memory://"):
+        server.log.warning("Running %s workers with STATE_BACKEND_URL=memory://: sessions are not shared between workers", workers)
+
+def post_fork(server, worker):
+    # Connections opened while preloading belong to the master; never share them
+    from app.db.database import engine
+    engine.dispose(close=False)
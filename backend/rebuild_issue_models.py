@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Rebuild users.issue_model from existing feedback_issues rows, replaying
+them in time order so older issues are decayed as if counted live.
+Run once after adding the issue_model column; safe to re-run.
+"""
+from collections import defaultdict
+from app.api.pronunciation import attempt_needs_work
+from app.db.database import session_scope
+from app.db.models import FeedbackIssue, User
+from app.services.issue_model import record_issues
+from app.services.session_lifecycle import as_utc
+
+def rebuild_issue_models() -> int:
+    with session_scope() as db:
+        rows = db.query(
+            FeedbackIssue.user_id, FeedbackIssue.type, FeedbackIssue.issue_code, FeedbackIssue.detail, FeedbackIssue.created_at
+        ).filter(FeedbackIssue.user_id.isnot(None)).order_by(FeedbackIssue.created_at).all()
+        models = defaultdict(dict)
+        for user_id, issue_type, issue_code, detail, created_at in rows:
+            # Scored audio attempts are stored even when pronounced correctly
+            if issue_type == "pronunciation" and detail and not attempt_needs_work(detail):
+                continue
+            at = as_utc(created_at).timestamp() if created_at else None
+            models[user_id] = record_issues(models[user_id], [(issue_type, issue_code)], now=at)
+        for user_id, model in models.items():
+            db.query(User).filter(User.id == user_id).update({User.issue_model: model})
+    return len(models)
+
+if __name__ == "__main__":
+    print(f"Rebuilt issue models for {rebuild_issue_models()} users")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Tests for the provider circuit breaker"""
+
+import os
+import sys
+import asyncio
+import time
+# Set test environment before importing
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.providers.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from app.providers.errors import ProviderError, ProviderRateLimitError
+
+async def _ok():
+    return "ok"
+
+async def _fail():
+    raise ProviderError("upstream 500", provider="test", status_code=500)
+
+async def _busy():
+    raise ProviderRateLimitError("upstream 429", provider="test")
+
+def _call(breaker, fn):
+    try:
+        return asyncio.run(breaker.call(fn))
+    except ProviderError as e:
+        return e
+
+def test_opens_on_failure_rate():
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, min_calls=4, open_seconds=60)
+    for fn in (_ok, _fail, _ok):
+        _call(breaker, fn)
+    assert breaker.state == CLOSED  # below min_calls
+    _call(breaker, _fail)
+    assert breaker.state == OPEN
+    
+    start = time.monotonic()
+    result = _call(breaker, _ok)
+    assert isinstance(result, CircuitOpenError) and result.status_code == 503
+    assert time.monotonic() - start < 0.05
+    print("✅ Test 1: Circuit opens at failure-rate threshold and fails fast")
+
+def test_rate_limits_do_not_trip():
+    breaker = CircuitBreaker("test", min_calls=2)
+    for _ in range(5):
+        _call(breaker, _busy)
+    assert breaker.state == CLOSED
+    print("✅ Test 2: 429s do not count as provider failures")
+
+def test_half_open_probe():
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0.05)
+    _call(breaker, _fail)
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    _call(breaker, _fail)
+    assert breaker.state == OPEN  # failed probe re-opens
+    time.sleep(0.06)
+    assert _call(breaker, _ok) == "ok"
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["state"] == "closed"
+    print("✅ Test 3: Half-open probe closes or re-opens the circuit")
+
+def test_half_open_limits_probes():
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0.01, half_open_max_calls=1)
+    _call(breaker, _fail)
+    time.sleep(0.02)
+    
+    async def main():
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "ok"
+        return await asyncio.gather(breaker.call(slow), breaker.call(slow), return_exceptions=True)
+    
+    results = asyncio.run(main())
+    assert results[0] == "ok"
+    assert isinstance(results[1], CircuitOpenError)
+    print("✅ Test 4: Half-open state admits a single probe")
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", min_calls=1, slow_call_seconds=0.01)
+    
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "ok"
+    
+    assert _call(breaker, slow) == "ok"
+    assert breaker.state == OPEN
+    print("✅ Test 5: Slow calls trip the circuit")
+
+def test_client_errors_do_not_trip():
+    breaker = CircuitBreaker("test", min_calls=2)
+
+    async def bad_request():
+        raise ProviderError("json_validate_failed", provider="test", status_code=400)
+
+    async def unauthorized():
+        raise ProviderError("invalid api key", provider="test", status_code=401)
+
+    for fn in (bad_request, unauthorized, bad_request, unauthorized):
+        _call(breaker, fn)
+    assert breaker.state == CLOSED
+    print("✅ Test 6: 4xx client errors do not count as provider failures")
+
+def test_in_flight_call_does_not_reset_open_timer():
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=60)
+
+    async def main():
+        async def slow_fail():
+            await asyncio.sleep(0.05)
+            raise ProviderError("upstream 502", provider="test", status_code=502)
+        in_flight = asyncio.ensure_future(breaker.call(slow_fail))
+        await asyncio.sleep(0.01)
+        try:
+            await breaker.call(_fail)
+        except ProviderError:
+            pass
+        opened_at = breaker._opened_at
+        try:
+            await in_flight
+        except ProviderError:
+            pass
+        return opened_at
+
+    opened_at = asyncio.run(main())
+    assert breaker.state == OPEN and breaker._opened_at == opened_at
+    print("✅ Test 7: Calls finishing after the circuit opened leave its timer alone")
+
+if __name__ == "__main__":
+    test_opens_on_failure_rate()
+    test_rate_limits_do_not_trip()
+    test_half_open_probe()
+    test_half_open_limits_probes()
+    test_slow_calls_count_as_failures()
+    test_client_errors_do_not_trip()
+    test_in_flight_call_does_not_reset_open_timer()
+    print("\n🎉 All circuit breaker tests passed!")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Tests for compressed, lazily loaded utterance payloads"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import uuid
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import InvalidRequestError
+from compact_llm_payloads import compact_payloads
+from app.db import types
+from app.db.database import Base, engine, session_scope
+from app.db.models import Session, User, Utterance
+from app.db.types import compress_json, decompress_json
+
+Base.metadata.create_all(bind=engine)
+
+PAYLOAD = {"reply": "Nice! " * 40, "grammar_feedback": [{"issue": "tense", "fix": "I went"}] * 5}
+
+def test_round_trip_and_size():
+    blob = compress_json(PAYLOAD)
+    assert decompress_json(blob) == PAYLOAD
+    assert len(blob) < len(json.dumps(PAYLOAD)) / 3
+    print(f"✅ Test 1: Payload round-trips at {len(blob)} bytes")
+
+def test_zlib_fallback(monkeypatch):
+    monkeypatch.setattr(types, "zstandard", None)
+    blob = compress_json(PAYLOAD)
+    assert blob[3] == types.CODEC_ZLIB
+    assert decompress_json(blob) == PAYLOAD
+    with pytest.raises(ValueError):
+        decompress_json(b"{}")
+    print("✅ Test 2: zlib is used without zstandard")
+
+def test_payload_deferred():
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", name="Payload")
+        db.add(user)
+        db.flush()
+        session = Session(user_id=user.id, mode="live_conversation")
+        db.add(session)
+        db.flush()
+        utterance = Utterance(session_id=session.id, user_id=user.id, role="user",
+                              transcript="hello", raw_llm_json=PAYLOAD)
+        db.add(utterance)
+        db.flush()
+        utterance_id = utterance.id
+
+    with session_scope() as db:
+        row = db.query(Utterance).filter(Utterance.id == utterance_id).one()
+        assert row.transcript == "hello"
+        with pytest.raises(InvalidRequestError):
+            row.raw_llm_json
+
+    with session_scope() as db:
+        row = db.query(Utterance).options(*Utterance.payload_options()).filter(Utterance.id == utterance_id).one()
+        assert row.llm_payload == PAYLOAD
+    print("✅ Test 3: Payload is only loaded when asked for")
+
+def test_compact_legacy_payloads():
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", name="Legacy")
+        db.add(user)
+        db.flush()
+        session = Session(user_id=user.id, mode="live_conversation")
+        db.add(session)
+        db.flush()
+        rows = [Utterance(session_id=session.id, user_id=user.id, role="assistant",
+                          transcript=f"reply {i}", legacy_raw_llm_json={"reply": f"reply {i}"}) for i in range(5)]
+        db.add_all(rows)
+        db.flush()
+        ids = [row.id for row in rows]
+        # A JSON 'null' left behind by an earlier run must not be matched forever
+        db.execute(text("UPDATE utterances SET raw_llm_json = 'null' WHERE id = :id"), {"id": ids[0]})
+
+    # Several batches: returns instead of re-reading the same rows
+    assert compact_payloads(batch_size=2) >= 5
+
+    with session_scope() as db:
+        for i, utterance_id in enumerate(ids):
+            legacy = db.execute(text("SELECT raw_llm_json FROM utterances WHERE id = :id"), {"id": utterance_id}).scalar()
+            assert legacy is None
+            row = db.query(Utterance).options(*Utterance.payload_options()).filter(Utterance.id == utterance_id).one()
+            if i > 0:
+                assert row.llm_payload == {"reply": f"reply {i}"}
+    assert compact_payloads(batch_size=2) == 0
+    print("✅ Test 4: Legacy payloads are compacted in batches and left as SQL NULL")
+
+if __name__ == "__main__":
+    test_round_trip_and_size()
+    test_zlib_fallback(pytest.MonkeyPatch())
+    test_payload_deferred()
+    test_compact_legacy_payloads()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Tests for rolling conversation memory"""
+
+import os
+import sys
+import asyncio
+# Set test environment before importing
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.conversation_memory import ConversationMemory
+from app.schemas.macca import SessionContext
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+    
+    async def summarize_conversation(self, previous_summary, messages):
+        self.calls.append(len(messages))
+        return f"{previous_summary or ''}[{len(messages)} msgs]"
+
+def test_recent_window_and_summary():
+    memory = ConversationMemory(max_turns=2, summarize_batch=2, token_budget=1000)
+    llm = FakeSummarizer()
+    
+    async def main():
+        for i in range(6):
+            memory.add_exchange(f"user {i}", f"reply {i}")
+            task = memory.maybe_summarize(llm)
+            if task:
+                await task
+    
+    asyncio.run(main())
+    assert [m.content for m in memory.turns] == ["user 4", "reply 4", "user 5", "reply 5"]
+    assert llm.calls == [4, 4]
+    assert memory.summary == "[4 msgs][4 msgs]"
+    
+    context = SessionContext(session_id="s", mode="live_conversation")
+    memory.apply(context)
+    assert context.short_summary == memory.summary
+    assert len(context.recent_turns) == 4
+    print("✅ Test 1: Recent turns kept verbatim, older turns summarized")
+
+def test_token_budget_drops_oldest():
+    memory = ConversationMemory(max_turns=10, token_budget=60)
+    for i in range(5):
+        memory.add_exchange("x" * 39 + str(i), "y" * 40)  # ~10 tokens each
+    context = SessionContext(session_id="s", mode="live_conversation")
+    memory.apply(context)
+    assert len(context.recent_turns) == 6
+    assert context.recent_turns[-1].role == "assistant"
+    assert context.recent_turns[0].content.endswith("2")
+    print("✅ Test 2: Token budget keeps only the newest turns")
+
+def test_summary_failure_falls_back():
+    class Broken:
+        async def summarize_conversation(self, previous_summary, messages):
+            raise RuntimeError("upstream down")
+    
+    memory = ConversationMemory(max_turns=1, summarize_batch=1)
+    memory.add_exchange("I work at a bank", "Nice!")
+    memory.add_exchange("I like coffee", "Me too!")
+    
+    async def main():
+        await memory.maybe_summarize(Broken())
+    
+    asyncio.run(main())
+    assert "I work at a bank" in memory.summary
+    print("✅ Test 3: Failed summaries fall back to extractive summary")
+
+def test_unsummarized_turns_stay_in_prompt():
+    memory = ConversationMemory(max_turns=1, summarize_batch=2, token_budget=1000)
+    context = SessionContext(session_id="s", mode="live_conversation")
+    memory.add_exchange("user 0", "reply 0")
+    memory.add_exchange("user 1", "reply 1")
+    memory.apply(context)
+    assert [m.content for m in context.recent_turns] == ["user 0", "reply 0", "user 1", "reply 1"]
+
+    release = asyncio.Event()
+
+    class Slow:
+        async def summarize_conversation(self, previous_summary, messages):
+            await release.wait()
+            return "[summary]"
+
+    async def main():
+        memory.add_exchange("user 2", "reply 2")
+        task = memory.maybe_summarize(Slow())
+        memory.add_exchange("user 3", "reply 3")
+        memory.apply(context)
+        in_flight = [m.content for m in context.recent_turns]
+        release.set()
+        await task
+        memory.apply(context)
+        return in_flight
+
+    in_flight = asyncio.run(main())
+    assert in_flight[0] == "user 0" and in_flight[-1] == "reply 3" and len(in_flight) == 8
+    assert context.short_summary == "[summary]"
+    assert [m.content for m in context.recent_turns] == ["user 2", "reply 2", "user 3", "reply 3"]
+    print("✅ Test 4: Turns awaiting a summary stay in the prompt")
+
+if __name__ == "__main__":
+    test_recent_window_and_summary()
+    test_token_budget_drops_oldest()
+    test_summary_failure_falls_back()
+    test_unsummarized_turns_stay_in_prompt()
+    print("\n🎉 All conversation memory tests passed!")
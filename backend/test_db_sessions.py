@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Tests for short-lived DB units of work and the detached auth user"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from app.main import app
+from app.db.database import Base, engine, session_scope
+from app.db.models import User
+from app.dependencies import _load_user, get_current_user_optional
+
+Base.metadata.create_all(bind=engine)
+
+client = TestClient(app)
+
+def make_user(**columns) -> str:
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", name="Scope", level="B1", goal="job_interview", **columns)
+        db.add(user)
+        db.flush()
+        return user.id
+
+def test_session_scope_commit_and_rollback():
+    user_id = make_user()
+    with session_scope() as db:
+        assert db.get(User, user_id).name == "Scope"
+
+    with pytest.raises(RuntimeError):
+        with session_scope() as db:
+            db.get(User, user_id).name = "Rolled back"
+            db.flush()
+            raise RuntimeError("boom")
+    with session_scope() as db:
+        assert db.get(User, user_id).name == "Scope"
+    print("✅ Test 1: session_scope commits on success and rolls back on error")
+
+def test_detached_auth_user():
+    user_id = make_user(issue_model={"grammar:tense": [2.0, 0.0]})
+    user = _load_user(user_id)
+    assert inspect(user).detached
+    assert user.name == "Scope" and user.level == "B1"
+    assert user.issue_model["grammar:tense"] == [2.0, 0.0]
+    assert _load_user(str(uuid.uuid4())) is None
+    print("✅ Test 2: Auth user is detached with its columns readable")
+
+def test_patch_profile_updates_fresh_row():
+    user_id = make_user(issue_model={"grammar:tense": [1.0, 0.0]})
+    stale = _load_user(user_id)
+    # Written by a job after the request authenticated
+    with session_scope() as db:
+        db.get(User, user_id).issue_model = {"grammar:articles": [3.0, 0.0]}
+
+    app.dependency_overrides[get_current_user_optional] = lambda: stale
+    try:
+        response = client.patch("/api/user/profile", json={"name": "Renamed", "level": "B2"})
+    finally:
+        app.dependency_overrides.pop(get_current_user_optional, None)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+
+    with session_scope() as db:
+        user = db.get(User, user_id)
+        assert (user.name, user.level, user.goal) == ("Renamed", "B2", "job_interview")
+        assert user.issue_model == {"grammar:articles": [3.0, 0.0]}
+    print("✅ Test 3: PATCH /profile persists only the updated fields")
+
+if __name__ == "__main__":
+    test_session_scope_commit_and_rollback()
+    test_detached_auth_user()
+    test_patch_profile_updates_fresh_row()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Tests for the decayed per-user issue model"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.session import build_user_profile
+from app.config import settings
+from app.db.database import Base, engine, session_scope
+from app.db.models import FeedbackIssue, User
+from app.dependencies import _load_user
+from app.services.issue_model import bump_user_issues, record_issues, top_issues
+from rebuild_issue_models import rebuild_issue_models
+
+Base.metadata.create_all(bind=engine)
+
+DAY = 86400
+
+def test_recent_issues_rank_first():
+    now = 1_000 * DAY
+    half_life = settings.issue_model_half_life_days * DAY
+    model = record_issues(None, [("grammar", "articles")] * 3, now=now - 2 * half_life)
+    model = record_issues(model, [("grammar", "past_simple")] * 2, now=now)
+    assert top_issues(model, now=now) == ["grammar: past_simple", "grammar: articles"]
+    assert model["grammar:articles"][0] == 3.0
+    # Six half-lives on, both have faded below issue_model_min_count
+    assert top_issues(model, now=now + 6 * half_life) == []
+    print("✅ Test 1: Old mistakes fade, recent ones rank first")
+
+def test_model_stays_small(monkeypatch):
+    monkeypatch.setattr(settings, "issue_model_max_codes", 3)
+    model = record_issues(None, [("grammar", "a")] * 3 + [("grammar", "b")] * 2, now=DAY)
+    model = record_issues(model, [("grammar", "c"), ("pronunciation", "think")], now=DAY)
+    assert len(model) == 3 and "grammar:a" in model and "grammar:b" in model
+    assert top_issues(model, now=DAY)[:2] == ["grammar: a", "grammar: b"]
+    print("✅ Test 2: Only the strongest issues are kept")
+
+def test_profile_reads_model_without_queries():
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", name="Weak", level="A2", goal="study")
+        db.add(user)
+        db.flush()
+        bump_user_issues(db, user.id, [("grammar", "articles"), ("grammar", "past_simple"), ("grammar", "past_simple")])
+        user_id = user.id
+    user = _load_user(user_id)  # detached, as auth hands it to routes
+    assert asyncio.run(build_user_profile(user)).common_issues == ["grammar: past_simple", "grammar: articles"]
+    print("✅ Test 3: Turn profiles get common_issues from the loaded user")
+
+def test_issue_types_kept_apart():
+    model = record_issues(None, [("pronunciation", "think")] * 3 + [("grammar", "think")] * 2, now=DAY)
+    assert top_issues(model, now=DAY) == ["pronunciation: think", "grammar: think"]
+    assert top_issues(model, issue_type="grammar", now=DAY) == ["think"]
+    print("✅ Test 4: Issue types are ranked without being merged")
+
+def test_rebuild_uses_utc(monkeypatch):
+    # Naive SQLite datetimes are UTC, whatever the host's timezone
+    monkeypatch.setenv("TZ", "Asia/Jakarta")
+    time.tzset()
+    try:
+        created = datetime(2026, 1, 5, 12, 0)
+        with session_scope() as db:
+            user = User(email=f"{uuid.uuid4()}@example.com", name="Rebuild", level="B1", goal="study")
+            db.add(user)
+            db.flush()
+            db.add(FeedbackIssue(user_id=user.id, type="grammar", issue_code="articles", created_at=created))
+            user_id = user.id
+        rebuild_issue_models()
+        with session_scope() as db:
+            count, as_of = db.get(User, user_id).issue_model["grammar:articles"]
+        assert as_of == created.replace(tzinfo=timezone.utc).timestamp()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    print("✅ Test 5: Rebuilt models date issues in UTC")
+
+def test_correct_pronunciation_not_counted():
+    client = TestClient(app)
+    email = f"{uuid.uuid4()}@example.com"
+    response = client.post("/api/auth/signup", json={"email": email, "password": "password123", "name": "Speaker"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # Mock ASR always hears "I have five years of experience in software development."
+    for sentence in (
+        "I have five years of experience in software development",
+        "I have five years of experience in software developing"
+    ):
+        response = client.post(
+            "/api/pronunciation/analyze/audio", headers=headers,
+            files={"audio": ("a.wav", b"RIFF0000", "audio/wav")}, data={"word": sentence}
+        )
+        assert response.status_code == 200
+
+    with session_scope() as db:
+        user = db.query(User).filter(User.email == email).one()
+        user_id = user.id
+        assert db.query(FeedbackIssue).filter(FeedbackIssue.user_id == user_id).count() == 2
+        assert list(user.issue_model) == ["pronunciation:I have five years of experience in software developing"]
+    rebuild_issue_models()
+    with session_scope() as db:
+        assert list(db.get(User, user_id).issue_model) == [
+            "pronunciation:I have five years of experience in software developing"
+        ]
+    print("✅ Test 6: Correctly pronounced attempts are not recurring issues")
+
+if __name__ == "__main__":
+    import pytest
+    test_recent_issues_rank_first()
+    test_model_stays_small(pytest.MonkeyPatch())
+    test_profile_reads_model_without_queries()
+    test_issue_types_kept_apart()
+    test_rebuild_uses_utc(pytest.MonkeyPatch())
+    test_correct_pronunciation_not_counted()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Tests for the DB-backed job queue and worker"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from app.db.database import Base, engine, session_scope
+from app.db.models import FeedbackIssue, Job, Session, User, Utterance, VocabularyItem
+from app.jobs import queue
+from app.jobs.queue import (
+    PRIORITY_HIGH, PRIORITY_LOW, claim, complete, enqueue, extend_lease, fail, job, purge_finished
+)
+from app.jobs.worker import JobWorker
+
+Base.metadata.create_all(bind=engine)
+
+def clear_jobs():
+    with session_scope() as db:
+        db.query(Job).delete()
+
+def test_idempotent_enqueue():
+    clear_jobs()
+    key = f"test:{uuid.uuid4()}"
+    first = enqueue("noop", {"n": 1}, idempotency_key=key)
+    assert enqueue("noop", {"n": 2}, idempotency_key=key) == first
+    assert enqueue("noop", {"n": 3}) != first
+    print("✅ Test 1: Same idempotency key enqueues once")
+
+def test_claim_priority_order():
+    clear_jobs()
+    low = enqueue("noop", priority=PRIORITY_LOW)
+    high = enqueue("noop", priority=PRIORITY_HIGH)
+    normal = enqueue("noop")
+    enqueue("noop", priority=PRIORITY_HIGH, delay_seconds=60)  # not due yet
+    claimed = claim(10, owner="test")
+    assert [j.id for j in claimed] == [high, normal, low]
+    assert claim(10, owner="other") == []  # already running
+    print("✅ Test 2: Due jobs are claimed once, highest priority first")
+
+def test_retry_then_fail(monkeypatch):
+    clear_jobs()
+    calls = []
+
+    @job("always_fails")
+    def always_fails(payload):
+        calls.append(payload)
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(queue, "backoff_seconds", lambda attempts: 0.0)
+    job_id = enqueue("always_fails", {"x": 1}, max_attempts=3)
+    worker = JobWorker(concurrency=2)
+    for _ in range(3):
+        assert asyncio.run(worker.run_once()) == 1
+    assert asyncio.run(worker.run_once()) == 0
+    with session_scope() as db:
+        row = db.get(Job, job_id)
+        assert (row.status, row.attempts) == ("failed", 3)
+        assert "upstream down" in row.last_error
+    assert len(calls) == 3
+    print("✅ Test 3: Failing job retries, then is marked failed")
+
+def test_backoff_grows():
+    assert queue.backoff_seconds(1) <= queue.backoff_seconds(4) * 2
+    assert queue.backoff_seconds(50) <= queue.settings.jobs_backoff_max_seconds
+    print("✅ Test 4: Backoff is exponential and capped")
+
+def test_extract_feedback_job():
+    clear_jobs()
+    response = {
+        "reply": "Nice! You went to the market.",
+        "grammar_feedback": [{"issue": "Past simple", "original_text": "I go yesterday"}],
+        "vocabulary_feedback": [
+            {"word": "Market", "translation": "pasar", "example": "I went to the market."},
+            {"word": "known", "translation": "dikenal", "example": "It is well known."}
+        ]
+    }
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", name="Jobs")
+        db.add(user)
+        db.flush()
+        session = Session(user_id=user.id, mode="live_conversation")
+        db.add(session)
+        db.add(VocabularyItem(user_id=user.id, word="known", source="manual"))
+        db.flush()
+        utterance = Utterance(session_id=session.id, user_id=user.id, role="assistant",
+                              transcript=response["reply"], raw_llm_json=response)
+        db.add(utterance)
+        db.flush()
+        user_id, utterance_id = user.id, utterance.id
+
+    worker = JobWorker()
+    for _ in range(2):  # a duplicate run must not double-count
+        job_id = enqueue("extract_feedback", {"utterance_id": utterance_id})
+        assert asyncio.run(worker.run_once()) == 1
+    with session_scope() as db:
+        assert db.get(Job, job_id).status == "done"
+        words = sorted(w for (w,) in db.query(VocabularyItem.word).filter(VocabularyItem.user_id == user_id))
+        issues = db.query(FeedbackIssue).filter(FeedbackIssue.utterance_id == utterance_id).all()
+        assert words == ["known", "market"]
+        assert [i.issue_code for i in issues] == ["past_simple"]
+    print("✅ Test 5: extract_feedback records grammar issues and new words")
+
+def test_cleanup_script_from_other_directory():
+    audio_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "audio")
+    os.makedirs(audio_dir, exist_ok=True)
+    old_file = os.path.join(audio_dir, f"test-{uuid.uuid4().hex}.mp3")
+    open(old_file, "wb").close()
+    stale = time.time() - 2 * queue.settings.audio_max_age_seconds
+    os.utime(old_file, (stale, stale))
+
+    # Cron runs the script from another working directory
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleanup_audio.py")
+    result = subprocess.run([sys.executable, script], cwd=tempfile.gettempdir(), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert not os.path.exists(old_file)
+    print("✅ Test 6: cleanup_audio.py finds backend/storage/audio from any directory")
+
+def expire_lease(job_id: str):
+    with session_scope() as db:
+        db.get(Job, job_id).locked_at = datetime.utcnow() - timedelta(seconds=queue.settings.jobs_lease_seconds + 1)
+
+def test_lease_owner_writes_results():
+    clear_jobs()
+    job_id = enqueue("noop")
+    [stale] = claim(1, owner="slow")
+    assert extend_lease(stale)
+    expire_lease(job_id)
+    [current] = claim(1, owner="fast")
+    assert current.attempts == 2
+
+    # The first worker finishes late: neither result may touch the new run
+    assert not extend_lease(stale)
+    assert not complete(stale)
+    assert not fail(stale, "late failure")
+    with session_scope() as db:
+        row = db.get(Job, job_id)
+        assert (row.status, row.locked_by, row.last_error) == ("running", "fast", None)
+    assert complete(current)
+    print("✅ Test 7: Only the lease holder renews, completes or fails a job")
+
+def test_heartbeat_keeps_long_jobs(monkeypatch):
+    clear_jobs()
+
+    @job("slow_job")
+    async def slow_job(payload):
+        await asyncio.sleep(0.3)
+
+    monkeypatch.setattr(queue.settings, "jobs_lease_seconds", 0.2)
+    job_id = enqueue("slow_job")
+    worker = JobWorker(heartbeat_seconds=0.05)
+
+    async def main():
+        running = asyncio.create_task(worker.run_once())
+        await asyncio.sleep(0.25)
+        stolen = await asyncio.to_thread(claim, 1, "other")
+        await running
+        return stolen
+
+    assert asyncio.run(main()) == []
+    with session_scope() as db:
+        assert (db.get(Job, job_id).status, db.get(Job, job_id).attempts) == ("done", 1)
+    print("✅ Test 8: Heartbeats stop long jobs from being retried elsewhere")
+
+def test_expired_last_attempt_fails():
+    clear_jobs()
+    job_id = enqueue("noop", max_attempts=1)
+    claim(1, owner="crashed")
+    expire_lease(job_id)
+    assert claim(1, owner="next") == []
+    with session_scope() as db:
+        row = db.get(Job, job_id)
+        assert (row.status, row.locked_by) == ("failed", None)
+        assert "lease expired" in row.last_error
+    print("✅ Test 9: Jobs that keep crashing their worker are failed")
+
+def test_purge_finished():
+    clear_jobs()
+    old, recent, failed = enqueue("noop"), enqueue("noop"), enqueue("noop")
+    with session_scope() as db:
+        for job_id, status, age in ((old, "done", 10), (recent, "done", 1), (failed, "failed", 10)):
+            row = db.get(Job, job_id)
+            row.status, row.finished_at = status, datetime.utcnow() - timedelta(days=age)
+    assert purge_finished(7 * 86400) == 1
+    with session_scope() as db:
+        assert sorted(j for (j,) in db.query(Job.id)) == sorted([recent, failed])
+    print("✅ Test 10: Old done jobs are purged")
+
+if __name__ == "__main__":
+    import pytest
+    test_idempotent_enqueue()
+    test_claim_priority_order()
+    test_retry_then_fail(pytest.MonkeyPatch())
+    test_backoff_grows()
+    test_extract_feedback_job()
+    test_cleanup_script_from_other_directory()
+    test_lease_owner_writes_results()
+    test_heartbeat_keeps_long_jobs(pytest.MonkeyPatch())
+    test_expired_last_attempt_fails()
+    test_purge_finished()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests for guided-lesson step progression"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.database import Base, engine
+from app.schemas.macca import MaccaJsonResponse, SessionContext
+from app.services.lesson_runtime import LessonProgress, compile_lesson, phrase_used, _phrase_stem
+from app.services.lesson_store import lesson_store
+
+Base.metadata.create_all(bind=engine)
+client = TestClient(app)
+
+OK = MaccaJsonResponse(reply="Nice!")
+GRAMMAR_ISSUE = MaccaJsonResponse(reply="Almost!", grammar_feedback=[{"issue": "tense"}])
+
+def test_phrase_templates():
+    stems = _phrase_stem("I have worked as ... for ... years")
+    assert stems == ("i have worked as", "for", "years")
+    assert phrase_used(stems, "Well, I have worked as a nurse for five years.")
+    assert not phrase_used(stems, "I worked as a nurse for five years")
+    print("✅ Test 1: Target phrase templates match learner answers")
+
+def test_progression_rules():
+    lesson = lesson_store.get("lesson_1")
+    assert compile_lesson(lesson) is compile_lesson(lesson)  # compiled once
+    progress = LessonProgress(compile_lesson(lesson))
+    
+    context = SessionContext(session_id="s", mode="guided_lesson")
+    progress.apply(context)
+    assert context.lesson_step == 1 and "present_perfect" in context.target_grammar
+    
+    assert not progress.record_turn("hello", OK).step_complete
+    assert not progress.record_turn("My name is Budi", GRAMMAR_ISSUE).step_complete
+    outcome = progress.record_turn("My name is Budi", OK)
+    assert outcome.step_complete and progress.step == 2
+    assert outcome.next_prompt == lesson.steps[1].prompt
+    
+    # Learners are moved on after the attempt limit
+    for _ in range(3):
+        outcome = progress.record_turn("um", OK)
+    assert outcome.step_complete and progress.step == 3
+    print("✅ Test 2: Steps advance only when criteria are met (or attempts run out)")
+
+def test_guided_session_flow():
+    response = client.post("/api/session/start", json={"mode": "guided_lesson", "lesson_id": "lesson_2"})
+    start = response.json()
+    assert start["total_steps"] == 4 and start["lesson_step"] == 1
+    assert start["initial_prompt"] == lesson_store.get("lesson_2").steps[0].prompt
+    
+    turn = {"user_text": "Hi", "mode": "guided", "session_id": start["session_id"]}
+    body = client.post("/api/session/turn", json=turn).json()
+    assert body["feedback"]["step_complete"] is False
+    assert body["next_step"] == "step_1"
+    
+    turn["user_text"] = "A table for two, please."
+    body = client.post("/api/session/turn", json=turn).json()
+    assert body["feedback"]["step_complete"] is True
+    assert body["next_step"] == "step_2"
+    assert lesson_store.get("lesson_2").steps[1].prompt in body["macca_text"]
+    print("✅ Test 3: Guided session tracks its step server-side")
+
+if __name__ == "__main__":
+    test_phrase_templates()
+    test_progression_rules()
+    test_guided_session_flow()
+    print("\n🎉 All lesson runtime tests passed!")
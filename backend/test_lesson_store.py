@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Tests for the lesson content store and lesson endpoints"""
+
+import os
+import sys
+import json
+import tempfile
+from pathlib import Path
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.lesson_store import LessonStore
+
+client = TestClient(app)
+
+def test_endpoints_etag_and_404():
+    response = client.get("/api/lessons")
+    assert response.status_code == 200
+    lessons = response.json()
+    assert [l["id"] for l in lessons][:2] == ["lesson_1", "lesson_2"]
+    assert lessons[0]["steps"][0] == "Step 1 – Warm-up"
+    assert "experience" in lessons[0]["target_vocabulary"]
+    
+    etag = response.headers["etag"]
+    assert client.get("/api/lessons", headers={"If-None-Match": etag}).status_code == 304
+    
+    response = client.get("/api/lessons/lesson_2")
+    assert response.json()["title"].startswith("Daily Conversations")
+    assert client.get("/api/lessons/lesson_2", headers={"If-None-Match": f"W/{response.headers['etag']}"}).status_code == 304
+    assert client.get("/api/lessons/nope").status_code == 404
+    print("✅ Test 1: Lessons served with ETags, unknown ids are 404")
+
+def test_hot_reload_and_bad_files():
+    lesson = {
+        "id": "l1", "title": "One", "subtitle": "s",
+        "steps": [{"title": "Step 1", "prompt": "Hello"}]
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        (directory / "l1.json").write_text(json.dumps(lesson))
+        (directory / "broken.json").write_text("{not json")
+        store = LessonStore(directory, reload_seconds=0)
+        assert [l.id for l in store.all()] == ["l1"]
+        first = store.current()
+        
+        lesson["title"] = "One (v2)"
+        lesson["version"] = 2
+        (directory / "l1.json").write_text(json.dumps(lesson) + " ")
+        assert store.get("l1").title == "One (v2)"
+        assert store.current().lesson_list.etag != first.lesson_list.etag
+        assert first.lessons["l1"].title == "One"  # old snapshot is untouched
+    print("✅ Test 2: File changes reload into a new snapshot")
+
+if __name__ == "__main__":
+    test_endpoints_etag_and_404()
+    test_hot_reload_and_bad_files()
+    print("\n🎉 All lesson store tests passed!")
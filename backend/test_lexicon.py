@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Tests for the memory-mapped pronunciation lexicon index"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.lexicon import LexiconIndex, build_index, load_confusions
+
+def test_build_and_lookup():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "cmudict.dict"
+        lines = [";;; comment", "THINK  TH IH1 NG K", "THINK(1)  T IH1 NG K", "DOGS  D AO1 G Z"]
+        lines += [f"WORD{i}  W ER1 D" for i in range(20000)]
+        source.write_text("\n".join(lines) + "\n")
+        out = Path(tmp) / "lexicon.idx"
+        assert build_index(source, out) == 20002
+        
+        index = LexiconIndex(out, load_confusions())
+        entry = index.lookup("Think")
+        assert entry.phonemes == ("TH", "IH", "NG", "K")
+        assert ("TH", "S") in [(p.target, p.substitute) for p in entry.confusions]
+        # Position-specific pairs only apply where the sound occurs
+        assert ("Z", "S") in [(p.target, p.substitute) for p in index.lookup("dogs").confusions]
+        assert index.phonemes("word19999") == ["W", "ER", "D"]
+        assert index.lookup("missing") is None
+        assert "dogs" in index and len(index) == 20002
+        index.close()
+    print("✅ Test 1: Index build and O(1) lookups")
+
+if __name__ == "__main__":
+    test_build_and_lookup()
+    print("\n🎉 All lexicon tests passed!")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Tests for the event loop lag and blocking-call detector"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.services.loop_monitor import LoopMonitor, loop_monitor
+
+def blocking_handler():
+    time.sleep(0.3)  # a sync call inside async code
+
+def test_blocking_call_is_captured():
+    monitor = LoopMonitor(interval=0.02, threshold=0.1)
+
+    async def run():
+        monitor.ensure_started()
+        await asyncio.sleep(0.1)
+        blocking_handler()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    snapshot = monitor.snapshot()
+    assert snapshot["stalls"] >= 1
+    assert snapshot["lag_seconds"]["max"] >= 0.25
+    offender = snapshot["offenders"][0]
+    assert "blocking_handler" in offender["location"]
+    assert any("time.sleep" in line for line in offender["last_stack"])
+    print(f"✅ Test 1: Blocking call found at {offender['location']}")
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(settings, "profiler_admin_token", "secret")
+    loop_monitor._record_offender({
+        "location": "app/api/session.py:1 in end_session",
+        "stack": ["File app/api/session.py"],
+        "requests": ["POST /api/session/abc/end"]
+    }, 0.2)
+    with TestClient(app) as client:
+        client.get("/api/health/live")
+        body = client.get("/api/health/metrics").json()
+        detailed = client.get("/api/health/metrics", headers={"X-Profile-Token": "secret"}).json()
+    assert body["event_loop"]["running"]
+    assert {"lag_seconds", "offenders", "stalls"} <= set(body["event_loop"])
+    assert body["event_loop"]["offenders"] and "/api/session/abc/end" not in str(body)
+    assert all("last_stack" not in o for o in body["event_loop"]["offenders"])
+    assert any(o.get("last_requests") == ["POST /api/session/abc/end"] for o in detailed["event_loop"]["offenders"])
+    print("✅ Test 2: Loop metrics are served, stacks and paths only to admins")
+
+if __name__ == "__main__":
+    test_blocking_call_is_captured()
+    import pytest
+    test_metrics_endpoint(pytest.MonkeyPatch())
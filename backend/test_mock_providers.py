@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tests for configurable mock provider latency and fault simulation"""
+
+import os
+import sys
+import asyncio
+import random
+import statistics
+import tempfile
+# Set test environment before importing
+os.environ["USE_MOCK_AI"] = "true"
+os.environ["HF_API_KEY"] = ""
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.providers.mock import (
+    LatencyModel, FaultModel, MockUpstream, MockLLMProvider, MockASRProvider, _load_trace, _estimate_tokens
+)
+from app.providers.errors import ProviderError, ProviderRateLimitError, ProviderTimeoutError
+from app.schemas.macca import UserProfile, SessionContext
+from app.config import settings
+
+def test_default_latency_is_unchanged():
+    """Without configuration the mocks keep their historical fixed delays"""
+    assert MockLLMProvider().upstream.latency.sample() == 1.0
+    assert MockASRProvider().upstream.latency.sample() == 0.5
+    assert MockLLMProvider().upstream.faults.draw() is None
+    print("✅ Test 1: Default mock latency unchanged")
+
+def test_lognormal_median():
+    model = LatencyModel(0.2, distribution="lognormal", sigma=0.6, rng=random.Random(7))
+    samples = [model.sample() for _ in range(5000)]
+    assert 0.18 < statistics.median(samples) < 0.22
+    assert max(samples) > 0.5  # has a long tail
+    print("✅ Test 2: Lognormal latency has the configured median")
+
+def test_trace_replay(monkeypatch):
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+        f.write("# recorded\n120\nmock_llm,900\nmock_llm,1500\n")
+        path = f.name
+    try:
+        samples = _load_trace(path)
+        assert samples[None] == [0.12]
+        model = LatencyModel(1.0, distribution="trace", trace=samples["mock_llm"])
+        assert [model.sample() for _ in range(3)] == [0.9, 1.5, 0.9]
+
+        # Providers are built per request: the position carries over between them
+        monkeypatch.setattr(settings, "mock_latency_distribution", "trace")
+        monkeypatch.setattr(settings, "mock_latency_trace_file", path)
+        replayed = [LatencyModel.from_settings("mock_llm", 1.0).sample() for _ in range(3)]
+        assert replayed == [0.9, 1.5, 0.9]
+        assert LatencyModel.from_settings("mock_asr", 1.0).sample() == 0.12
+    finally:
+        os.unlink(path)
+    print("✅ Test 3: Trace latencies replay in order")
+
+def test_fault_injection():
+    fast = LatencyModel(0.0)
+    
+    async def run(faults):
+        await MockUpstream("mock_llm", fast, faults).call()
+    
+    for faults, expected in (
+        (FaultModel(rate_limit_rate=1.0, retry_after_seconds=2.0), ProviderRateLimitError),
+        (FaultModel(timeout_rate=1.0, timeout_seconds=0.0), ProviderTimeoutError),
+        (FaultModel(error_rate=1.0), ProviderError),
+    ):
+        try:
+            asyncio.run(run(faults))
+            assert False, f"Expected {expected.__name__}"
+        except expected as e:
+            if expected is ProviderRateLimitError:
+                assert e.status_code == 429 and e.retry_after == 2.0
+    
+    rates = FaultModel(error_rate=0.1, rng=random.Random(1))
+    failures = sum(1 for _ in range(10000) if rates.draw() == "error")
+    assert 900 < failures < 1100
+    print("✅ Test 4: Errors, timeouts and 429s are injected at configured rates")
+
+def test_token_rate_delay():
+    llm = MockLLMProvider(
+        upstream=MockUpstream("mock_llm", LatencyModel(0.0), FaultModel()),
+        tokens_per_second=2000
+    )
+    profile = UserProfile(name="Test", level="B1", goal="study", explanation_language="en")
+    context = SessionContext(session_id="s", mode="guided_lesson")
+    
+    loop = asyncio.new_event_loop()
+    start = loop.time()
+    response = loop.run_until_complete(llm.generate_macca_response("hello", profile, context))
+    elapsed = loop.time() - start
+    loop.close()
+    assert response.reply
+    assert elapsed >= _estimate_tokens(response.model_dump_json()) / 2000
+    print("✅ Test 5: Token-rate streaming delay applied")
+
+if __name__ == "__main__":
+    import pytest
+    test_default_latency_is_unchanged()
+    test_lognormal_median()
+    test_trace_replay(pytest.MonkeyPatch())
+    test_fault_injection()
+    test_token_rate_delay()
+    print("\n🎉 All mock provider tests passed!")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Tests for shared session state across workers"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import socket
+import subprocess
+import threading
+import time
+import pytest
+import httpx
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.schemas.macca import SessionContext
+from app.services.conversation_memory import ConversationMemory
+from app.services.session_registry import ActiveSession, SessionRegistry
+from app.services.state_backend import RedisStateBackend, create_state_backend
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def registry(server) -> SessionRegistry:
+    backend = RedisStateBackend(fakeredis.FakeStrictRedis(server=server), prefix="test:")
+    return SessionRegistry(backend=backend)
+
+def test_registries_share_sessions():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = registry(server), registry(server)
+    active = worker_a.register(ActiveSession(
+        session_id="s1", user_id=None, context=SessionContext(session_id="s1", mode="live_conversation")
+    ))
+    active.memory.add_exchange("Hello", "Hi there!")
+    worker_a.save(active)
+
+    seen_by_b = worker_b.get("s1")
+    assert [m.content for m in seen_by_b.memory.turns] == ["Hello", "Hi there!"]
+    seen_by_b.memory.add_exchange("How are you?", "Great!")
+    worker_b.save(seen_by_b)
+
+    # Worker A's cached copy is stale and gets rebuilt
+    again = worker_a.get("s1")
+    assert again is not active
+    assert len(again.memory.turns) == 4
+    assert worker_a.get("s1") is again  # unchanged since: cached copy reused
+    worker_b.remove("s1")
+    assert worker_a.get("s1") is None
+    print("✅ Test 1: Session state moves between workers")
+
+def test_summary_from_stale_copy():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = registry(server), registry(server)
+    active = ActiveSession(session_id="s2", user_id=None, context=SessionContext(session_id="s2", mode="live_conversation"),
+                           memory=ConversationMemory(max_turns=1, summarize_batch=1))
+    worker_a.register(active)
+    active.memory.add_exchange("I like rice", "Nice!")
+    active.memory.add_exchange("I cook it daily", "Great!")
+    worker_a.save(active)
+    seen_by_b = worker_b.get("s2")  # still lists the first exchange as pending
+
+    async def run():
+        summarizing = active.memory.maybe_summarize(object())
+        seen_by_b.memory.add_exchange("Do you cook?", "Sometimes.")
+        worker_b.save(seen_by_b)
+        await summarizing
+        worker_a.save_summary(active)
+
+    asyncio.run(run())
+    merged = worker_b.get("s2")
+    assert "I like rice" in merged.memory.summary
+    assert merged.memory.to_state()["pending"] == []
+    assert [m.content for m in merged.memory.turns][-2:] == ["Do you cook?", "Sometimes."]
+    print("✅ Test 2: A summary saved over a newer copy drops the summarized turns")
+
+def test_concurrent_saves_are_detected():
+    server = fakeredis.FakeServer()
+    worker_a, worker_b = registry(server), registry(server)
+    worker_a.register(ActiveSession(session_id="s4", user_id=None, context=SessionContext(session_id="s4", mode="live_conversation")))
+    copy_a, copy_b = worker_a.get("s4"), worker_b.get("s4")  # same snapshot
+    copy_a.memory.add_exchange("From A", "ok")
+    worker_a.save(copy_a)
+    copy_b.memory.add_exchange("From B", "ok")
+    worker_b.save(copy_b)
+
+    # A must not keep its own copy: the snapshot is B's, whatever the save count
+    seen_by_a = worker_a.get("s4")
+    assert seen_by_a is not copy_a
+    assert [m.content for m in seen_by_a.memory.turns] == ["From B", "ok"]
+    print("✅ Test 3: Saves from two workers over one snapshot are told apart")
+
+def test_fakeredis_url_is_shared():
+    first, second = create_state_backend("fakeredis://"), create_state_backend("fakeredis://")
+    assert first.shared and second.shared
+    first.set("shared-check", "yes")
+    assert second.get("shared-check") == "yes"
+    worker_a, worker_b = SessionRegistry(backend=first), SessionRegistry(backend=second)
+    worker_a.register(ActiveSession(session_id="s3", user_id=None, context=SessionContext(session_id="s3", mode="live_conversation")))
+    assert worker_b.get("s3") is not None
+    print("✅ Test 4: fakeredis:// backends share one fake server")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for(url: str, seconds: float = 30.0):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up")
+
+def test_two_workers_one_database(tmp_path):
+    pytest.importorskip("gunicorn")
+    if not hasattr(fakeredis, "TcpFakeServer"):
+        pytest.skip("fakeredis TCP server not available")
+
+    redis_port, app_port = free_port(), free_port()
+    redis_server = fakeredis.TcpFakeServer(("127.0.0.1", redis_port), server_type="redis")
+    threading.Thread(target=redis_server.serve_forever, daemon=True).start()
+
+    database_url = f"sqlite:///{tmp_path / 'workers.db'}"
+    from sqlalchemy import create_engine
+    from app.db.database import Base
+    from app.db import models  # noqa: F401 (registers the tables)
+    Base.metadata.create_all(bind=create_engine(database_url))
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "USE_MOCK_AI": "true",
+        "MOCK_LATENCY_SCALE": "0",
+        "STATE_BACKEND_URL": f"redis://127.0.0.1:{redis_port}/0",
+        "PORT": str(app_port),
+        "WEB_CONCURRENCY": "2",
+        "LOG_LEVEL": "warning"
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{app_port}/api"
+    try:
+        wait_for(f"{base}/health/live")
+        signup = httpx.post(f"{base}/auth/signup", json={"email": "workers@example.com", "password": "pw123456", "name": "Dua"})
+        token = signup.json()["access_token"]
+        auth = {"Authorization": f"Bearer {token}"}
+
+        # A new connection per request lets the kernel hand requests to either worker
+        anonymous = httpx.post(f"{base}/session/start", json={"mode": "live"}).json()["session_id"]
+        persisted = httpx.post(f"{base}/session/start", json={"mode": "live"}, headers=auth).json()["session_id"]
+        pids = set()
+        for i in range(12):
+            response = httpx.post(f"{base}/session/turn", json={"user_text": f"Turn {i}", "mode": "live", "session_id": anonymous})
+            assert response.status_code == 200, response.text
+            response = httpx.post(f"{base}/session/turn", json={"user_text": f"Turn {i}", "mode": "live", "session_id": persisted}, headers=auth)
+            assert response.status_code == 200, response.text
+            pids.add(httpx.get(f"{base}/health/live").json()["worker_pid"])
+
+        httpx.patch(f"{base}/user/profile", json={"name": "Shared"})
+        names = {httpx.get(f"{base}/user/profile").json()["name"] for _ in range(6)}
+        assert names == {"Shared"}
+        print(f"✅ Test 5: Two workers ({len(pids)} seen) share sessions and profile")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        redis_server.shutdown()
+        redis_server.server_close()
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    test_registries_share_sessions()
+    test_summary_from_stale_copy()
+    test_concurrent_saves_are_detected()
+    test_fakeredis_url_is_shared()
+    test_two_workers_one_database(Path(tempfile.mkdtemp()))
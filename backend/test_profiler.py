@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Tests for the per-request sampling profiler"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.main import app as main_app
+from app.config import settings
+from app.services.profiler import ProfilerMiddleware, request_profiler
+from app.services.tracing import TracingMiddleware
+
+def build_app(traced: bool = False) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware)
+    if traced:
+        app.add_middleware(TracingMiddleware)
+
+    def busy_work():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    @app.get("/slow")
+    async def slow():
+        busy_work()
+        await asyncio.sleep(0.1)
+        return {"ok": True}
+
+    return app
+
+def test_profile_requested_by_header(monkeypatch):
+    monkeypatch.setattr(settings, "profiler_admin_token", "secret")
+    monkeypatch.setattr(settings, "profiler_sample_rate", 0.0)
+    client = TestClient(build_app())
+
+    assert "x-request-id" not in client.get("/slow").headers
+    response = client.get("/slow", headers={"X-Profile-Token": "secret", "X-Request-ID": "req-123"})
+    assert response.headers["x-request-id"] == "req-123"
+
+    profile = request_profiler.load("req-123")
+    assert profile["status_code"] == 200 and profile["samples"] > 10
+    assert "busy_work (test_profiler.py" in profile["folded"]
+    assert "slow (test_profiler.py" in profile["folded"] and "[await]" in profile["folded"]
+    assert request_profiler.recent()[0]["request_id"] == "req-123"
+    print(f"✅ Test 1: Header-triggered profile with {profile['samples']} samples")
+
+def test_admin_endpoints(monkeypatch):
+    client = TestClient(main_app)
+    monkeypatch.setattr(settings, "profiler_admin_token", None)
+    assert client.get("/api/admin/profiles").status_code == 404
+
+    monkeypatch.setattr(settings, "profiler_admin_token", "secret")
+    assert client.get("/api/admin/profiles", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    TestClient(build_app()).get("/slow", headers={"X-Profile-Token": "secret", "X-Request-ID": "req-456"})
+    listed = client.get("/api/admin/profiles", headers={"X-Profile-Token": "secret"}).json()["profiles"]
+    assert listed[0]["request_id"] == "req-456"
+    download = client.get("/api/admin/profiles/req-456", headers={"X-Profile-Token": "secret"})
+    assert download.status_code == 200 and "attachment" in download.headers["content-disposition"]
+    for line in download.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+    print("✅ Test 2: Profiles are listed and downloaded as folded stacks")
+
+def test_untrusted_headers(monkeypatch):
+    monkeypatch.setattr(settings, "profiler_admin_token", "secret")
+    client = TestClient(build_app())
+    # Non-ASCII token: rejected, not a 500
+    monkeypatch.setattr(settings, "profiler_sample_rate", 0.0)
+    response = client.get("/slow", headers={"X-Profile-Token": "sécret".encode("utf-8")})
+    assert response.status_code == 200 and "x-request-id" not in response.headers
+    admin = TestClient(main_app).get("/api/admin/profiles", headers={"X-Profile-Token": "ünïcode".encode("utf-8")})
+    assert admin.status_code == 403
+
+    # A sampled request cannot overwrite a stored profile by reusing its id
+    client.get("/slow", headers={"X-Profile-Token": "secret", "X-Request-ID": "req-789"})
+    original = request_profiler.load("req-789")
+    monkeypatch.setattr(settings, "profiler_sample_rate", 1.0)
+    client.get("/slow", headers={"X-Request-ID": "req-789"})
+    assert request_profiler.load("req-789") == original
+    assert [entry["request_id"] for entry in request_profiler.recent()].count("req-789") == 1
+    print("✅ Test 3: Bad tokens are rejected and sampled requests cannot overwrite profiles")
+
+def test_sampled_profiles_keyed_by_request_id(monkeypatch):
+    monkeypatch.setattr(settings, "profiler_sample_rate", 1.0)
+    response = TestClient(build_app(traced=True)).get("/slow")
+    request_id = response.headers["x-request-id"]
+    profile = request_profiler.load(request_id)
+    assert profile is not None and profile["request_id"] == request_id
+    assert request_profiler.recent()[0]["request_id"] == request_id
+    print("✅ Test 4: Sampled profiles are stored under the logged request id")
+
+if __name__ == "__main__":
+    import pytest
+    test_profile_requested_by_header(pytest.MonkeyPatch())
+    test_admin_endpoints(pytest.MonkeyPatch())
+    test_untrusted_headers(pytest.MonkeyPatch())
+    test_sampled_profiles_keyed_by_request_id(pytest.MonkeyPatch())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Tests for token-budget prompt assembly"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.prompt_assembly import assemble_messages, count_tokens, MODE_BUDGETS
+from app.schemas.macca import ConversationMessage
+
+def test_everything_fits():
+    history = [
+        ConversationMessage(role="user", content="I go to market yesterday."),
+        ConversationMessage(role="assistant", content="You went to the market! What did you buy?")
+    ]
+    prompt = assemble_messages("You are Macca.", "I buy apples.", "live_conversation", history=history, examples=["Example 1"])
+    assert [m["role"] for m in prompt.messages] == ["system", "user", "assistant", "user"]
+    assert "Few-Shot Examples:" in prompt.messages[0]["content"]
+    assert prompt.messages[-1]["content"] == "I buy apples."
+    assert prompt.max_tokens == MODE_BUDGETS["live_conversation"].max_output_tokens
+    print("✅ Test 1: Small prompts keep examples and history")
+
+def test_budget_trims_examples_then_oldest_history():
+    budget = MODE_BUDGETS["pronunciation_coach"].prompt_tokens
+    big = "word " * budget
+    history = [
+        ConversationMessage(role="user", content="old " * budget),
+        ConversationMessage(role="assistant", content="recent reply")
+    ]
+    prompt = assemble_messages("System.", "think", "pronunciation_coach", history=history, examples=[big])
+    assert prompt.examples_used == 0
+    assert prompt.history_used == 1
+    assert prompt.messages[1]["content"] == "recent reply"
+    assert prompt.prompt_tokens <= budget
+    print("✅ Test 2: Over-budget examples and oldest history are dropped")
+
+def test_pronunciation_gets_smaller_output_budget():
+    assert MODE_BUDGETS["pronunciation_coach"].max_output_tokens < MODE_BUDGETS["guided_lesson"].max_output_tokens
+    assert count_tokens("") == 0
+    assert count_tokens("hello world") > 0
+    print("✅ Test 3: Output budget is sized per mode")
+
+if __name__ == "__main__":
+    test_everything_fits()
+    test_budget_trims_examples_then_oldest_history()
+    test_pronunciation_gets_smaller_output_budget()
+    print("\n🎉 All prompt assembly tests passed!")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests for batched pronunciation guidance"""
+
+import os
+import re
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.dependencies import get_llm_provider
+from app.schemas.macca import MaccaJsonResponse
+from app.services.pronunciation_cache import pronunciation_cache
+
+class CountingLLM:
+    def __init__(self):
+        self.prompts = []
+    
+    async def generate_macca_response(self, user_text, user_profile, session_context):
+        self.prompts.append(user_text)
+        words = re.findall(r"'([^']+)'", user_text)
+        return MaccaJsonResponse(
+            reply="ok",
+            pronunciation_feedback=[{"word": w, "target_sound": "/θ/", "tip": f"tip for {w}"} for w in words]
+        )
+
+llm = CountingLLM()
+client = TestClient(app)
+
+def setup_module():
+    app.dependency_overrides[get_llm_provider] = lambda: llm
+
+def teardown_module():
+    app.dependency_overrides.pop(get_llm_provider, None)
+
+def test_batch_dedupes_and_caches():
+    pronunciation_cache._entries.clear()
+    llm.prompts.clear()
+    
+    response = client.post("/api/pronunciation/analyze/batch", json={"words": ["anemone", "Anemone", "rhythm", "squirrel"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["word"] for r in results] == ["anemone", "rhythm", "squirrel"]
+    assert results[1]["feedback"][0]["tip_en"] == "tip for rhythm"
+    assert len(llm.prompts) == 1
+    
+    response = client.post("/api/pronunciation/analyze/batch", json={"words": ["squirrel", "thesaurus"]})
+    results = response.json()["results"]
+    assert [r["cached"] for r in results] == [True, False]
+    assert len(llm.prompts) == 2
+    assert "'squirrel'" not in llm.prompts[-1]
+    assert "/θ/" in llm.prompts[-1]  # rare words carry their likely pitfalls
+    print("✅ Test 1: Batch de-duplicates words and only asks the LLM about uncached ones")
+
+def test_lexicon_words_skip_llm():
+    llm.prompts.clear()
+    response = client.post("/api/pronunciation/analyze/batch", json={"words": ["think", "very"]})
+    results = response.json()["results"]
+    assert [r["source"] for r in results] == ["lexicon", "lexicon"]
+    assert results[0]["feedback"][0]["target_sound"] == "/θ/"
+    assert results[1]["feedback"][0]["target_sound"] == "/v/"
+    
+    response = client.post("/api/pronunciation/analyze", json={"word": "weather"})
+    assert response.json()[0]["target_sound"] == "/ð/"
+    assert llm.prompts == []
+    print("✅ Test 2: Lexicon words are answered without the LLM")
+
+def test_batch_limits():
+    response = client.post("/api/pronunciation/analyze/batch", json={"words": ["word" + "s" * i for i in range(100)]})
+    assert response.status_code == 422
+    response = client.post("/api/pronunciation/analyze/batch", json={"words": []})
+    assert response.status_code == 422
+    print("✅ Test 3: Empty and oversized batches are rejected")
+
+if __name__ == "__main__":
+    setup_module()
+    test_batch_dedupes_and_caches()
+    test_lexicon_words_skip_llm()
+    test_batch_limits()
+    print("\n🎉 All pronunciation batch tests passed!")
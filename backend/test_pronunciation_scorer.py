@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Tests for the local phoneme-level pronunciation scorer"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.pronunciation_scorer import align, pronounce, score_pronunciation, sound_tip
+
+def test_alignment():
+    cost, pairs = align(["TH", "IH", "NG", "K"], ["T", "IH", "NG", "K"])
+    assert pairs[0] == ("TH", "T")
+    assert 0 < cost < 1
+    cost, pairs = align(["B", "AE", "D"], ["B", "AE"])
+    assert pairs[-1] == ("D", None)
+    assert cost == 1.0
+    print("✅ Test 1: Alignment finds substitutions and dropped sounds")
+
+def test_scores_and_target_sound():
+    assert score_pronunciation("think", "Think.").score == 100
+    assert score_pronunciation("think", "uh, I think").score == 100
+    
+    tink = score_pronunciation("think", "tink")
+    weak = tink.weakest()
+    assert [p.ipa for p in weak] == ["/θ/"]
+    assert "teeth" in sound_tip(weak[0])[1]
+    
+    # Near misses score higher than unrelated words
+    assert score_pronunciation("very", "fery").score > score_pronunciation("very", "sorry").score
+    assert score_pronunciation("think", "").score == 0
+    print("✅ Test 2: Weak phoneme becomes the target sound")
+
+def test_unknown_words_use_spelling_rules():
+    assert pronounce("strength") == ["S", "T", "R", "EH", "NG", "TH"]
+    assert score_pronunciation("blanket", "blanket").score == 100
+    print("✅ Test 3: Out-of-lexicon words fall back to spelling rules")
+
+if __name__ == "__main__":
+    test_alignment()
+    test_scores_and_target_sound()
+    test_unknown_words_use_spelling_rules()
+    print("\n🎉 All pronunciation scorer tests passed!")
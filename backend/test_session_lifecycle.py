@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Tests for ending sessions, idle closing and batched summaries"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.db.database import Base, engine, session_scope
+from app.db.models import Job, Session, User, Utterance
+from app.jobs.worker import JobWorker
+from app.providers.groq_llm import parse_session_summaries
+from app.providers.mock import MockLLMProvider
+from app.services.session_lifecycle import END_IDLE, close_idle_sessions, close_session, summary_run_at
+from app.services.session_registry import session_registry
+
+Base.metadata.create_all(bind=engine)
+
+client = TestClient(app)
+
+def make_session(started_minutes_ago: float, turns_minutes_ago=()) -> str:
+    now = datetime.utcnow()
+    with session_scope() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", name="Lifecycle")
+        db.add(user)
+        db.flush()
+        session = Session(user_id=user.id, mode="live_conversation",
+                          started_at=now - timedelta(minutes=started_minutes_ago))
+        db.add(session)
+        db.flush()
+        for minutes in turns_minutes_ago:
+            db.add(Utterance(session_id=session.id, user_id=user.id, role="user",
+                             transcript=f"I practiced {minutes} minutes ago",
+                             created_at=now - timedelta(minutes=minutes)))
+        return session.id
+
+def test_end_endpoint():
+    latency = settings.mock_latency_scale
+    settings.mock_latency_scale = 0.0
+    try:
+        signup = client.post("/api/auth/signup", json={
+            "email": f"{uuid.uuid4()}@example.com", "password": "password123", "name": "Ender"
+        })
+        headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+        session_id = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+        client.post("/api/session/turn", json={"user_text": "Hello", "mode": "live", "session_id": session_id}, headers=headers)
+
+        ended = client.post(f"/api/session/{session_id}/end", headers=headers)
+        assert ended.status_code == 200
+        body = ended.json()
+        assert body["duration_seconds"] >= 0 and body["ended_at"] and body["summary_pending"]
+        again = client.post(f"/api/session/{session_id}/end", headers=headers).json()
+        assert again["ended_at"] == body["ended_at"]
+        with session_scope() as db:
+            assert db.query(Job).filter(Job.name == "summarize_sessions", Job.status == "queued").count() >= 1
+
+        assert client.post(f"/api/session/{session_id}/end").status_code == 404
+        anonymous = client.post("/api/session/start", json={"mode": "live"}).json()["session_id"]
+        assert client.post(f"/api/session/{anonymous}/end").json()["ended_at"] is None
+    finally:
+        settings.mock_latency_scale = latency
+    print("✅ Test 1: POST /session/{id}/end records duration once")
+
+def test_idle_sessions_close_at_last_turn():
+    idle = make_session(started_minutes_ago=200, turns_minutes_ago=(190, 180))
+    fresh = make_session(started_minutes_ago=200, turns_minutes_ago=(190, 5))
+    closed = close_idle_sessions()
+    assert idle in closed and fresh not in closed
+    with session_scope() as db:
+        row = db.get(Session, idle)
+        assert abs(row.duration_seconds - 20 * 60) <= 1
+        assert db.get(Session, fresh).ended_at is None
+    assert idle not in close_idle_sessions()
+    print("✅ Test 2: Idle sessions close at their last turn")
+
+def test_offpeak_window():
+    original = (settings.session_summary_offpeak_hours, settings.session_summary_window_seconds)
+    settings.session_summary_window_seconds = 900
+    try:
+        noon = datetime(2026, 1, 5, 12, 3, tzinfo=timezone.utc)
+        settings.session_summary_offpeak_hours = None
+        assert summary_run_at(noon) == datetime(2026, 1, 5, 12, 15, tzinfo=timezone.utc)
+        settings.session_summary_offpeak_hours = "1-6"
+        assert summary_run_at(noon) == datetime(2026, 1, 6, 1, 0, tzinfo=timezone.utc)
+        settings.session_summary_offpeak_hours = "22-5"
+        assert summary_run_at(noon.replace(hour=23)) == datetime(2026, 1, 5, 23, 15, tzinfo=timezone.utc)
+    finally:
+        settings.session_summary_offpeak_hours, settings.session_summary_window_seconds = original
+    print("✅ Test 3: Summary runs wait for the off-peak hours")
+
+def test_batched_summaries(monkeypatch):
+    with session_scope() as db:
+        db.query(Session).filter(Session.ended_at.isnot(None), Session.summary.is_(None)).update({Session.summary: ""})
+    ids = [make_session(started_minutes_ago=300, turns_minutes_ago=(290,)) for _ in range(3)]
+    close_idle_sessions()
+
+    calls = []
+    original = MockLLMProvider.summarize_sessions
+
+    async def counting(self, sessions):
+        calls.append(len(sessions))
+        return await original(self, sessions)
+
+    monkeypatch.setattr(MockLLMProvider, "summarize_sessions", counting)
+    monkeypatch.setattr(settings, "session_summary_batch_size", 2)
+    monkeypatch.setattr(settings, "mock_latency_scale", 0.0)
+    asyncio.run(JobWorker().execute(Job(id=str(uuid.uuid4()), name="summarize_sessions", payload={})))
+    assert calls == [2, 1]
+    with session_scope() as db:
+        for session_id in ids:
+            assert "290 minutes ago" in db.get(Session, session_id).summary
+    print("✅ Test 4: Ended sessions are summarized several per LLM call")
+
+def test_malformed_summaries_fall_back(monkeypatch):
+    keys = ["a", "b"]
+    assert parse_session_summaries('{"summaries": {"1": "Talked about food", "3": "x"}}', keys) == {"a": "Talked about food"}
+    for content in ("not json", '["summaries"]', '{"summaries": ["one", "two"]}', '{"summaries": "one"}'):
+        assert parse_session_summaries(content, keys) == {}
+
+    with session_scope() as db:
+        db.query(Session).filter(Session.ended_at.isnot(None), Session.summary.is_(None)).update({Session.summary: ""})
+    session_id = make_session(started_minutes_ago=300, turns_minutes_ago=(290,))
+    close_idle_sessions()
+
+    async def garbled(self, sessions):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    monkeypatch.setattr(MockLLMProvider, "summarize_sessions", garbled)
+    asyncio.run(JobWorker().execute(Job(id=str(uuid.uuid4()), name="summarize_sessions", payload={})))
+    with session_scope() as db:
+        assert "290 minutes ago" in db.get(Session, session_id).summary
+    print("✅ Test 5: Malformed summary completions fall back to extractive summaries")
+
+def test_only_idle_sessions_reopen(monkeypatch):
+    monkeypatch.setattr(settings, "mock_latency_scale", 0.0)
+    signup = client.post("/api/auth/signup", json={
+        "email": f"{uuid.uuid4()}@example.com", "password": "password123", "name": "Returner"
+    })
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+
+    def turn(session_id):
+        body = {"user_text": "I am back", "mode": "live", "session_id": session_id}
+        return client.post("/api/session/turn", json=body, headers=headers)
+
+    ended = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    client.post(f"/api/session/{ended}/end", headers=headers)
+    assert turn(ended).status_code == 409
+    with session_scope() as db:
+        row = db.get(Session, ended)
+        assert row.ended_at is not None and row.end_reason == "ended"
+
+    idle = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    with session_scope() as db:
+        close_session(db.get(Session, idle), datetime.now(timezone.utc), reason=END_IDLE)
+    session_registry.remove(idle)
+    assert turn(idle).status_code == 200
+    with session_scope() as db:
+        row = db.get(Session, idle)
+        assert row.ended_at is None and row.end_reason is None
+
+    # Ending an idle-closed session explicitly makes the end final
+    with session_scope() as db:
+        close_session(db.get(Session, idle), datetime.now(timezone.utc), reason=END_IDLE)
+    session_registry.remove(idle)
+    client.post(f"/api/session/{idle}/end", headers=headers)
+    assert turn(idle).status_code == 409
+    print("✅ Test 6: Turns reopen idle-closed sessions but not explicitly ended ones")
+
+if __name__ == "__main__":
+    import pytest
+    test_end_endpoint()
+    test_idle_sessions_close_at_last_turn()
+    test_offpeak_window()
+    test_batched_summaries(pytest.MonkeyPatch())
+    test_malformed_summaries_fall_back(pytest.MonkeyPatch())
+    test_only_idle_sessions_reopen(pytest.MonkeyPatch())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Tests for routing turns to sessions through the active-session registry"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import time
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.session import resolve_session
+from app.config import settings
+from app.db.database import Base, engine, session_scope
+from app.db.models import Session, Utterance
+from app.services.session_registry import session_registry
+
+Base.metadata.create_all(bind=engine)
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def no_mock_latency(monkeypatch):
+    monkeypatch.setattr(settings, "mock_latency_scale", 0.0)
+
+def signup() -> dict:
+    response = client.post("/api/auth/signup", json={
+        "email": f"{uuid.uuid4()}@example.com", "password": "password123", "name": "Router"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def turn(headers: dict, text: str, session_id=None):
+    body = {"user_text": text, "mode": "live"}
+    if session_id:
+        body["session_id"] = session_id
+    return client.post("/api/session/turn", json=body, headers=headers)
+
+def transcripts(session_id: str):
+    with session_scope() as db:
+        rows = db.query(Utterance.transcript).filter(
+            Utterance.session_id == session_id, Utterance.role == "user"
+        ).order_by(Utterance.created_at).all()
+        return [text for text, in rows]
+
+def test_turn_by_session_id():
+    headers = signup()
+    session_id = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    assert session_registry.get(session_id) is not None
+    assert turn(headers, "I went to the market", session_id).status_code == 200
+    assert transcripts(session_id) == ["I went to the market"]
+    print("✅ Test 1: Turns are saved to the registered session")
+
+def test_turn_without_session_id_uses_latest_open():
+    headers = signup()
+    older = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    latest = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    with session_scope() as db:
+        db.get(Session, older).started_at = datetime.utcnow() - timedelta(minutes=5)
+    assert turn(headers, "No id from the client").status_code == 200
+    assert transcripts(latest) == ["No id from the client"]
+    assert transcripts(older) == []
+
+    client.post(f"/api/session/{latest}/end", headers=headers)
+    assert turn(headers, "After ending the latest").status_code == 200
+    assert transcripts(older) == ["After ending the latest"]
+    print("✅ Test 2: Turns without an id go to the user's latest open session")
+
+def test_rehydration_from_db():
+    headers = signup()
+    session_id = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    turn(headers, "My name is Budi", session_id)
+    session_registry.remove(session_id)
+
+    assert turn(headers, "Do you remember me?", session_id).status_code == 200
+    active = session_registry.get(session_id)
+    assert active is not None and active.persisted
+    contents = [message.content for message in active.memory.turns]
+    assert "My name is Budi" in contents and "Do you remember me?" in contents
+    assert sorted(transcripts(session_id)) == ["Do you remember me?", "My name is Budi"]
+    print("✅ Test 3: Unregistered sessions are reloaded with their recent turns")
+
+def test_foreign_and_unknown_sessions():
+    owner = signup()
+    session_id = client.post("/api/session/start", json={"mode": "live"}, headers=owner).json()["session_id"]
+    intruder = signup()
+    assert turn(intruder, "Let me in", session_id).status_code == 403
+
+    # Also from the DB, once the registry has forgotten the session
+    session_registry.remove(session_id)
+    assert turn(intruder, "Let me in", session_id).status_code == 403
+    assert transcripts(session_id) == []
+
+    assert turn(owner, "Hello", str(uuid.uuid4())).status_code == 404
+    assert turn({}, "Hello", str(uuid.uuid4())).status_code == 404
+    print("✅ Test 4: Other users' sessions are 403, unknown ids 404")
+
+def test_registry_lookups_leave_loop_free(monkeypatch):
+    session_id = client.post("/api/session/start", json={"mode": "live"}).json()["session_id"]
+    lookup = session_registry.get
+
+    def slow_get(key):
+        time.sleep(0.2)  # a slow Redis round trip
+        return lookup(key)
+
+    monkeypatch.setattr(session_registry, "get", slow_get)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        active = await resolve_session(session_id, None)
+        task.cancel()
+        return active, ticks
+
+    active, ticks = asyncio.run(run())
+    assert active.session_id == session_id and ticks >= 5
+    print("✅ Test 5: Slow registry lookups do not stall the event loop")
+
+if __name__ == "__main__":
+    settings.mock_latency_scale = 0.0
+    test_turn_by_session_id()
+    test_turn_without_session_id_uses_latest_open()
+    test_rehydration_from_db()
+    test_foreign_and_unknown_sessions()
+    test_registry_lookups_leave_loop_free(pytest.MonkeyPatch())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Tests for the WebSocket voice session endpoint"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.session import MAX_AUDIO_SIZE
+from app.config import settings
+from app.dependencies import get_asr_provider
+from app.services.endpointing import ENDPOINT, PAUSE, Endpointer
+
+RATE = 16000
+
+class CountingASR:
+    def __init__(self):
+        self.calls = 0
+    
+    async def transcribe_audio(self, audio_bytes, language="en"):
+        self.calls += 1
+        assert audio_bytes[:4] == b"RIFF"
+        return "I have worked as a nurse for five years."
+
+asr = CountingASR()
+client = TestClient(app)
+_latency_scale = settings.mock_latency_scale
+
+def setup_module():
+    settings.mock_latency_scale = 0.0
+    app.dependency_overrides[get_asr_provider] = lambda: asr
+
+def teardown_module():
+    settings.mock_latency_scale = _latency_scale
+    app.dependency_overrides.pop(get_asr_provider, None)
+
+def tone(seconds: float) -> bytes:
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype("<i2").tobytes()
+
+def silence(seconds: float) -> bytes:
+    return bytes(int(RATE * seconds) * 2)
+
+def test_endpointer_events():
+    endpointer = Endpointer(sample_rate=RATE, pause_ms=300, endpoint_ms=700)
+    assert endpointer.feed(silence(0.5)) == []
+    assert not endpointer.speech_started
+    assert endpointer.feed(tone(0.6)) == []
+    assert endpointer.feed(silence(0.4)) == [PAUSE]
+    assert endpointer.feed(silence(0.4)) == [ENDPOINT]
+    assert endpointer.ended
+    print("✅ Test 1: Pause and endpoint detected after speech")
+
+def receive_until(ws, event_type):
+    events = []
+    while True:
+        message = ws.receive()
+        if message.get("bytes") is not None:
+            events.append({"type": "audio_bytes", "size": len(message["bytes"])})
+            continue
+        event = json.loads(message["text"])
+        events.append(event)
+        if event["type"] in (event_type, "error"):
+            return events
+
+def test_streamed_turn():
+    asr.calls = 0
+    with client.websocket_connect("/api/session/ws") as ws:
+        ws.send_json({"type": "start", "mode": "live", "format": "pcm16", "sample_rate": RATE})
+        assert ws.receive_json()["type"] == "ready"
+        for chunk in (tone(0.5), silence(0.1), tone(0.5)):
+            ws.send_bytes(chunk)
+        for _ in range(10):
+            ws.send_bytes(silence(0.1))  # pause, then endpoint
+        events = receive_until(ws, "turn_complete")
+        types = [e["type"] for e in events]
+        assert types[0] == "speech_started"
+        assert "partial_transcript" in types
+        for expected in ("transcript", "reply", "feedback", "audio_start", "sentence", "audio_bytes", "audio_end"):
+            assert expected in types, types
+        assert types.index("reply") < types.index("audio_start") < types.index("audio_bytes")
+        assert asr.calls == 1  # the segment cut at the pause; trailing silence is not sent
+        ws.send_json({"type": "stop"})
+    print("✅ Test 2: Streamed audio answered with events")
+
+def test_text_turn_and_bad_session():
+    with client.websocket_connect("/api/session/ws") as ws:
+        ws.send_json({"type": "start"})
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_json({"type": "text", "text": "Hello there"})
+        events = receive_until(ws, "turn_complete")
+        assert events[0] == {"type": "transcript", "text": "Hello there"}
+        ws.send_json({"type": "end_of_speech"})
+        assert ws.receive_json()["type"] == "no_speech"
+
+    with client.websocket_connect("/api/session/ws") as ws:
+        ws.send_json({"type": "start", "session_id": "missing"})
+        error = ws.receive_json()
+        assert error["type"] == "error" and error["status"] == 404
+    print("✅ Test 3: Typed turns work and unknown sessions are rejected")
+
+def test_malformed_events():
+    for start in ([], {"type": "start", "sample_rate": -16000}, {"type": "start", "sample_rate": [1]}):
+        with client.websocket_connect("/api/session/ws") as ws:
+            ws.send_text(json.dumps(start))
+            error = ws.receive_json()
+            assert error["type"] == "error" and error["status"] == 400, (start, error)
+
+    with client.websocket_connect("/api/session/ws") as ws:
+        ws.send_json({"type": "start"})
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_text("[1]")
+        error = ws.receive_json()
+        assert error["type"] == "error" and error["status"] == 400
+        ws.send_json({"type": "stop"})
+    print("✅ Test 4: Non-object events and bad sample rates are rejected")
+
+def test_oversized_webm_closes():
+    with client.websocket_connect("/api/session/ws") as ws:
+        ws.send_json({"type": "start", "format": "webm"})
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_bytes(bytes(MAX_AUDIO_SIZE + 1))
+        error = ws.receive_json()
+        assert error["type"] == "error" and error["status"] == 413
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+        assert closed.value.code == 1009
+    print("✅ Test 5: Oversized webm audio closes the socket")
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        test_endpointer_events()
+        test_streamed_turn()
+        test_text_turn_and_bad_session()
+        test_malformed_events()
+        test_oversized_webm_closes()
+    finally:
+        teardown_module()
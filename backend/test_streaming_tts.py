@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Tests for sentence-level streaming TTS"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import struct
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import session as session_api
+from app.api.session import MAX_SPEECH_CHARS
+from app.config import settings
+from app.providers.streaming_tts import OPUS_MIME, SentenceStreamingTTS, ogg_pages, single_text
+from app.services.rate_limit import ClientRateLimiter
+from app.services.sentence_stream import SentenceBuffer
+
+client = TestClient(app)
+
+def test_sentence_buffer():
+    buffer = SentenceBuffer(min_chars=12)
+    assert buffer.push("Ok. Mr. Smith paid 3.5 dollars") == []
+    assert buffer.push(" yesterday. Did you") == ["Ok. Mr. Smith paid 3.5 dollars yesterday."]
+    assert buffer.push(" see it? ") == ["Did you see it?"]
+    assert buffer.push("Great") == []
+    assert buffer.flush() == ["Great"]
+    print("✅ Test 1: Sentences released as soon as they are complete")
+
+def ogg_page(payload: bytes) -> bytes:
+    segments = [255] * (len(payload) // 255) + [len(payload) % 255]
+    return struct.pack("<4sBBqIIIB", b"OggS", 0, 0, 0, 1, 0, 0, len(segments)) + bytes(segments) + payload
+
+def test_ogg_pages():
+    pages = [ogg_page(b"a" * 300), ogg_page(b"b" * 10), ogg_page(b"c" * 600)]
+    assert ogg_pages(b"".join(pages)) == pages
+    print("✅ Test 2: Ogg streams split on page boundaries")
+
+class SlowSynth:
+    mime_type = OPUS_MIME
+    
+    def __init__(self):
+        self.started = []
+    
+    async def synthesize_audio(self, text, language="en"):
+        self.started.append(text)
+        # Later sentences would finish first if audio were not kept in order
+        await asyncio.sleep(0.05 if len(self.started) == 1 else 0.0)
+        return ogg_page(text.encode())
+
+def test_stream_in_order_with_lookahead():
+    synth = SlowSynth()
+    tts = SentenceStreamingTTS(synth, lookahead=2, chunk_bytes=1)
+
+    async def text():
+        for part in ["Hello there, friend! How ", "are you today? I am ", "fine, thank you."]:
+            yield part
+            await asyncio.sleep(0)
+
+    async def run():
+        return [chunk async for chunk in tts.stream_speech(text())]
+
+    chunks = asyncio.run(run())
+    assert [c.sentence for c in chunks] == [0, 1, 2]
+    assert [c.text for c in chunks] == ["Hello there, friend!", "How are you today?", "I am fine, thank you."]
+    assert all(c.mime_type == OPUS_MIME for c in chunks)
+    print("✅ Test 3: Sentences synthesized ahead but delivered in order")
+
+def test_speech_stream_endpoint():
+    scale = settings.mock_latency_scale
+    settings.mock_latency_scale = 0.0
+    try:
+        response = client.post("/api/session/speech/stream", json={"text": "First sentence here. And a second one."})
+    finally:
+        settings.mock_latency_scale = scale
+    assert response.status_code == 200
+    assert response.content[:4] in (b"RIFF", b"OggS")
+    assert client.post("/api/session/speech/stream", json={"text": " "}).status_code == 422
+    print("✅ Test 4: Speech streams over HTTP")
+
+def test_unsplittable_audio_one_chunk_per_sentence():
+    class FlacSynth:
+        mime_type = "audio/flac"
+
+        async def synthesize_audio(self, text, language="en"):
+            return b"fLaC" + text.encode() * 10
+
+    tts = SentenceStreamingTTS(FlacSynth(), opus=False, chunk_bytes=4)
+
+    async def run():
+        return [chunk async for chunk in tts.stream_speech(single_text("First one here. Second one here."))]
+
+    chunks = asyncio.run(run())
+    assert [c.sentence for c in chunks] == [0, 1]
+    assert all(c.data.startswith(b"fLaC") for c in chunks)
+    print("✅ Test 5: Non-Opus audio is sent as one playable chunk per sentence")
+
+def test_speech_stream_limits(monkeypatch):
+    monkeypatch.setattr(settings, "mock_latency_scale", 0.0)
+    monkeypatch.setattr(session_api, "speech_stream_limiter", ClientRateLimiter(limit=2))
+    too_long = "Hello there. " * (MAX_SPEECH_CHARS // 13 + 1)
+    assert client.post("/api/session/speech/stream", json={"text": too_long}).status_code == 422
+
+    for _ in range(2):
+        assert client.post("/api/session/speech/stream", json={"text": "Hi."}).status_code == 200
+    response = client.post("/api/session/speech/stream", json={"text": "Hi."})
+    assert response.status_code == 429 and int(response.headers["retry-after"]) > 0
+    print("✅ Test 6: Speech streaming is length-capped and rate-limited per client")
+
+if __name__ == "__main__":
+    test_sentence_buffer()
+    test_ogg_pages()
+    test_stream_in_order_with_lookahead()
+    test_speech_stream_endpoint()
+    test_unsplittable_audio_one_chunk_per_sentence()
+    test_speech_stream_limits(pytest.MonkeyPatch())
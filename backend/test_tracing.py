@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for request tracing and request ids in logs"""
+
+import os
+import sys
+# Set test environment before importing
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json
+import logging
+import uuid
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config import settings
+from app.db.database import Base, engine
+from app.services import tracing
+
+Base.metadata.create_all(bind=engine)
+tracing.instrument_engine(engine)  # done at import when TRACING_EXPORTER is set
+
+client = TestClient(app)
+
+def spans_of(path: str, request_id: str) -> list:
+    with open(path) as f:
+        for line in f:
+            spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+            root = next(s for s in spans if "parentSpanId" not in s)
+            attributes = {a["key"]: a["value"] for a in root["attributes"]}
+            if attributes.get("request_id", {}).get("stringValue") == request_id:
+                return spans
+    raise AssertionError(f"No trace for {request_id}")
+
+def attrs(span: dict) -> dict:
+    return {a["key"]: list(a["value"].values())[0] for a in span["attributes"]}
+
+def test_turn_trace_exported(tmp_path, monkeypatch):
+    trace_file = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(settings, "tracing_exporter", "file")
+    monkeypatch.setattr(settings, "tracing_file", trace_file)
+    monkeypatch.setattr(settings, "mock_latency_scale", 0.0)
+
+    signup = client.post("/api/auth/signup", json={
+        "email": f"{uuid.uuid4()}@example.com", "password": "password123", "name": "Traced"
+    })
+    headers = {"Authorization": f"Bearer {signup.json()['access_token']}"}
+    session_id = client.post("/api/session/start", json={"mode": "live"}, headers=headers).json()["session_id"]
+    response = client.post(
+        "/api/session/turn", json={"user_text": "I go to office yesterday", "mode": "live", "session_id": session_id},
+        headers={**headers, "X-Request-ID": "turn-1"}
+    )
+    assert response.headers["x-request-id"] == "turn-1"
+
+    spans = spans_of(trace_file, "turn-1")
+    root = next(s for s in spans if "parentSpanId" not in s)
+    assert root["name"] == "POST /api/session/turn" and attrs(root)["http.status_code"] == "200"
+    assert len({s["traceId"] for s in spans}) == 1
+    llm = next(s for s in spans if s["name"] == "llm.generate")
+    assert llm["parentSpanId"] == root["spanId"]
+    assert attrs(llm)["provider"] == "MockLLMProvider"
+    assert attrs(llm)["input.chars"] == str(len("I go to office yesterday"))
+    assert int(attrs(llm)["llm.completion_tokens"]) > 0
+    statements = [attrs(s)["db.statement"] for s in spans if s["name"] == "db.query"]
+    assert any(statement.startswith("INSERT INTO utterances") for statement in statements)
+    print(f"✅ Test 1: Turn trace has {len(spans)} spans (LLM, {len(statements)} SQL statements)")
+
+def test_console_tree_and_disabled(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "tracing_exporter", "console")
+    with caplog.at_level(logging.INFO, logger="app.services.tracing"):
+        with tracing.span("job demo", root=True, job__id="j1"):
+            with tracing.span("llm.generate", provider="Mock"):
+                tracing.set_attributes(llm__prompt_tokens=12)
+    tree = caplog.records[-1].getMessage().splitlines()
+    assert tree[1].startswith("job demo") and "job.id=j1" in tree[1]
+    assert tree[2].startswith("  llm.generate") and "llm.prompt_tokens=12" in tree[2]
+
+    monkeypatch.setattr(settings, "tracing_exporter", None)
+    with tracing.span("ignored", root=True) as active:
+        assert active is None
+    print("✅ Test 2: Console exporter logs the span tree; no exporter, no spans")
+
+def test_request_id_in_logs():
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "hello", None, None)
+    token = tracing.request_id_var.set("req-9")
+    try:
+        tracing.RequestIdFilter().filter(record)
+    finally:
+        tracing.request_id_var.reset(token)
+    assert logging.Formatter(tracing.LOG_FORMAT).format(record).endswith("[req-9] hello")
+    response = client.get("/api/health/live")
+    assert len(response.headers["x-request-id"]) == 16
+    print("✅ Test 3: Request ids reach log records and responses")
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Tests for the upstream concurrency limiter"""
+
+import os
+import sys
+import asyncio
+import time
+# Set test environment before importing
+os.environ["USE_MOCK_AI"] = "true"
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+from app.providers.limiter import UpstreamLimiter, UpstreamOverloadedError, parse_duration, request_budget
+from app.providers.errors import ProviderRateLimitError
+from app.providers.groq_llm import GroqLLMProvider
+from app.schemas.macca import ConversationMessage, SessionContext, UserProfile
+
+def _response(status_code, headers=None):
+    return httpx.Response(status_code, headers=headers or {}, request=httpx.Request("POST", "https://example.test"))
+
+def test_parse_duration():
+    assert parse_duration("7") == 7.0
+    assert parse_duration("7.66s") == 7.66
+    assert abs(parse_duration("2m59.56s") - 179.56) < 1e-9
+    assert parse_duration("120ms") == 0.12
+    assert parse_duration(None) is None
+    print("✅ Test 1: Rate-limit header durations parsed")
+
+def test_concurrency_cap():
+    limiter = UpstreamLimiter("test", max_concurrency=2, requests_per_second=1000, max_queue=10)
+    peak = 0
+    
+    async def call():
+        nonlocal peak
+        peak = max(peak, limiter._in_flight)
+        await asyncio.sleep(0.01)
+        return _response(200)
+    
+    async def main():
+        await asyncio.gather(*(limiter.run(call) for _ in range(8)))
+    
+    asyncio.run(main())
+    assert peak == 2
+    print("✅ Test 2: In-flight requests capped")
+
+def test_queue_full_sheds_load():
+    limiter = UpstreamLimiter("test", max_concurrency=1, requests_per_second=1000, max_queue=1)
+    
+    async def slow():
+        await asyncio.sleep(0.05)
+        return _response(200)
+    
+    async def main():
+        return await asyncio.gather(*(limiter.run(slow) for _ in range(3)), return_exceptions=True)
+    
+    results = asyncio.run(main())
+    shed = [r for r in results if isinstance(r, UpstreamOverloadedError)]
+    assert len(shed) == 1 and shed[0].status_code == 503
+    print("✅ Test 3: Full queue sheds with 503")
+
+def test_retry_after_honored():
+    limiter = UpstreamLimiter("test", max_concurrency=4, requests_per_second=1000, max_retries=2, backoff_base=0.01)
+    responses = [_response(429, {"retry-after": "0.1"}), _response(200)]
+    
+    async def call():
+        return responses.pop(0)
+    
+    start = time.monotonic()
+    response = asyncio.run(limiter.run(call))
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.1
+    print("✅ Test 4: Retry-After respected before retrying")
+
+def test_non_idempotent_not_retried():
+    limiter = UpstreamLimiter("test", requests_per_second=1000, max_retries=3)
+    calls = 0
+    
+    async def call():
+        nonlocal calls
+        calls += 1
+        return _response(429, {"retry-after": "0"})
+    
+    try:
+        asyncio.run(limiter.run(call, idempotent=False))
+        assert False, "Expected ProviderRateLimitError"
+    except ProviderRateLimitError as e:
+        assert e.status_code == 429
+    assert calls == 1
+    print("✅ Test 5: Non-idempotent calls are not retried")
+
+def test_exhausted_rate_limit_headers_pause_requests():
+    limiter = UpstreamLimiter("test", requests_per_second=1000)
+    
+    async def call():
+        return _response(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "0.2s"})
+    
+    asyncio.run(limiter.run(call))
+    assert limiter.stats()["blocked_for_seconds"] > 0.1
+    print("✅ Test 6: Exhausted x-ratelimit headers pause the upstream")
+
+def test_background_work_uses_own_budget():
+    groq = GroqLLMProvider()
+    seen = []
+    
+    class Recorder:
+        def __init__(self, name):
+            self.name = name
+        
+        async def run(self, call, idempotent=True, deadline=None):
+            seen.append((self.name, deadline))
+            content = '{"reply": "Hi"}' if self.name == "chat" else "summary"
+            return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+    
+    groq.limiter, groq.background_limiter = Recorder("chat"), Recorder("background")
+    profile = UserProfile(name="Test", level="B1", goal="study", explanation_language="en")
+    
+    async def main():
+        with request_budget(5.0):
+            await groq.generate_macca_response("hello", profile, SessionContext(session_id="s", mode="live_conversation"))
+            # Started from inside a turn, but must not inherit its deadline
+            await groq.summarize_conversation(None, [ConversationMessage(role="user", content="hello")])
+    
+    started = time.monotonic()
+    asyncio.run(main())
+    (chat, deadline), (background, background_deadline) = seen
+    assert chat == "chat" and started + 4.0 < deadline <= started + 5.5
+    assert background == "background" and background_deadline is None
+    assert groq.background_breaker is not groq.breaker
+    print("✅ Test 7: Summaries use their own limiter; turns pass their deadline")
+
+if __name__ == "__main__":
+    test_parse_duration()
+    test_concurrency_cap()
+    test_queue_full_sheds_load()
+    test_retry_after_honored()
+    test_non_idempotent_not_retried()
+    test_exhausted_rate_limit_headers_pause_requests()
+    test_background_work_uses_own_budget()
+    print("\n🎉 All limiter tests passed!")